@@ -2,7 +2,7 @@
 CDP Client — Shared module for direct Chrome DevTools Protocol communication.
 
 Bypasses Puppeteer to avoid frozen-tab timeouts. Uses:
-- HTTP API (urllib.request) for tab discovery (immune to frozen tabs)
+- HTTP API (plain socket HTTP/1.1) for tab discovery (immune to frozen tabs)
 - Per-tab WebSocket (websocket-client) for CDP commands
 
 Runtime — Python + uv (not Node). Benchmarked 2026-04-21 on /json/list:
@@ -12,8 +12,13 @@ Per-invocation bottleneck is WebSocket re-handshake, not language. A
 daemon would help; a language swap would not. See CLAUDE.md project-wide
 "Python Script Convention" rule before reconsidering.
 
+Interpreter startup is paid on every command, so this module keeps its
+import cost low (python -X importtime): the HTTP endpoint is spoken over a
+bare socket instead of urllib.request (whose http.client / email imports
+alone cost ~30ms), and websocket / tempfile are imported where used.
+
 Import via sys.path manipulation in v1/v2/v3 scripts:
-    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
     from cdp_client import CDPClient
 """
 
@@ -21,17 +26,38 @@ import contextlib
 import fcntl
 import json
 import os
-import tempfile
+import socket
 import time
-import urllib.error
 import urllib.parse
-import urllib.request
 
 # State file location
 STATE_DIR = os.path.expanduser("~/.cache/cdp-attach")
 STATE_FILE = os.path.join(STATE_DIR, "state.json")
 ERRORS_FILE = os.path.join(STATE_DIR, "errors.jsonl")
 ERRORS_ROTATE_BYTES = 1024 * 1024  # 1MB
+FRAME_CONTEXT_DIR = os.path.join(STATE_DIR, "frame-contexts")
+# A health monitor refreshes a "wedged" mark at least this often; an older
+# mark (monitor gone) no longer fails connects fast.
+HEALTH_STALE = 60
+
+# Adaptive send() timeouts: p99 of recent latencies × factor, clamped.
+LATENCY_FILE = os.path.join(STATE_DIR, "latency.json")
+DEFAULT_TIMEOUT = 30            # fixed budget until a method has enough samples
+TIMEOUT_FLOOR = float(os.environ.get("CDP_ATTACH_TIMEOUT_FLOOR", "10"))
+TIMEOUT_CEILING = 120
+TIMEOUT_FACTOR = 4
+LATENCY_SAMPLES = 50            # recent latencies kept per method (and per target+method)
+LATENCY_MIN_SAMPLES = 20
+LATENCY_MAX_TARGETS = 32        # per-target histories kept, most recently used first
+# Methods whose duration depends on the page or the network rather than on
+# renderer health (plus any awaitPromise call): always DEFAULT_TIMEOUT.
+OPEN_ENDED_METHODS = frozenset({
+    "Page.navigate",
+    "Page.navigateToHistoryEntry",
+    "Page.handleJavaScriptDialog",
+    "Page.printToPDF",
+    "Runtime.awaitPromise",
+})
 
 
 def _log_error(category, payload):
@@ -68,6 +94,8 @@ def atomic_write_json(path, data):
     command runs at a time per host:port), so this only needs to be
     crash-safe, not lock-guarded.
     """
+    import tempfile
+
     directory = os.path.dirname(path) or "."
     os.makedirs(directory, exist_ok=True)
     fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
@@ -83,6 +111,256 @@ def atomic_write_json(path, data):
         raise
 
 
+def _pid_alive(pid):
+    """True when a process with this pid exists (signal 0 probe)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def load_state():
+    """Read state.json ({} when missing or unreadable)."""
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def locked_state_update(update_fn):
+    """Read-modify-write state.json under its exclusive file lock."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    lock_path = STATE_FILE + ".lock"
+    with open(lock_path, "w") as lock_f:
+        fcntl.flock(lock_f, fcntl.LOCK_EX)
+        try:
+            state = load_state()
+            update_fn(state)
+            atomic_write_json(STATE_FILE, state)
+        finally:
+            fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+
+def set_target_health(target_id, record):
+    """Store a health monitor record for target_id in state.json (None removes it)."""
+    def _update(state):
+        health = state.setdefault("health", {})
+        if record is None:
+            health.pop(target_id, None)
+        else:
+            health[target_id] = record
+
+    locked_state_update(_update)
+
+
+def target_health(target_id):
+    """The target's health record while its monitor keeps it fresh, else None."""
+    record = load_state().get("health", {}).get(target_id)
+    if not record or time.time() - record.get("t", 0) > HEALTH_STALE:
+        return None
+    return record
+
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+class LatencyModel:
+    """Rolling per-method (and per-target) response latencies behind send()'s timeouts.
+
+    Samples are milliseconds, kept LATENCY_SAMPLES deep in LATENCY_FILE:
+        {"methods": {method: [ms, ...]},
+         "targets": {targetId: {"t": last use, "methods": {method: [ms, ...]}}}}
+    A target's own history wins once it has LATENCY_MIN_SAMPLES, so a heavy
+    page keeps a heavy budget for getFullAXTree while a light one detects a
+    wedge in TIMEOUT_FLOOR seconds. New samples are buffered and merged into
+    the file once, on close(). Only calls made without an explicit timeout
+    feed it, and timeouts are not recorded — a wedge must not teach the
+    model to wait longer.
+    """
+
+    def __init__(self):
+        self._data = None
+        self._new = []  # (target_id, method, ms)
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(LATENCY_FILE) as f:
+                    self._data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._data = {}
+        return self._data
+
+    def samples(self, target_id, method):
+        data = self._load()
+        own = data.get("targets", {}).get(target_id, {}).get("methods", {}).get(method, [])
+        if len(own) >= LATENCY_MIN_SAMPLES:
+            return own
+        return data.get("methods", {}).get(method, [])
+
+    def timeout(self, target_id, method, floor=TIMEOUT_FLOOR):
+        """Seconds to wait for `method`, or None when there is too little history."""
+        samples = self.samples(target_id, method)
+        if len(samples) < LATENCY_MIN_SAMPLES:
+            return None
+        learned = _p99(samples) * TIMEOUT_FACTOR / 1000
+        return min(TIMEOUT_CEILING, max(floor, learned))
+
+    def record(self, target_id, method, seconds):
+        self._new.append((target_id, method, round(seconds * 1000)))
+
+    def save(self):
+        """Merge buffered samples into LATENCY_FILE (re-read under its lock)."""
+        if not self._new:
+            return
+        new, self._new = self._new, []
+        try:
+            os.makedirs(STATE_DIR, exist_ok=True)
+            with open(LATENCY_FILE + ".lock", "w") as lock_f:
+                fcntl.flock(lock_f, fcntl.LOCK_EX)
+                try:
+                    self._data = None
+                    data = self._load()
+                    methods = data.setdefault("methods", {})
+                    targets = data.setdefault("targets", {})
+                    now = time.time()
+                    for target_id, method, ms in new:
+                        methods[method] = (methods.get(method, []) + [ms])[-LATENCY_SAMPLES:]
+                        if target_id:
+                            entry = targets.setdefault(target_id, {"methods": {}})
+                            entry["t"] = now
+                            history = entry["methods"].get(method, [])
+                            entry["methods"][method] = (history + [ms])[-LATENCY_SAMPLES:]
+                    if len(targets) > LATENCY_MAX_TARGETS:
+                        keep = sorted(targets, key=lambda t: -targets[t].get("t", 0))
+                        data["targets"] = {t: targets[t] for t in keep[:LATENCY_MAX_TARGETS]}
+                    atomic_write_json(LATENCY_FILE, data)
+                finally:
+                    fcntl.flock(lock_f, fcntl.LOCK_UN)
+        except OSError:
+            pass  # latency history is an optimization; never fail the command over it
+
+
+class FrameContextCache:
+    """frameId → executionContextId map (plus frame URLs) for one target.
+
+    Fed from CDP events: Runtime.enable makes Chrome announce every existing
+    context as an executionContextCreated burst before the enable response,
+    so the map is built in one pass and then kept current from
+    Created/Destroyed/Cleared (and Page.frameNavigated/frameDetached for
+    URLs). Only default-world contexts are kept — an extension's isolated
+    world on the same frame must not shadow the page's own context.
+
+    A collector that already holds Runtime.enable on the target persists
+    its cache to FRAME_CONTEXT_DIR/{targetId}.json; foreground commands
+    trust that file only while its owner pid is alive (load_live).
+    """
+
+    def __init__(self, target_id=None, source="session"):
+        self.target_id = target_id
+        self.source = source
+        self.contexts = {}  # frameId -> executionContextId (default world)
+        self.urls = {}      # frameId -> frame URL, frame-tree (DFS) order
+
+    def observe(self, event):
+        """Apply one CDP event. Returns True when the map changed."""
+        method = event.get("method")
+        params = event.get("params", {})
+        if method == "Runtime.executionContextCreated":
+            ctx = params.get("context", {})
+            aux = ctx.get("auxData") or {}
+            frame_id = aux.get("frameId")
+            if frame_id and aux.get("isDefault", True):
+                self.contexts[frame_id] = ctx.get("id")
+                return True
+        elif method == "Runtime.executionContextDestroyed":
+            ctx_id = params.get("executionContextId")
+            stale = [f for f, c in self.contexts.items() if c == ctx_id]
+            for frame_id in stale:
+                del self.contexts[frame_id]
+            return bool(stale)
+        elif method == "Runtime.executionContextsCleared":
+            changed = bool(self.contexts)
+            self.contexts.clear()
+            return changed
+        elif method == "Page.frameNavigated":
+            frame = params.get("frame", {})
+            if frame.get("id"):
+                self.urls[frame["id"]] = frame.get("url", "")
+                return True
+        elif method == "Page.frameDetached":
+            frame_id = params.get("frameId")
+            changed = frame_id in self.urls or frame_id in self.contexts
+            self.urls.pop(frame_id, None)
+            self.contexts.pop(frame_id, None)
+            return changed
+        return False
+
+    def observe_frame_tree(self, node):
+        """Record frame URLs from a Page.getFrameTree result (DFS pre-order)."""
+        frame = node.get("frame", {})
+        if frame.get("id"):
+            self.urls[frame["id"]] = frame.get("url", "")
+        for child in node.get("childFrames", []):
+            self.observe_frame_tree(child)
+
+    def frame_for_url(self, url_substring):
+        """First frameId (frame-tree order) whose URL contains the substring."""
+        for frame_id, url in self.urls.items():
+            if url_substring in url:
+                return frame_id
+        return None
+
+    @staticmethod
+    def _path(target_id):
+        return os.path.join(FRAME_CONTEXT_DIR, f"{target_id}.json")
+
+    def save(self):
+        """Persist for foreground commands (collector side). Best-effort."""
+        try:
+            atomic_write_json(self._path(self.target_id), {
+                "pid": os.getpid(),
+                "target_id": self.target_id,
+                "timestamp": time.time(),
+                "contexts": self.contexts,
+                "urls": self.urls,
+            })
+        except OSError:
+            pass
+
+    def discard(self):
+        """Remove the persisted file (collector shutdown). Best-effort."""
+        try:
+            os.unlink(self._path(self.target_id))
+        except OSError:
+            pass
+
+    @classmethod
+    def load_live(cls, target_id):
+        """Load a collector-persisted cache, or None when absent or its owner died."""
+        if not target_id:
+            return None
+        try:
+            with open(cls._path(target_id)) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("target_id") != target_id or not _pid_alive(data.get("pid")):
+            return None
+        cache = cls(target_id, source="collector")
+        cache.contexts = data.get("contexts") or {}
+        cache.urls = data.get("urls") or {}
+        return cache
+
+
 class CDPError(Exception):
     """CDP protocol or connection error."""
     pass
@@ -106,29 +384,68 @@ class CDPClient:
         self._ws = None
         self._msg_id = 0
         self._event_buffer = []
+        self._target_id = None
+        self._latency = LatencyModel()
+        self._reset_session_caches()
+
+    def _reset_session_caches(self):
+        """Per-connection state: domain-enable flags and the frame-context map."""
+        self._runtime_enabled = False
+        self._frame_cache = FrameContextCache(self._target_id)
+        self._live_frame_cache = None  # None = not looked up yet, False = disabled
 
     # ── HTTP API (frozen-tab immune) ──────────────────────────────
 
+    def _http_request(self, path, method="GET"):
+        """One HTTP/1.1 request to the CDP endpoint; returns the body bytes.
+
+        Chrome's DevTools HTTP server answers with a Content-Length body,
+        so a bare socket exchange is enough. Connection failures, timeouts
+        and 4xx/5xx answers all raise CDPError.
+        """
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        request = (
+            f"{method} {path} HTTP/1.1\r\nHost: {host}:{self.port}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        chunks = []
+        try:
+            with socket.create_connection((self.host, self.port), timeout=5) as sock:
+                sock.sendall(request.encode("ascii"))
+                while True:
+                    data = sock.recv(65536)
+                    if not data:
+                        break
+                    chunks.append(data)
+        except OSError as e:
+            raise CDPError(f"CDP HTTP endpoint unreachable ({self._base_url}): {e}")
+        head, _, body = b"".join(chunks).partition(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        parts = status_line.split(" ", 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise CDPError(f"CDP HTTP endpoint unreachable ({self._base_url}): "
+                           f"malformed response to {path}")
+        status = int(parts[1])
+        if status >= 400:
+            reason = parts[2] if len(parts) > 2 else ""
+            raise CDPError(f"CDP HTTP endpoint unreachable ({self._base_url}): "
+                           f"HTTP Error {status}: {reason}")
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length" and value.strip().isdigit():
+                body = body[:int(value)]
+        return body
+
     def _http_get(self, path):
         """GET request to CDP HTTP endpoint."""
-        url = f"{self._base_url}{path}"
         try:
-            with urllib.request.urlopen(url, timeout=5) as resp:
-                try:
-                    return json.loads(resp.read())
-                except json.JSONDecodeError:
-                    raise CDPError(f"Invalid JSON response from CDP endpoint: {path}")
-        except urllib.error.URLError as e:
-            raise CDPError(f"CDP HTTP endpoint unreachable ({self._base_url}): {e}")
+            return json.loads(self._http_request(path))
+        except json.JSONDecodeError:
+            raise CDPError(f"Invalid JSON response from CDP endpoint: {path}")
 
     def _http_get_raw(self, path):
         """GET request returning raw response text."""
-        url = f"{self._base_url}{path}"
-        try:
-            with urllib.request.urlopen(url, timeout=5) as resp:
-                return resp.read().decode()
-        except urllib.error.URLError as e:
-            raise CDPError(f"CDP HTTP endpoint unreachable ({self._base_url}): {e}")
+        return self._http_request(path).decode()
 
     def list_tabs(self, type_filter="page"):
         """List browser tabs via HTTP API. type_filter: 'page', 'all', etc."""
@@ -189,16 +506,10 @@ class CDPClient:
             # not double-encoded; Chrome unescapes the query before use.
             url = urllib.parse.quote(url, safe="%/:?#[]@!$&'()*+,;=~.-_")
         path = f"/json/new?{url}" if url else "/json/new"
-        full_url = f"{self._base_url}{path}"
         try:
-            req = urllib.request.Request(full_url, method="PUT")
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                try:
-                    return json.loads(resp.read())
-                except json.JSONDecodeError:
-                    raise CDPError(f"Invalid JSON response from CDP endpoint: {path}")
-        except urllib.error.URLError as e:
-            raise CDPError(f"CDP HTTP endpoint unreachable ({self._base_url}): {e}")
+            return json.loads(self._http_request(path, method="PUT"))
+        except json.JSONDecodeError:
+            raise CDPError(f"Invalid JSON response from CDP endpoint: {path}")
 
     def close_tab(self, target_id):
         """Close a tab by target ID."""
@@ -224,6 +535,18 @@ class CDPClient:
             if not target_id:
                 raise CDPError("No tab selected. Use 'select' first or provide target_id.")
 
+        # A live health monitor (v3 health_start) that saw the renderer stop
+        # answering makes every command fail here instead of after a 30s timeout.
+        health = target_health(target_id)
+        if (health and health.get("status") == "wedged"
+                and os.environ.get("CDP_ATTACH_IGNORE_HEALTH") != "1"):
+            silent = time.time() - health.get("since", health["t"])
+            raise CDPError(
+                f"Tab {target_id[:8]}... is wedged: its renderer has not answered a "
+                f"health probe for {silent:.0f}s.\n"
+                "Run 'v1 revive' to reopen it (or set CDP_ATTACH_IGNORE_HEALTH=1 to try anyway)."
+            )
+
         ws_url = f"ws://{self.host}:{self.port}/devtools/page/{target_id}"
 
         try:
@@ -240,6 +563,8 @@ class CDPClient:
 
         self._msg_id = 0
         self._event_buffer = []
+        self._target_id = target_id
+        self._reset_session_caches()
         return self
 
     def connect_browser(self, timeout=10):
@@ -273,6 +598,8 @@ class CDPClient:
 
         self._msg_id = 0
         self._event_buffer = []
+        self._target_id = None
+        self._reset_session_caches()
         return self
 
     def __enter__(self):
@@ -282,14 +609,42 @@ class CDPClient:
         self.close()
         return False
 
-    def send(self, method, params=None, timeout=30):
+    def adaptive_timeout(self, method, params=None, floor=TIMEOUT_FLOOR):
+        """Timeout for `method` on this target from its latency history (see LatencyModel).
+
+        DEFAULT_TIMEOUT while there is too little history, for open-ended
+        methods, for awaitPromise calls, or with CDP_ATTACH_FIXED_TIMEOUTS=1.
+        """
+        if (os.environ.get("CDP_ATTACH_FIXED_TIMEOUTS") == "1"
+                or method in OPEN_ENDED_METHODS
+                or (params or {}).get("awaitPromise")):
+            return DEFAULT_TIMEOUT
+        learned = self._latency.timeout(self._target_id, method, floor)
+        return DEFAULT_TIMEOUT if learned is None else learned
+
+    def send_raw(self, method, params=None, timeout=None):
+        """send(), but return the response's `result` as the browser's own JSON text.
+
+        Chrome frames a reply as {"id":N,"result":{...}}, so the result is
+        sliced out without decoding it — large results go to stdout (--json
+        output) without a decode/re-encode round trip. Falls back to
+        re-encoding when the frame has another layout.
+        """
+        return self.send(method, params, timeout, raw=True)
+
+    def send(self, method, params=None, timeout=None, raw=False):
         """Send CDP command and wait for response.
 
         Events received while waiting are buffered in self._event_buffer.
-        Raises CDPError on timeout (common with frozen tabs).
+        Raises CDPError on timeout (common with frozen tabs). Without an
+        explicit timeout the budget is adaptive_timeout(method, params).
+        raw=True: see send_raw().
         """
         if not self._ws:
             raise CDPError("Not connected. Call connect() first.")
+        adaptive = timeout is None
+        if adaptive:
+            timeout = self.adaptive_timeout(method, params)
 
         self._msg_id += 1
         msg_id = self._msg_id
@@ -312,16 +667,24 @@ class CDPClient:
                 "Re-select the tab ('list' + 'select') or run 'revive'."
             ) from e
 
-        deadline = time.time() + timeout
+        reply_prefix = f'{{"id":{msg_id},"result":'
+        started = time.time()
+        deadline = started + timeout
         while time.time() < deadline:
             remaining = deadline - time.time()
             if remaining <= 0:
                 break
             self._ws.settimeout(min(remaining, 1.0))
             try:
-                raw = self._ws.recv()
-                resp = json.loads(raw)
+                frame = self._ws.recv()
+                if raw and frame.startswith(reply_prefix) and frame.endswith("}}"):
+                    if adaptive:
+                        self._latency.record(self._target_id, method, time.time() - started)
+                    return frame[len(reply_prefix):-1]
+                resp = json.loads(frame)
                 if resp.get("id") == msg_id:
+                    if adaptive:
+                        self._latency.record(self._target_id, method, time.time() - started)
                     if "error" in resp:
                         err = resp["error"]
                         error_msg = f"CDP error ({err.get('code')}): {err.get('message')}"
@@ -332,10 +695,13 @@ class CDPClient:
                             "code": err.get("code"),
                         })
                         raise CDPError(error_msg)
+                    if raw:
+                        return json.dumps(resp.get("result", {}), ensure_ascii=False,
+                                          separators=(",", ":"))
                     return resp.get("result", {})
                 else:
                     # Buffer events (no 'id' field) for later inspection
-                    self._event_buffer.append(resp)
+                    self._buffer_event(resp)
             except CDPError:
                 # Already logged at the raise site.
                 raise
@@ -359,11 +725,16 @@ class CDPClient:
                 ) from e
 
         timeout_msg = (
-            f"Timeout waiting for response to {method} ({timeout}s). "
+            f"Timeout waiting for response to {method} ({timeout:g}s). "
             "Tab may be frozen or suspended. Outcome unknown — the command "
             "was sent and may have executed; verify the side effect before "
             "treating this as a failure or retrying a mutating action."
         )
+        if adaptive and timeout != DEFAULT_TIMEOUT:
+            timeout_msg += (
+                f"\nThe {timeout:g}s budget is learned from recent {method} latency; "
+                "set CDP_ATTACH_FIXED_TIMEOUTS=1 to wait the fixed 30s instead."
+            )
         _log_error("send", {
             "method": method,
             "params": params or {},
@@ -372,8 +743,110 @@ class CDPClient:
         })
         raise CDPError(timeout_msg)
 
+    def send_batch(self, calls, timeout=30):
+        """Send several CDP commands back-to-back, then collect every response.
+
+        calls is a sequence of (method, params) pairs. All payloads are written
+        before any response is read, so N commands cost one round-trip wait
+        instead of N — the pipelining input synthesis needs to push a whole
+        trajectory of mouse/wheel events at once. Chrome executes a session's
+        commands in arrival order, so ordering matches N sequential send()s.
+
+        Returns results in call order. If any call returns a CDP error, the
+        remaining responses are still drained (keeping the connection in a
+        clean state) and the first error is raised as CDPError. `timeout`
+        bounds the whole batch, not each call.
+        """
+        if not self._ws:
+            raise CDPError("Not connected. Call connect() first.")
+        calls = list(calls)
+        if not calls:
+            return []
+
+        pending = {}  # msg_id -> index into calls
+        for index, (method, params) in enumerate(calls):
+            self._msg_id += 1
+            payload = {"id": self._msg_id, "method": method}
+            if params:
+                payload["params"] = params
+            try:
+                self._ws.send(json.dumps(payload))
+            except Exception as e:
+                _log_error("send", {
+                    "method": method,
+                    "params": params or {},
+                    "error": f"{type(e).__name__}: {e}",
+                    "kind": "ws_send_error",
+                })
+                raise CDPConnectionError(
+                    f"WebSocket send failed for {method} (batch item {index + 1}/"
+                    f"{len(calls)}): {type(e).__name__}: {e}\n"
+                    f"The first {index} command(s) of the batch were sent and may "
+                    "have executed; the rest were NOT sent."
+                ) from e
+            pending[self._msg_id] = index
+
+        results = [None] * len(calls)
+        first_error = None
+        deadline = time.time() + timeout
+        while pending and time.time() < deadline:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            self._ws.settimeout(min(remaining, 1.0))
+            try:
+                raw = self._ws.recv()
+            except Exception as e:
+                if "timed out" in str(e).lower():
+                    continue
+                _log_error("send", {
+                    "method": calls[min(pending.values())][0],
+                    "error": f"{type(e).__name__}: {e}",
+                    "kind": "ws_error",
+                    "batch_pending": len(pending),
+                })
+                raise CDPConnectionError(
+                    f"WebSocket error during batch ({len(pending)} of {len(calls)} "
+                    f"response(s) outstanding): {type(e).__name__}: {e}\n"
+                    "Outcome unknown — the commands were sent and may have executed."
+                ) from e
+            resp = json.loads(raw)
+            index = pending.pop(resp.get("id"), None)
+            if index is None:
+                self._buffer_event(resp)
+                continue
+            if "error" in resp:
+                err = resp["error"]
+                method, params = calls[index]
+                error_msg = f"CDP error ({err.get('code')}): {err.get('message')}"
+                _log_error("send", {
+                    "method": method,
+                    "params": params or {},
+                    "error": error_msg,
+                    "code": err.get("code"),
+                })
+                if first_error is None:
+                    first_error = CDPError(f"{method}: {error_msg}")
+                continue
+            results[index] = resp.get("result", {})
+
+        if pending:
+            method = calls[min(pending.values())][0]
+            timeout_msg = (
+                f"Timeout waiting for {len(pending)} of {len(calls)} batched "
+                f"response(s), first outstanding {method} ({timeout}s). Tab may be "
+                "frozen or suspended. Outcome unknown — verify the side effect "
+                "before retrying."
+            )
+            _log_error("send", {"method": method, "error": timeout_msg, "kind": "timeout"})
+            raise CDPError(timeout_msg)
+        if first_error is not None:
+            raise first_error
+        return results
+
     def close(self):
-        """Close WebSocket connection."""
+        """Close WebSocket connection (and persist latency samples gathered on it)."""
+        self._latency.save()
         if self._ws:
             try:
                 self._ws.close()
@@ -381,6 +854,11 @@ class CDPClient:
                 pass
             self._ws = None
 
+    def _buffer_event(self, event):
+        """Buffer an event for drain_events(), keeping the frame-context map current."""
+        self._event_buffer.append(event)
+        self._frame_cache.observe(event)
+
     def drain_events(self):
         """Return and clear buffered events."""
         events = self._event_buffer[:]
@@ -432,27 +910,58 @@ class CDPClient:
             raise CDPError(f"No element matches selector: {selector!r}")
         return node_id
 
+    def _ensure_runtime(self):
+        """Runtime.enable once per connection.
+
+        Chrome answers with an executionContextCreated burst for every
+        existing context ahead of the enable response, so after this call
+        the session's frame-context map is complete in a single pass.
+        """
+        if not self._runtime_enabled:
+            self.send("Runtime.enable")
+            self._runtime_enabled = True
+
+    def _shared_frame_cache(self):
+        """A live collector's persisted FrameContextCache for this target, or None."""
+        if self._live_frame_cache is None:
+            self._live_frame_cache = FrameContextCache.load_live(self._target_id) or False
+        return self._live_frame_cache or None
+
+    def uses_shared_frame_cache(self):
+        """True when frame resolution on this connection came from a collector's cache."""
+        return bool(self._live_frame_cache)
+
+    def invalidate_frame_cache(self):
+        """Stop trusting the collector's persisted cache on this connection.
+
+        Callers use this after a cached context id turned out stale (e.g. the
+        frame navigated between the collector's last write and this lookup)
+        and then re-resolve through the session's own Runtime.enable pass.
+        """
+        self._live_frame_cache = False
+
     def _context_id_for_frame(self, frame_id, timeout=1.5):
-        """Wait for executionContextCreated event matching frame_id.
+        """Return the default-world execution context id for frame_id.
 
-        Returns context id, or None if not found within timeout. Caller is
-        responsible for calling Runtime.enable beforehand.
+        A dictionary lookup when the context is already known (announced by
+        Runtime.enable or seen since); otherwise waits up to `timeout` for a
+        matching executionContextCreated (frame still loading). Returns None
+        when none arrives. Caller is responsible for _ensure_runtime().
         """
+        ctx_id = self._frame_cache.contexts.get(frame_id)
+        if ctx_id is not None:
+            return ctx_id
         deadline = time.time() + timeout
         while time.time() < deadline:
-            for ev in self.drain_events():
-                if ev.get("method") != "Runtime.executionContextCreated":
-                    continue
-                ctx = ev.get("params", {}).get("context", {})
-                aux = ctx.get("auxData", {})
-                if aux.get("frameId") == frame_id:
-                    return ctx.get("id")
             try:
                 ev = self.recv_one_event(timeout=0.15)
             except CDPError:
                 break
             if ev is not None:
-                self._event_buffer.append(ev)
+                self._buffer_event(ev)
+            ctx_id = self._frame_cache.contexts.get(frame_id)
+            if ctx_id is not None:
+                return ctx_id
         return None
 
     def resolve_frame_context_id(self, frame_selector):
@@ -468,8 +977,6 @@ class CDPClient:
         if not frame_selector or frame_selector == "main":
             return None
 
-        self.send("Runtime.enable")
-
         node_id = self.query_selector_node_id(frame_selector)
 
         desc = self.send("DOM.describeNode", {"nodeId": node_id})
@@ -479,6 +986,11 @@ class CDPClient:
                 f"Element {frame_selector!r} is not a frame owner (no frameId)"
             )
 
+        shared = self._shared_frame_cache()
+        if shared and frame_id in shared.contexts:
+            return shared.contexts[frame_id]
+
+        self._ensure_runtime()
         ctx_id = self._context_id_for_frame(frame_id)
         if ctx_id is None:
             raise CDPError(
@@ -491,19 +1003,29 @@ class CDPClient:
     def resolve_frame_context_id_by_url(self, url_substring):
         """Resolve a URL substring to a frame's executionContextId.
 
-        Walks the frame tree (Page.getFrameTree), finds the first frame whose
-        URL contains the substring, and returns its execution context ID.
-        Useful for dynamic iframe targets where CSS selectors are unstable
-        (hashed classes, dynamic IDs) but URL patterns are stable.
+        Matches the first frame (frame-tree order) whose URL contains the
+        substring and returns its execution context ID. Useful for dynamic
+        iframe targets where CSS selectors are unstable (hashed classes,
+        dynamic IDs) but URL patterns are stable. With a live collector's
+        cache this is a pure dictionary lookup; otherwise one
+        Page.getFrameTree call per connection seeds the URL map.
         """
         if not url_substring:
             return None
 
-        self.send("Runtime.enable")
-        self.send("Page.enable")
+        shared = self._shared_frame_cache()
+        if shared:
+            frame_id = shared.frame_for_url(url_substring)
+            if frame_id in shared.contexts:
+                return shared.contexts[frame_id]
 
-        tree = self.send("Page.getFrameTree")
-        frame_id = self._find_frame_by_url(tree.get("frameTree", {}), url_substring)
+        self._ensure_runtime()
+        if not self._frame_cache.urls:
+            self.send("Page.enable")
+            tree = self.send("Page.getFrameTree")
+            self._frame_cache.observe_frame_tree(tree.get("frameTree", {}))
+
+        frame_id = self._frame_cache.frame_for_url(url_substring)
         if not frame_id:
             raise CDPError(f"No frame URL contains: {url_substring!r}")
 
@@ -516,19 +1038,6 @@ class CDPClient:
             )
         return ctx_id
 
-    def _find_frame_by_url(self, frame_tree_node, url_substring):
-        """Walk frame tree DFS; return first frameId whose URL contains substring."""
-        frame = frame_tree_node.get("frame", {})
-        url = frame.get("url", "")
-        if url_substring in url:
-            return frame.get("id")
-
-        for child in frame_tree_node.get("childFrames", []):
-            result = self._find_frame_by_url(child, url_substring)
-            if result:
-                return result
-        return None
-
     # ── State persistence ─────────────────────────────────────────
 
     @staticmethod
@@ -538,24 +1047,11 @@ class CDPClient:
 
     def _locked_state_update(self, update_fn):
         """Read-modify-write state under an exclusive file lock."""
-        os.makedirs(STATE_DIR, exist_ok=True)
-        lock_path = STATE_FILE + ".lock"
-        with open(lock_path, "w") as lock_f:
-            fcntl.flock(lock_f, fcntl.LOCK_EX)
-            try:
-                state = self.load_state()
-                update_fn(state)
-                self._atomic_save_state(state)
-            finally:
-                fcntl.flock(lock_f, fcntl.LOCK_UN)
+        locked_state_update(update_fn)
 
     def load_state(self):
         """Load persisted state."""
-        try:
-            with open(STATE_FILE) as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        return load_state()
 
     def save_state(self, target_id, host=None, port=None):
         """Save selected target to state file."""
@@ -0,0 +1,2128 @@
+"""
+collector — One background collector daemon per target, multiplexing captures.
+
+network, console, perf (tracing), metrics, route (Fetch interception),
+vitals and health (renderer liveness) captures share a single forked
+process and a single WebSocket to the tab instead of one fork + socket
+each. Each capture enables its CDP domains on that session (refcounted,
+so two captures needing Runtime do not disable it under each other) and
+writes its own sink.
+
+Control is file + signal based, so foreground commands never talk to the
+daemon directly:
+    collectors/{targetId}.json         spec — wanted captures {name: options},
+                                       host/port, expiry. Written by foreground
+                                       commands under collectors/{targetId}.lock.
+    collectors/{targetId}.status.json  status — pid, active captures, errors.
+                                       Written only by the daemon.
+A start/stop command edits the spec and sends SIGHUP; the daemon re-reads the
+spec and enables/disables captures to match (a capture whose options changed,
+e.g. a second network_start, is restarted for a fresh capture window).
+
+Lifetime lives here and only here: the daemon exits when the spec lists no
+captures, when the tab's WebSocket closes, on SIGTERM, or at `expires`
+(COLLECTOR_LIFETIME after the most recent start command, or later when a
+start asks for a longer lifetime). It removes its spec/status files on the
+way out, so "is a collector running" is a status file whose pid is alive —
+no PID bookkeeping in state.json.
+
+Imported by v3_advanced:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from collector import start_capture, stop_capture
+"""
+
+import base64
+import collections
+import contextlib
+import fcntl
+import fnmatch
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import mimetypes
+import os
+import signal
+import time
+import urllib.parse
+
+from cdp_client import CDPError, FrameContextCache, _pid_alive, atomic_write_json, set_target_health
+
+CACHE_DIR = os.path.expanduser("~/.cache/cdp-attach")
+COLLECTOR_DIR = os.path.join(CACHE_DIR, "collectors")
+COLLECTOR_ERROR_LOG = os.path.join(CACHE_DIR, "collector-error.log")
+NETWORK_EVENTS = os.path.join(CACHE_DIR, "network-events.jsonl")
+NETWORK_INDEX = os.path.join(CACHE_DIR, "network-index.jsonl")
+NETWORK_BODIES_DIR = os.path.join(CACHE_DIR, "network-bodies")
+CONSOLE_EVENTS = os.path.join(CACHE_DIR, "console-events.jsonl")
+CONSOLE_INDEX = os.path.join(CACHE_DIR, "console-index.jsonl")
+CONSOLE_ROTATED = os.path.join(CACHE_DIR, "console-events.1.jsonl")
+CONSOLE_INDEX_ROTATED = os.path.join(CACHE_DIR, "console-index.1.jsonl")
+METRICS_EVENTS = os.path.join(CACHE_DIR, "metrics.jsonl")
+ROUTE_LOG = os.path.join(CACHE_DIR, "route-log.jsonl")
+VITALS_EVENTS = os.path.join(CACHE_DIR, "vitals.jsonl")
+TRACE_DIR = os.path.join(CACHE_DIR, "traces")
+
+COLLECTOR_LIFETIME = 300  # 5 minutes after the most recent start command
+START_TIMEOUT = 10        # wait for a capture's enable ack
+DRAIN_TIMEOUT = 60        # wait for a stopping capture to flush; reset by progress
+# recv() timeout — also the worst-case latency for picking up a SIGHUP and
+# the granularity of time-based sink flushes.
+POLL_INTERVAL = 0.1
+
+# Event sinks batch writes and flush at whichever threshold is hit first, so
+# a request storm costs one write() per 64KB instead of one per event.
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 0.1  # seconds an event may sit in the buffer
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+# Network response body capture
+# - Only fetch bodies for these resource types (avoids saving every script/image)
+# - Required because Network.getResponseBody is only valid while the same CDP
+#   client session has Network.enable set; foreground sessions (e.g. cdp_call)
+#   cannot retrieve bodies for responses received before they connected.
+BODY_CAPTURE_TYPES = {"XHR", "Fetch", "EventSource"}
+BODY_MAX_BYTES = 5 * 1024 * 1024  # getResponseBody cap; larger bodies are streamed
+BODY_MAX_INFLIGHT = 4  # concurrent getResponseBody calls per collector
+TRACE_READ_CHUNK = 1024 * 1024  # IO.read size when pulling a trace stream
+CONSOLE_SEGMENT_BYTES = 4 * 1024 * 1024  # rotate console-events.jsonl past this (ring of two)
+CONSOLE_DEDUP_WINDOW = 60.0  # identical messages within this many seconds become one counted entry
+CONSOLE_RATE = 100           # new (non-error) messages per second kept; the rest are counted as dropped
+CONSOLE_BURST = 200
+CONSOLE_ARG_MAX = 1024       # chars kept per console arg value/description/preview
+CONSOLE_MAX_ARGS = 16
+CONSOLE_STACK_FRAMES = 5
+REPEAT_FLUSH_INTERVAL = 1.0  # seconds between repeat-count / dropped updates in the console index
+METRICS_INTERVAL = 1.0       # default Performance.getMetrics sampling period (s)
+HEALTH_INTERVAL = 5.0
+HEALTH_TIMEOUTS = (5, 10)    # busy after the first, wedged after both (cf. _post_nav_probe)
+HEALTH_HISTORY = 20          # probe latencies kept per target
+HEALTH_WRITE_INTERVAL = 30.0  # state.json refresh while the status is unchanged (< HEALTH_STALE)
+# Network.ResourceType values route_start --block accepts (case-insensitive).
+RESOURCE_TYPES = (
+    "Document", "Stylesheet", "Image", "Media", "Font", "Script", "TextTrack",
+    "XHR", "Fetch", "Prefetch", "EventSource", "WebSocket", "Manifest",
+    "SignedExchange", "Ping", "CSPViolationReport", "Preflight", "Other",
+)
+# route_start --block presets: URL patterns (Fetch wildcard syntax, * and ?).
+BLOCK_PRESETS = {
+    "analytics": (
+        "*://*google-analytics.com/*", "*://*googletagmanager.com/*",
+        "*://*doubleclick.net/*", "*://*googlesyndication.com/*",
+        "*://*segment.com/*", "*://*segment.io/*", "*://*mixpanel.com/*",
+        "*://*amplitude.com/*", "*://*hotjar.com/*", "*://*clarity.ms/*",
+        "*://*facebook.net/*", "*://*fullstory.com/*",
+    ),
+}
+PROGRESS_INTERVAL = 0.5  # min seconds between status writes for drain progress
+NO_THROTTLING = {"offline": False, "latency": 0, "downloadThroughput": -1, "uploadThroughput": -1}
+# Size bound of the content-addressed body store (compressed bytes on disk).
+BODY_STORE_MAX_BYTES = int(os.environ.get("CDP_ATTACH_BODY_STORE_MB", "256")) * 1024 * 1024
+
+
+def _spec_path(target_id):
+    return os.path.join(COLLECTOR_DIR, f"{target_id}.json")
+
+
+def _status_path(target_id):
+    return os.path.join(COLLECTOR_DIR, f"{target_id}.status.json")
+
+
+def trace_path(target_id, compress=None):
+    """Where the perf capture leaves a finished trace for perf_stop to collect."""
+    return os.path.join(TRACE_DIR, f"{target_id}.json" + (".gz" if compress else ""))
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _log_collector_error(target_id, exc):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(COLLECTOR_ERROR_LOG, "a") as ef:
+            ef.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} [{target_id}] {exc}\n")
+    except Exception:
+        pass
+
+
+@contextlib.contextmanager
+def _spec_lock(target_id):
+    """Serialize spec edits (foreground) against the daemon's exit decision."""
+    os.makedirs(COLLECTOR_DIR, exist_ok=True)
+    with open(os.path.join(COLLECTOR_DIR, f"{target_id}.lock"), "w") as lock_f:
+        fcntl.flock(lock_f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+
+def collector_status(target_id):
+    """Status of the target's live collector, or None when none is running."""
+    status = _read_json(_status_path(target_id))
+    if not status or status.get("target_id") != target_id:
+        return None
+    if not _pid_alive(status.get("pid")):
+        return None
+    return status
+
+
+def live_collectors():
+    """Statuses of every live collector (any target)."""
+    try:
+        names = os.listdir(COLLECTOR_DIR)
+    except OSError:
+        return []
+    statuses = []
+    for name in names:
+        if name.endswith(".status.json"):
+            status = collector_status(name[: -len(".status.json")])
+            if status:
+                statuses.append(status)
+    return statuses
+
+
+def capture_options(name):
+    """Options of live capture `name` as its collector's spec holds them, or None."""
+    target_id = find_capture(name)
+    if target_id is None:
+        return None
+    spec = _read_json(_spec_path(target_id)) or {}
+    return spec.get("domains", {}).get(name)
+
+
+def find_capture(name):
+    """Target id whose live collector runs capture `name`, or None."""
+    for status in live_collectors():
+        if name in status.get("active", {}) or name in status.get("starting", []):
+            return status["target_id"]
+    return None
+
+
+# ── Foreground control ────────────────────────────────────────────
+
+
+def _spawn(host, port, target_id):
+    """Fork the daemon for target_id. Returns the child pid in the parent."""
+    pid = os.fork()
+    if pid > 0:
+        return pid
+    try:
+        os.setsid()
+        _CollectorDaemon(host, port, target_id).run()
+        os._exit(0)
+    except Exception as exc:
+        _log_collector_error(target_id, exc)
+        os._exit(1)
+
+
+def _update_spec(client, target_id, add=None, remove=(), lifetime=COLLECTOR_LIFETIME):
+    """Edit the target's spec and wake (or spawn) its daemon. Returns epochs of added captures."""
+    epochs = {}
+    spawn = False
+    with _spec_lock(target_id):
+        status = collector_status(target_id)
+        spec = (_read_json(_spec_path(target_id)) if status else None) or {"domains": {}}
+        spec.update(target_id=target_id, host=client.host, port=client.port)
+        for name in remove:
+            spec["domains"].pop(name, None)
+        for name, options in (add or {}).items():
+            epochs[name] = time.time()
+            spec["domains"][name] = dict(options or {}, epoch=epochs[name])
+        if add:
+            # Never cut short a longer lifetime another capture asked for.
+            expires = spec.get("expires", 0) if status else 0
+            spec["expires"] = max(expires, time.time() + lifetime)
+        if status is None and not spec["domains"]:
+            _unlink(_spec_path(target_id))
+            return epochs
+        atomic_write_json(_spec_path(target_id), spec)
+        if status:
+            try:
+                os.kill(status["pid"], signal.SIGHUP)
+            except ProcessLookupError:
+                spawn = True
+        else:
+            spawn = True
+    # Fork outside the lock: the child would otherwise inherit the flock. Two
+    # racing spawns are resolved by the daemon's own claim step.
+    if spawn:
+        _spawn(client.host, client.port, target_id)
+    return epochs
+
+
+def _wait(target_id, ready, timeout, what, progress=None):
+    """Poll the daemon status until ready(status) is truthy.
+
+    Returns None when the daemon has exited and cleaned up (spec gone);
+    raises CDPError on timeout. progress(status) may return a value (e.g.
+    bytes drained so far); each change restarts the timeout.
+    """
+    deadline = time.time() + timeout
+    last = None
+    while time.time() < deadline:
+        status = collector_status(target_id)
+        if status is None:
+            if not os.path.exists(_spec_path(target_id)):
+                return None
+        elif ready(status):
+            return status
+        elif progress is not None:
+            value = progress(status)
+            if value is not None and value != last:
+                last = value
+                deadline = time.time() + timeout
+        time.sleep(0.05)
+    raise CDPError(
+        f"Collector did not {what} within {timeout}s. See {COLLECTOR_ERROR_LOG}"
+    )
+
+
+def start_capture(client, target_id, name, options=None, lifetime=COLLECTOR_LIFETIME):
+    """Start (or restart) capture `name` on the target's collector daemon.
+
+    Sinks are shared files, so a capture runs on one target at a time: it is
+    first removed from any other target's collector (per_target captures
+    excepted). The collector is kept
+    alive for at least `lifetime` seconds from now. Blocks until the
+    capture's CDP domains are enabled and returns the daemon status.
+    """
+    for status in ([] if CAPTURES[name].per_target else live_collectors()):
+        other = status["target_id"]
+        if other != target_id and name in status.get("active", {}):
+            _update_spec(client, other, remove=[name])
+    epoch = _update_spec(client, target_id, add={name: options}, lifetime=lifetime)[name]
+
+    def _ready(status):
+        if name in status.get("errors", {}) and status["errors"][name]["epoch"] == epoch:
+            raise CDPError(f"{name} capture failed: {status['errors'][name]['message']}")
+        return status.get("active", {}).get(name) == epoch
+
+    status = _wait(target_id, _ready, START_TIMEOUT, f"start {name} capture")
+    if status is None:
+        raise CDPError(f"Collector exited while starting {name} capture. See {COLLECTOR_ERROR_LOG}")
+    return status
+
+
+def stop_capture(client, name, wait=True, on_progress=None):
+    """Stop capture `name` wherever it runs. Returns the target id, or None if it was not running.
+
+    With wait=True, blocks until the capture has drained (e.g. the perf
+    capture has read its trace stream to disk). on_progress(value) is called
+    whenever the draining capture reports new progress.
+    """
+    target_id = find_capture(name)
+    if target_id is None:
+        return None
+    _update_spec(client, target_id, remove=[name])
+    if wait:
+        def _drained(status):
+            return name not in status.get("active", {}) and name not in status.get("draining", [])
+
+        def _progress(status):
+            value = status.get("progress", {}).get(name)
+            if value is not None and on_progress is not None:
+                on_progress(value)
+            return value
+
+        _wait(target_id, _drained, DRAIN_TIMEOUT, f"stop {name} capture", progress=_progress)
+    return target_id
+
+
+def stop_capture_everywhere(client, name):
+    """Stop a per-target capture on every collector running it. Returns the target ids."""
+    targets = [status["target_id"] for status in live_collectors()
+               if name in status.get("active", {}) or name in status.get("starting", [])]
+    for target_id in targets:
+        _update_spec(client, target_id, remove=[name])
+    return targets
+
+
+# ── Captures (daemon side) ────────────────────────────────────────
+
+
+# One shared encoder: json.dumps() with keyword arguments builds a new
+# JSONEncoder per call; compact separators also trim ~5% off every line.
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _zstd_module():
+    """zstd file API: stdlib compression.zstd (3.14+) or the zstandard package."""
+    try:
+        from compression import zstd
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def check_compression(compress):
+    """Raise CDPError when `compress` is unknown or unavailable here."""
+    if compress and compress not in COMPRESSIONS:
+        raise CDPError(f"Unknown compression {compress!r} (expected one of {', '.join(COMPRESSIONS)})")
+    if compress == "zstd" and _zstd_module() is None:
+        raise CDPError("zstd compression needs Python 3.14+ or the 'zstandard' package. Use gzip instead.")
+
+
+def _open_stream(path, mode):
+    """Open a plain, .gz or .zst file in binary mode, chosen by extension."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".zst"):
+        return _zstd_module().open(path, mode)
+    return open(path, mode)
+
+
+def events_path(base_path):
+    """The events file in use for a sink (plain, .gz or .zst), or None."""
+    for ext in ("",) + tuple(COMPRESSIONS.values()):
+        if os.path.exists(base_path + ext):
+            return base_path + ext
+    return None
+
+
+def iter_events(base_path):
+    """Yield (offset, entry) for each event line of a sink, any framing.
+
+    Offsets are positions in the uncompressed stream. A compressed file that
+    is still being written ends without a trailer, and a plain one may end
+    in a torn line — both simply end the iteration.
+    """
+    path = events_path(base_path)
+    if path is None:
+        return
+    offset = 0
+    with _open_stream(path, "rb") as f:
+        try:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if entry:
+                    yield offset, entry
+                offset += len(line)
+        except EOFError:
+            return
+
+
+class _BufferedSink:
+    """Append-only JSONL sink with batched writes and optional gzip/zstd framing.
+
+    Lines accumulate in memory and reach the file when FLUSH_BYTES are
+    buffered or the oldest line is FLUSH_INTERVAL old (checked on every write
+    and by the daemon's tick), and on close(). Compressed streams are
+    sync-flushed, so readers can decode everything up to the last flush while
+    the capture is still running.
+    """
+
+    def __init__(self, base_path, compress=None):
+        for ext in ("",) + tuple(COMPRESSIONS.values()):
+            _unlink(base_path + ext)
+        self.path = base_path + COMPRESSIONS.get(compress, "")
+        self._f = _open_stream(self.path, "wb")
+        self._buf = []
+        self._size = 0
+        self._oldest = 0.0
+        self.offset = 0  # uncompressed bytes written so far
+
+    def write_json(self, obj):
+        """Buffer one JSON line. Returns its offset in the uncompressed stream."""
+        line = _ENCODER.encode(obj).encode() + b"\n"
+        offset = self.offset
+        if not self._buf:
+            self._oldest = time.time()
+        self._buf.append(line)
+        self._size += len(line)
+        self.offset += len(line)
+        if self._size >= FLUSH_BYTES:
+            self.flush()
+        return offset
+
+    def tick(self, now):
+        if self._buf and now - self._oldest >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._f.write(b"".join(self._buf))
+            self._buf = []
+            self._size = 0
+            self._f.flush()
+
+    @property
+    def closed(self):
+        return self._f.closed
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+
+def _write_event(sink, method, params):
+    """Buffer one event line. Returns its offset in the sink."""
+    return sink.write_json({"t": time.time(), "method": method, "params": params})
+
+
+# ── Network index ─────────────────────────────────────────────────
+#
+# network-index.jsonl is an append-only log of small per-request deltas
+# ({"id": requestId, ...fields}) written next to network-events.jsonl. Folding
+# it gives requestId → {url, method, type, status, mime, ts/end (monotonic
+# seconds), start (wall time), size, body (BodyStore digest) + binary,
+# offs (byte offsets of the request's lines in network-events.jsonl)}, so
+# readers never parse the full event payloads (headers, initiator stacks).
+
+
+def network_index_delta(method, params):
+    """Index delta for one Network.* event, or None when it carries nothing."""
+    rid = params.get("requestId")
+    if not rid:
+        return None
+    if method == "Network.requestWillBeSent":
+        req = params.get("request", {})
+        delta = {
+            "id": rid,
+            "url": req.get("url", ""),
+            "method": req.get("method", ""),
+            "status": "pending",
+            "start": params.get("wallTime"),
+            "ts": params.get("timestamp"),
+        }
+    elif method == "Network.responseReceived":
+        resp = params.get("response", {})
+        delta = {"id": rid, "status": str(resp.get("status", "?")), "mime": resp.get("mimeType", "")}
+    elif method == "Network.loadingFinished":
+        delta = {"id": rid, "size": params.get("encodedDataLength", 0), "end": params.get("timestamp")}
+    elif method == "Network.loadingFailed":
+        delta = {"id": rid, "status": "FAILED", "end": params.get("timestamp")}
+    else:
+        return None
+    # responseReceived carries the final type — a later delta overwrites.
+    if params.get("type"):
+        delta["type"] = params["type"]
+    return delta
+
+
+def _fold_index(deltas):
+    index = {}
+    for delta in deltas:
+        entry = index.setdefault(delta.pop("id"), {"status": "pending", "offs": []})
+        off = delta.pop("off", None)
+        if off is not None:
+            entry["offs"].append(off)
+        entry.update(delta)
+    return index
+
+
+def _iter_jsonl(path):
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # torn last line while the collector is writing
+
+
+def _deltas_from_events(base_path):
+    """Rebuild deltas by scanning the events sink (captures without an index)."""
+    for offset, entry in iter_events(base_path):
+        delta = network_index_delta(entry.get("method", ""), entry.get("params", {}))
+        if delta:
+            delta["off"] = offset
+            yield delta
+
+
+def load_network_index():
+    """requestId → request summary for the current capture (see above).
+
+    Insertion order is first-seen order. Entries that never saw
+    requestWillBeSent (no "url") are kept; callers skip them when listing.
+    Returns None when nothing has been captured.
+    """
+    if os.path.exists(NETWORK_INDEX):
+        return _fold_index(_iter_jsonl(NETWORK_INDEX))
+    if events_path(NETWORK_EVENTS) is None:
+        return None
+    index = _fold_index(_deltas_from_events(NETWORK_EVENTS))
+    if os.path.isdir(NETWORK_BODIES_DIR):
+        for name in os.listdir(NETWORK_BODIES_DIR):
+            rid, ext = os.path.splitext(name)
+            if ext == ".json":
+                index.setdefault(rid, {"status": "pending", "offs": []})["body"] = name
+    return index
+
+
+class BodyStore:
+    """Content-addressed response bodies: sha256(raw bytes) → gzip blob.
+
+    Identical payloads (polling endpoints, retried API calls) are stored
+    once; binary bodies are kept as their decoded bytes, not base64 inside
+    JSON. Blobs outlive a capture window — the index of each capture points
+    at digests — and the store is bounded by size: when it grows past
+    max_bytes, least recently written or read blobs are evicted down to 90%
+    of the bound. Reads refresh a blob's mtime, which is the LRU clock.
+    """
+
+    SUFFIX = ".gz"
+
+    def __init__(self, root=NETWORK_BODIES_DIR, max_bytes=BODY_STORE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._total = None  # lazily scanned (writer side only)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest + self.SUFFIX)
+
+    def _blobs(self):
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        blobs = []
+        for name in names:
+            if name.endswith(self.SUFFIX):
+                try:
+                    st = os.stat(os.path.join(self.root, name))
+                except OSError:
+                    continue
+                blobs.append((st.st_mtime, st.st_size, name))
+        return blobs
+
+    def put(self, data):
+        """Store raw bytes; returns the digest. Best-effort: None on write failure."""
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            os.utime(self.path(digest))  # dedup hit: already stored, just refresh recency
+            return digest
+        except OSError:
+            pass
+        try:
+            writer = self.writer()
+            writer.write(data)
+        except OSError:
+            return None
+        return writer.commit()
+
+    def writer(self):
+        """Streaming writer for bodies too large to hold in memory."""
+        return _BlobWriter(self)
+
+    def _commit(self, tmp_path, digest):
+        path = self.path(digest)
+        if os.path.exists(path):
+            _unlink(tmp_path)
+            os.utime(path)
+            return digest
+        os.replace(tmp_path, path)
+        if self._total is None:
+            self._total = sum(size for _, size, _ in self._blobs())
+        else:
+            self._total += os.path.getsize(path)
+        if self._total > self.max_bytes:
+            self._evict(keep=digest + self.SUFFIX)
+        return digest
+
+    def _evict(self, keep):
+        target = self.max_bytes * 0.9
+        blobs = sorted(self._blobs())
+        total = sum(size for _, size, _ in blobs)
+        for _, size, name in blobs:
+            if total <= target:
+                break
+            if name == keep:
+                continue
+            _unlink(os.path.join(self.root, name))
+            total -= size
+        self._total = total
+
+    def open(self, digest):
+        """Readable (decompressing) file object for a digest, or None when evicted."""
+        path = self.path(digest)
+        try:
+            f = gzip.open(path, "rb")
+            os.utime(path)
+        except OSError:
+            return None
+        return f
+
+    def get(self, digest):
+        """Raw bytes for a digest, or None when evicted."""
+        f = self.open(digest)
+        if f is None:
+            return None
+        try:
+            with f:
+                return f.read()
+        except OSError:
+            return None
+
+
+class _BlobWriter:
+    """Incremental BodyStore write: hash and gzip chunk by chunk into a temp
+    file, then rename to the digest on commit (or drop it on a dedup hit)."""
+
+    def __init__(self, store):
+        import tempfile
+
+        self.store = store
+        os.makedirs(store.root, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=store.root, suffix=".tmp")
+        self._raw = os.fdopen(fd, "wb")
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self._gz.write(data)
+        self.size += len(data)
+
+    def _close(self):
+        self._gz.close()
+        self._raw.close()
+
+    def commit(self):
+        """Finish the blob; returns its digest (None on write failure)."""
+        try:
+            self._close()
+            return self.store._commit(self.tmp_path, self._hash.hexdigest())
+        except OSError:
+            _unlink(self.tmp_path)
+            return None
+
+    def discard(self):
+        try:
+            self._close()
+        except OSError:
+            pass
+        _unlink(self.tmp_path)
+
+
+def open_body(info):
+    """(readable binary file, is_binary) for an index entry's body, or None when evicted.
+
+    Legacy captures stored {requestId}.json files with the body inlined
+    (base64 when binary); those are still readable.
+    """
+    ref = info.get("body")
+    if not ref:
+        return None
+    if ref.endswith(".json"):
+        try:
+            with open(os.path.join(NETWORK_BODIES_DIR, ref)) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("base64Encoded"):
+            return io.BytesIO(base64.b64decode(data.get("body", ""))), True
+        return io.BytesIO(data.get("body", "").encode("utf-8", "surrogatepass")), False
+    f = BodyStore().open(ref)
+    if f is None:
+        return None
+    return f, bool(info.get("binary"))
+
+
+def load_body(info):
+    """(raw bytes, is_binary) for an index entry's body, or None when evicted."""
+    opened = open_body(info)
+    if opened is None:
+        return None
+    f, binary = opened
+    try:
+        with f:
+            return f.read(), binary
+    except OSError:
+        return None
+
+
+def body_refs():
+    """requestId → {"body", "binary"} for the current capture, streamed from the
+    index without folding the rest of it."""
+    if not os.path.exists(NETWORK_INDEX):
+        return {rid: info for rid, info in (load_network_index() or {}).items() if info.get("body")}
+    refs = {}
+    for delta in _iter_jsonl(NETWORK_INDEX):
+        if delta.get("body"):
+            refs[delta["id"]] = {"body": delta["body"], "binary": delta.get("binary", False)}
+    return refs
+
+
+# ── Console log ───────────────────────────────────────────────────
+#
+# console-events.jsonl keeps one line per *distinct* message
+# ({"t", "seq", "method", "params"} with args and stacks capped), and
+# console-index.jsonl keeps the small stuff: {"s": seq, "o": offset, "l": level}
+# per line, {"s": seq, "n": count, "last": t} when repeats of that message
+# were collapsed, and {"dropped": n} for rate-limited messages. The pair
+# rotates to console-*.1.jsonl at CONSOLE_SEGMENT_BYTES, so disk use is a
+# ring of two segments. `console_list --level error` reads the index and
+# seeks to the matching lines only.
+
+
+def console_message(method, params):
+    """(level, text, source) for a Runtime.consoleAPICalled / exceptionThrown event."""
+    if method == "Runtime.exceptionThrown":
+        exc = params.get("exceptionDetails", {})
+        desc = exc.get("exception", {}).get("description", "")
+        text = f"{exc.get('text', '')} {desc}"
+        url, line = exc.get("url", ""), exc.get("lineNumber", 0)
+        return "error", text, f"{url}:{line + 1}" if url else ""
+    text = " ".join(
+        str(a.get("value", a.get("description", repr(a))))
+        for a in params.get("args", [])
+    )
+    frames = (params.get("stackTrace") or {}).get("callFrames") or [{}]
+    url, line = frames[0].get("url", ""), frames[0].get("lineNumber", 0)
+    return params.get("type", "log"), text, f"{url}:{line + 1}" if url else ""
+
+
+def _cap_text(value):
+    if isinstance(value, str) and len(value) > CONSOLE_ARG_MAX:
+        return value[:CONSOLE_ARG_MAX] + "…"
+    return value
+
+
+def _cap_remote_object(obj):
+    capped = {k: v for k, v in obj.items() if k not in ("objectId", "preview", "customPreview")}
+    for key in ("value", "description"):
+        if key in capped:
+            value = capped[key]
+            if not isinstance(value, str) and len(_ENCODER.encode(value)) > CONSOLE_ARG_MAX:
+                value = _ENCODER.encode(value)
+            capped[key] = _cap_text(value)
+    preview = obj.get("preview")
+    if preview is not None and len(_ENCODER.encode(preview)) <= CONSOLE_ARG_MAX:
+        capped["preview"] = preview
+    return capped
+
+
+def _cap_stack(stack):
+    if not stack:
+        return stack
+    # Async parents ("parent") can chain dozens of frames deep; keep the sync top.
+    return {"callFrames": stack.get("callFrames", [])[:CONSOLE_STACK_FRAMES]}
+
+
+def _cap_console_params(method, params):
+    """A copy of a console event's params with args, strings and stacks bounded."""
+    params = dict(params)
+    args = params.get("args")
+    if args is not None:
+        params["args"] = [_cap_remote_object(a) for a in args[:CONSOLE_MAX_ARGS]]
+        if len(args) > CONSOLE_MAX_ARGS:
+            params["argsTruncated"] = len(args)
+    if "stackTrace" in params:
+        params["stackTrace"] = _cap_stack(params["stackTrace"])
+    exc = params.get("exceptionDetails")
+    if exc:
+        exc = dict(exc, text=_cap_text(exc.get("text", "")))
+        if "exception" in exc:
+            exc["exception"] = _cap_remote_object(exc["exception"])
+        if "stackTrace" in exc:
+            exc["stackTrace"] = _cap_stack(exc["stackTrace"])
+        params["exceptionDetails"] = exc
+    return params
+
+
+def _fold_console_index(path):
+    """seq → {"o", "l", "n", "last"?} and the dropped count for one index segment."""
+    entries, dropped = {}, 0
+    for rec in _iter_jsonl(path):
+        if "o" in rec:
+            entries[rec["s"]] = {"o": rec["o"], "l": rec["l"], "n": 1}
+        elif "n" in rec and rec.get("s") in entries:
+            entries[rec["s"]].update(n=rec["n"], last=rec["last"])
+        elif "dropped" in rec:
+            dropped = rec["dropped"]
+    return entries, dropped
+
+
+def _events_at(base_path, offsets):
+    """Yield (offset, entry) for the sink lines starting at `offsets` (uncompressed)."""
+    path = events_path(base_path)
+    if path is None or not offsets:
+        return
+    wanted = sorted(offsets)
+    if path == base_path:
+        with open(path, "rb") as f:
+            for offset in wanted:
+                f.seek(offset)
+                try:
+                    yield offset, json.loads(f.readline())
+                except ValueError:
+                    continue
+        return
+    # Compressed: no random access — stream, but only decode wanted lines.
+    targets, last, offset = set(wanted), wanted[-1], 0
+    with _open_stream(path, "rb") as f:
+        try:
+            for line in f:
+                if offset in targets:
+                    try:
+                        yield offset, json.loads(line)
+                    except ValueError:
+                        pass
+                if offset >= last:
+                    return
+                offset += len(line)
+        except EOFError:
+            return
+
+
+def _console_segments():
+    """(events base, index path) of the rotated then the current segment, oldest first."""
+    return [(CONSOLE_ROTATED, CONSOLE_INDEX_ROTATED), (CONSOLE_EVENTS, CONSOLE_INDEX)]
+
+
+def console_captured():
+    """True when a console capture has left anything on disk."""
+    return any(events_path(base) for base, _ in _console_segments())
+
+
+def iter_console(levels=None):
+    """Yield {"t", "level", "text", "source", "count", "last"} messages, oldest first.
+
+    `levels` (a set of console levels) is answered from the index without
+    decoding other lines. Captures without an index are scanned instead.
+    """
+    for events_base, index_path in _console_segments():
+        if events_path(events_base) is None:
+            continue
+        if os.path.exists(index_path):
+            entries, _ = _fold_console_index(index_path)
+            by_offset = {e["o"]: e for e in entries.values() if levels is None or e["l"] in levels}
+            for offset, entry in _events_at(events_base, by_offset):
+                info = by_offset[offset]
+                level, text, source = console_message(entry["method"], entry["params"])
+                yield {"t": entry["t"], "level": level, "text": text, "source": source,
+                       "count": info["n"], "last": info.get("last", entry["t"])}
+            continue
+        for _, entry in iter_events(events_base):
+            level, text, source = console_message(entry["method"], entry["params"])
+            if levels is None or level in levels:
+                yield {"t": entry["t"], "level": level, "text": text, "source": source,
+                       "count": 1, "last": entry["t"]}
+
+
+def console_dropped():
+    """Messages dropped by the rate limit across both segments."""
+    return sum(_fold_console_index(index)[1]
+               for _, index in _console_segments() if os.path.exists(index))
+
+
+class _Capture:
+    """One capture stream on the daemon's session.
+
+    Subclasses name the CDP domains to enable (`cdp_domains`, acquired in
+    order; the last ack marks the capture active) and the event methods they
+    want routed to on_event().
+    """
+
+    name = ""
+    cdp_domains = ()
+    events = frozenset()
+    progress = None  # set while draining to report work done (shown by stop_capture)
+    per_target = False  # True: no shared sink, so it may run on many targets at once
+    failed = False  # set once a hook raised; late callbacks are then ignored
+    stage = "new"  # new -> started -> stopped -> closed, advanced by the daemon
+
+    def __init__(self, daemon, options):
+        self.daemon = daemon
+        self.options = options
+
+    def open(self):
+        """Prepare sinks. Called before any domain is enabled."""
+
+    def start(self):
+        for domain in self.cdp_domains[:-1]:
+            self.daemon.acquire(domain)
+        self.daemon.acquire(self.cdp_domains[-1], callback=self._ready)
+
+    def _ready(self, data):
+        self.daemon.capture_ready(self, data)
+
+    def on_event(self, method, params):
+        pass
+
+    def tick(self, now):
+        """Periodic housekeeping (sink flushes), at least every POLL_INTERVAL."""
+
+    def stop(self):
+        """Release domains. Return False to keep draining until self.done."""
+        for domain in reversed(self.cdp_domains):
+            self.daemon.release(domain)
+        return True
+
+    def close(self):
+        """Close sinks. Called once, after stop() (or on daemon exit)."""
+
+
+def _is_text_mime(mime):
+    mime = (mime or "").lower()
+    return mime.startswith("text/") or any(
+        token in mime for token in ("json", "xml", "javascript", "ecmascript", "x-www-form-urlencoded")
+    )
+
+
+class _NetworkCapture(_Capture):
+    """Network events plus XHR/Fetch/EventSource response bodies.
+
+    Bodies are required for debugging virtualized data grids and any SPA
+    whose authoritative data lives in XHR/Fetch responses (the DOM only
+    renders the visible window). Network.getResponseBody must be invoked
+    from the same CDP session that received the response, so the fetch
+    happens here on the collector's session.
+
+    Two body paths, neither blocking event collection:
+    - Bodies up to BODY_MAX_BYTES: Network.getResponseBody after
+      loadingFinished, with at most `max_inflight` outstanding; the rest
+      wait in a FIFO queue.
+    - Larger bodies: Network.streamResourceContent, after which Chrome
+      attaches each chunk to Network.dataReceived. Chunks go straight into a
+      BodyStore writer, so a multi-hundred-MB export never sits in memory.
+      A Content-Length above the cap starts the stream at responseReceived.
+      Chunked or compressed responses have no usable length, so the
+      decoded bytes (dataReceived dataLength) are counted too and the
+      stream starts once they pass the cap; its reply carries what Chrome
+      buffered so far. The same decoded count keeps a small gzip body that
+      inflates past the cap off the getResponseBody path.
+    """
+
+    name = "network"
+    cdp_domains = ("Network",)
+    sink_events = frozenset({
+        "Network.requestWillBeSent",
+        "Network.responseReceived",
+        "Network.loadingFinished",
+        "Network.loadingFailed",
+    })
+    events = sink_events | {"Network.dataReceived"}
+
+    def open(self):
+        # Fresh capture window for events; bodies persist in the LRU store.
+        self.bodies = BodyStore()
+        self.sink = _BufferedSink(NETWORK_EVENTS, self.options.get("compress"))
+        self.index = _BufferedSink(NETWORK_INDEX)
+        body_types = self.options.get("body_types")
+        self.body_types = None if body_types == "all" else set(body_types or BODY_CAPTURE_TYPES)
+        self.max_inflight = max(1, int(self.options.get("max_inflight") or BODY_MAX_INFLIGHT))
+        self.inflight = 0
+        self.queue = collections.deque()  # requestIds awaiting getResponseBody
+        self.req_type = {}  # requestId -> resource type (XHR, Fetch, ...)
+        self.streams = {}   # requestId -> _BodyStream
+        self.received = {}  # requestId -> [decoded bytes so far, mimeType], wanted bodies
+
+    def tick(self, now):
+        self.sink.tick(now)
+        self.index.tick(now)
+
+    def _wants_body(self, rid):
+        rt = self.req_type.get(rid, "")
+        return self.body_types is None or rt in self.body_types
+
+    def _record_body(self, rid, digest, binary, **extra):
+        if digest:
+            delta = {"id": rid, "body": digest, **extra}
+            if binary:
+                delta["binary"] = True
+            self.index.write_json(delta)
+
+    # ── getResponseBody path ──
+
+    def _pump(self):
+        while self.queue and self.inflight < self.max_inflight:
+            rid = self.queue.popleft()
+            self.inflight += 1
+            self.daemon.call("Network.getResponseBody", {"requestId": rid},
+                             callback=lambda data, rid=rid: self._on_body(rid, data))
+
+    def _on_body(self, rid, data):
+        self.inflight -= 1
+        self._pump()
+        # CDP error responses are silently dropped — body fetch is
+        # best-effort (e.g. 204 No Content, redirects, aborted).
+        if "result" not in data:
+            return
+        body = data["result"].get("body", "")
+        binary = data["result"].get("base64Encoded", False)
+        try:
+            raw = base64.b64decode(body) if binary else body.encode("utf-8", "surrogatepass")
+        except ValueError:
+            return
+        self._record_body(rid, self.bodies.put(raw), binary)
+
+    # ── streaming path ──
+
+    def _start_stream(self, rid, mime):
+        stream = _BodyStream(self.bodies.writer(), binary=not _is_text_mime(mime))
+        self.streams[rid] = stream
+        self.daemon.call("Network.streamResourceContent", {"requestId": rid},
+                         callback=lambda data, rid=rid: self._on_stream_enabled(rid, data))
+
+    def _on_stream_enabled(self, rid, data):
+        stream = self.streams.get(rid)
+        if stream is None:
+            return
+        if "result" not in data:
+            # Not supported by this Chrome (or already finished): no body.
+            self.streams.pop(rid).writer.discard()
+            return
+        try:
+            stream.enabled(base64.b64decode(data["result"].get("bufferedData", "")))
+        except OSError:
+            self.streams.pop(rid).writer.discard()
+            return
+        if stream.finished:
+            self._finish_stream(rid)
+
+    def _finish_stream(self, rid):
+        stream = self.streams.pop(rid)
+        digest = stream.writer.commit()
+        self._record_body(rid, digest, stream.binary, streamed=True)
+
+    def on_event(self, method, params):
+        rid = params.get("requestId", "")
+        if method == "Network.dataReceived":
+            stream = self.streams.get(rid)
+            received = self.received.get(rid)
+            if received is not None:
+                before = received[0]
+                received[0] += params.get("dataLength") or 0
+                if stream is None and before <= BODY_MAX_BYTES < received[0]:
+                    self._start_stream(rid, received[1])
+                    return
+            if stream is not None and params.get("data"):
+                try:
+                    stream.chunk(base64.b64decode(params["data"]))
+                except OSError:
+                    # Disk full or similar: give up on this body, keep collecting.
+                    self.streams.pop(rid).writer.discard()
+            return
+        offset = _write_event(self.sink, method, params)
+        delta = network_index_delta(method, params)
+        if delta:
+            delta["off"] = offset
+            self.index.write_json(delta)
+        if method in ("Network.requestWillBeSent", "Network.responseReceived"):
+            rt = params.get("type", "")
+            if rt and rid:
+                # responseReceived has the final type — overwrites any
+                # earlier value from requestWillBeSent.
+                self.req_type[rid] = rt
+            if method == "Network.responseReceived" and self._wants_body(rid):
+                resp = params.get("response", {})
+                headers = {k.lower(): v for k, v in (resp.get("headers") or {}).items()}
+                try:
+                    declared = int(headers.get("content-length", 0))
+                except ValueError:
+                    declared = 0
+                if declared > BODY_MAX_BYTES:
+                    self._start_stream(rid, resp.get("mimeType", ""))
+                else:
+                    self.received[rid] = [0, resp.get("mimeType", "")]
+        elif method == "Network.loadingFinished":
+            decoded = self.received.pop(rid, [0])[0]
+            stream = self.streams.get(rid)
+            if stream is not None:
+                stream.finished = True
+                if stream.is_enabled:
+                    self._finish_stream(rid)
+            else:
+                # `decoded` also keeps out a body whose late stream was refused.
+                size = params.get("encodedDataLength", 0) or 0
+                if self._wants_body(rid) and 0 < size < BODY_MAX_BYTES and decoded <= BODY_MAX_BYTES:
+                    self.queue.append(rid)
+                    self._pump()
+            # Type was only needed to decide body capture; drop now to keep
+            # req_type bounded to in-flight requests.
+            self.req_type.pop(rid, None)
+        elif method == "Network.loadingFailed":
+            self.req_type.pop(rid, None)
+            self.received.pop(rid, None)
+            stream = self.streams.pop(rid, None)
+            if stream is not None:
+                stream.writer.discard()
+
+    def close(self):
+        for stream in self.streams.values():
+            stream.writer.discard()
+        self.streams = {}
+        self.index.close()
+        self.sink.close()
+
+
+class _BodyStream:
+    """One streamed body. dataReceived chunks can arrive before the
+    streamResourceContent reply that carries the already-buffered prefix,
+    so chunks are held until that prefix is written."""
+
+    def __init__(self, writer, binary):
+        self.writer = writer
+        self.binary = binary
+        self.is_enabled = False
+        self.finished = False
+        self._early = []
+
+    def enabled(self, buffered):
+        self.writer.write(buffered)
+        for chunk in self._early:
+            self.writer.write(chunk)
+        self._early = []
+        self.is_enabled = True
+
+    def chunk(self, data):
+        if self.is_enabled:
+            self.writer.write(data)
+        else:
+            self._early.append(data)
+
+
+class _ConsoleCapture(_Capture):
+    """Console API calls and uncaught exceptions, deduplicated and bounded.
+
+    A message identical (level, text, source) to one seen within
+    CONSOLE_DEDUP_WINDOW is only counted; counts reach the index every
+    REPEAT_FLUSH_INTERVAL. New non-error messages past a CONSOLE_RATE token
+    bucket are dropped and counted — errors are never dropped. See
+    "Console log" above for the files.
+
+    Runtime.enable is held anyway, so the capture also keeps a
+    FrameContextCache current and persists it: foreground
+    `evaluate --frame/--frame-url` calls resolve frames with a dictionary
+    lookup while the capture runs.
+    """
+
+    name = "console"
+    cdp_domains = ("Runtime", "Page")
+    sink_events = frozenset({"Runtime.consoleAPICalled", "Runtime.exceptionThrown"})
+    events = sink_events | {
+        "Runtime.executionContextCreated",
+        "Runtime.executionContextDestroyed",
+        "Runtime.executionContextsCleared",
+        "Page.frameNavigated",
+        "Page.frameDetached",
+    }
+
+    def open(self):
+        for base in (CONSOLE_ROTATED, CONSOLE_INDEX_ROTATED):
+            for ext in ("",) + tuple(COMPRESSIONS.values()):
+                _unlink(base + ext)
+        self._open_segment()
+        self.frames = FrameContextCache(self.daemon.target_id)
+        self.seq = 0
+        self.recent = {}  # (level, text, source) -> [seq, count, first t, last t, flushed count]
+        self.tokens = CONSOLE_BURST
+        self.refilled = time.time()
+        self.last_flush = 0.0
+
+    def _open_segment(self):
+        self.sink = _BufferedSink(CONSOLE_EVENTS, self.options.get("compress"))
+        self.index = _BufferedSink(CONSOLE_INDEX)
+        self.dropped = 0
+        self.dropped_flushed = 0
+
+    def _ready(self, data):
+        self.daemon.call("Page.getFrameTree", callback=self._on_frame_tree)
+        self.frames.save()
+        super()._ready(data)
+
+    def tick(self, now):
+        if now - self.last_flush >= REPEAT_FLUSH_INTERVAL:
+            self._flush_counts(now)
+        self.sink.tick(now)
+        self.index.tick(now)
+
+    def _on_frame_tree(self, data):
+        self.frames.observe_frame_tree(data.get("result", {}).get("frameTree", {}))
+        self.frames.save()
+
+    def on_event(self, method, params):
+        if method in self.sink_events:
+            self._record(method, params)
+        # The executionContextCreated burst for existing contexts arrives
+        # before the Runtime.enable ack — it lands here like any other event.
+        elif self.frames.observe({"method": method, "params": params}):
+            self.frames.save()
+
+    def _take_token(self, now):
+        self.tokens = min(CONSOLE_BURST, self.tokens + (now - self.refilled) * CONSOLE_RATE)
+        self.refilled = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def _record(self, method, params):
+        now = time.time()
+        level, text, source = console_message(method, params)
+        key = (level, text[:CONSOLE_ARG_MAX], source)
+        hit = self.recent.get(key)
+        if hit is not None and now - hit[2] <= CONSOLE_DEDUP_WINDOW:
+            hit[1] += 1
+            hit[3] = now
+            return
+        if level != "error" and not self._take_token(now):
+            self.dropped += 1
+            return
+        if self.sink.offset >= CONSOLE_SEGMENT_BYTES:
+            self._rotate(now)
+        self.seq += 1
+        offset = self.sink.write_json({
+            "t": now, "seq": self.seq, "method": method,
+            "params": _cap_console_params(method, params),
+        })
+        self.index.write_json({"s": self.seq, "o": offset, "l": level})
+        self.recent[key] = [self.seq, 1, now, now, 1]
+
+    def _flush_counts(self, now):
+        for key, hit in list(self.recent.items()):
+            if hit[1] != hit[4]:
+                self.index.write_json({"s": hit[0], "n": hit[1], "last": round(hit[3], 3)})
+                hit[4] = hit[1]
+            if now - hit[2] > CONSOLE_DEDUP_WINDOW:
+                del self.recent[key]
+        if self.dropped != self.dropped_flushed:
+            self.index.write_json({"dropped": self.dropped})
+            self.dropped_flushed = self.dropped
+        self.last_flush = now
+
+    def _rotate(self, now):
+        """Move the full segment to console-*.1.jsonl (replacing the older one)."""
+        self._flush_counts(now)
+        self.sink.close()
+        self.index.close()
+        for base in (CONSOLE_ROTATED, CONSOLE_INDEX_ROTATED):
+            for ext in ("",) + tuple(COMPRESSIONS.values()):
+                _unlink(base + ext)
+        os.replace(self.sink.path, CONSOLE_ROTATED + self.sink.path[len(CONSOLE_EVENTS):])
+        os.replace(self.index.path, CONSOLE_INDEX_ROTATED)
+        # Repeat counts refer to lines in their own segment: start dedup afresh.
+        self.recent.clear()
+        self._open_segment()
+
+    def close(self):
+        self._flush_counts(time.time())
+        self.frames.discard()
+        self.sink.close()
+        self.index.close()
+
+
+class _TraceCapture(_Capture):
+    """Tracing.start … Tracing.end on the collector's session.
+
+    Tracing state is session-scoped, so start and end must come from the
+    same connection — the daemon holds it between perf_start and perf_stop.
+    Tracing runs with transferMode ReturnAsStream: Chrome keeps the trace on
+    its side and tracingComplete hands back an IO stream handle, which is
+    pulled with IO.read one TRACE_READ_CHUNK at a time into a .part file
+    (renamed to trace_path() at eof). Memory stays flat whatever the trace
+    size; with compress="gzip" Chrome gzips the stream and the bytes are
+    written as-is.
+
+    Optional network_conditions / cpu_rate are pushed onto the daemon's
+    emulation stack before Tracing.start and popped right after Tracing.end,
+    so throttling covers exactly the recorded window; popping restores
+    whatever `emulate` still holds rather than clearing it.
+    """
+
+    name = "perf"
+    events = frozenset({"Tracing.tracingComplete"})
+
+    def open(self):
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        self.compress = self.options.get("compress")
+        self.path = trace_path(self.daemon.target_id, self.compress)
+        _unlink(trace_path(self.daemon.target_id))
+        _unlink(trace_path(self.daemon.target_id, "gzip"))
+        self.sink = None
+        self.handle = None
+        self.started = False
+        self.done = False
+
+    def start(self):
+        self.daemon.push_emulation(self)
+        params = {"transferMode": "ReturnAsStream", "streamFormat": "json"}
+        if self.compress:
+            params["streamCompression"] = "gzip"
+        if self.options.get("categories"):
+            params["categories"] = self.options["categories"]
+        self.daemon.call("Tracing.start", params, callback=self._ready)
+
+    def _ready(self, data):
+        self.started = "error" not in data
+        super()._ready(data)
+
+    def on_event(self, method, params):
+        if method != "Tracing.tracingComplete" or self.sink is not None:
+            return
+        self.handle = params.get("stream")
+        if not self.handle:
+            self.done = True  # no stream: Chrome dropped the trace
+            return
+        self.sink = open(self.path + ".part", "wb")
+        self.progress = 0
+        self._read()
+
+    def _read(self):
+        self.daemon.call("IO.read", {"handle": self.handle, "size": TRACE_READ_CHUNK},
+                         callback=self._on_read)
+
+    def _on_read(self, data):
+        if self.done or self.sink.closed:
+            return
+        if "error" in data:
+            self.close()
+            self.done = True
+            return
+        result = data.get("result", {})
+        chunk = result.get("data", "")
+        if result.get("base64Encoded"):
+            chunk = base64.b64decode(chunk)
+        else:
+            chunk = chunk.encode("utf-8")
+        self.sink.write(chunk)
+        self.progress += len(chunk)
+        self.daemon.drain_progress(self)
+        if not result.get("eof"):
+            self._read()
+            return
+        self.sink.close()
+        os.replace(self.path + ".part", self.path)
+        self.daemon.call("IO.close", {"handle": self.handle})
+        self.done = True
+
+    def stop(self):
+        if self.started:
+            self.daemon.call("Tracing.end")
+        self.daemon.pop_emulation(self)
+        return not self.started
+
+    def close(self):
+        if self.done:
+            return
+        if self.handle:
+            self.daemon.call("IO.close", {"handle": self.handle})
+        if self.sink is not None:
+            self.sink.close()
+            _unlink(self.path + ".part")
+
+
+class _MetricsCapture(_Capture):
+    """Performance.getMetrics sampled every `interval` seconds.
+
+    The sink is columnar to stay small over hours of sampling: a
+    {"names": [...]} line whenever the metric set changes, then one
+    {"t": epoch, "v": [values]} line per sample. iter_metrics() folds it
+    back into (t, {name: value}).
+    """
+
+    name = "metrics"
+    cdp_domains = ("Performance",)
+
+    def open(self):
+        self.sink = _BufferedSink(METRICS_EVENTS)
+        self.interval = max(POLL_INTERVAL, float(self.options.get("interval") or METRICS_INTERVAL))
+        self.names = None
+        self.next_sample = 0.0
+        self.pending = False
+
+    def tick(self, now):
+        if self.daemon.active.get(self.name) and not self.pending and now >= self.next_sample:
+            self.pending = True
+            self.next_sample = now + self.interval
+            self.daemon.call("Performance.getMetrics", callback=self._on_metrics)
+        self.sink.tick(now)
+
+    def _on_metrics(self, data):
+        self.pending = False
+        if self.sink.closed:
+            return
+        metrics = data.get("result", {}).get("metrics", [])
+        if not metrics:
+            return
+        names = [m["name"] for m in metrics]
+        if names != self.names:
+            self.names = names
+            self.sink.write_json({"names": names})
+        self.sink.write_json({"t": round(time.time(), 3), "v": [m["value"] for m in metrics]})
+
+    def close(self):
+        self.sink.close()
+
+
+def iter_metrics():
+    """Yield (t, {metric: value}) samples from the metrics sink."""
+    names = []
+    for _, entry in iter_events(METRICS_EVENTS):
+        if "names" in entry:
+            names = entry["names"]
+        elif "v" in entry:
+            yield entry["t"], dict(zip(names, entry["v"]))
+
+
+class _RouteCapture(_Capture):
+    """Fetch-domain interception: block, serve fixtures, add latency.
+
+    Options (built by route_start): block_types (Network.ResourceType
+    names), block_urls (wildcard patterns), fixtures (directory), latency
+    (ms) and latency_url (pattern; default every request). Every paused
+    request gets exactly one answer, in rule order: a fixture file at
+    {fixtures}/{host}{path} or {fixtures}{path} (index.html for a trailing
+    slash) → Fetch.fulfillRequest; a blocked type or URL →
+    Fetch.failRequest(BlockedByClient); otherwise Fetch.continueRequest.
+    Latency holds the answer in a heap released by tick(), so it has
+    POLL_INTERVAL granularity.
+
+    Fetch.enable patterns are narrowed to what the rules can match — with
+    only type/URL blocking, unrelated requests are never paused. Actions
+    other than a plain continue are logged to route-log.jsonl.
+    """
+
+    name = "route"
+    events = frozenset({"Fetch.requestPaused"})
+
+    def open(self):
+        self.block_types = set(self.options.get("block_types") or ())
+        self.block_urls = list(self.options.get("block_urls") or ())
+        self.fixtures = self.options.get("fixtures")
+        self.latency = (self.options.get("latency") or 0) / 1000
+        self.latency_url = self.options.get("latency_url")
+        self.delayed = []  # heap of (due, seq, method, params)
+        self.seq = 0
+        self.log = _BufferedSink(ROUTE_LOG)
+
+    def _patterns(self):
+        if self.fixtures or (self.latency and not self.latency_url):
+            return [{"urlPattern": "*"}]
+        patterns = [{"urlPattern": "*", "resourceType": t} for t in sorted(self.block_types)]
+        patterns += [{"urlPattern": u} for u in self.block_urls]
+        if self.latency:
+            patterns.append({"urlPattern": self.latency_url})
+        return patterns
+
+    def start(self):
+        self.daemon.call("Fetch.enable", {"patterns": self._patterns()}, callback=self._ready)
+
+    def _fixture(self, url):
+        parts = urllib.parse.urlsplit(url)
+        path = urllib.parse.unquote(parts.path or "/")
+        if path.endswith("/"):
+            path += "index.html"
+        root = os.path.realpath(self.fixtures)
+        for candidate in (os.path.join(root, parts.hostname or "", path.lstrip("/")),
+                          os.path.join(root, path.lstrip("/"))):
+            candidate = os.path.realpath(candidate)
+            # Never serve outside the fixture root ("/../" in the URL path).
+            if candidate.startswith(root + os.sep) and os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def _answer(self, params):
+        request_id = params["requestId"]
+        url = params.get("request", {}).get("url", "")
+        fixture = self._fixture(url) if self.fixtures else None
+        if fixture is not None:
+            with open(fixture, "rb") as f:
+                body = f.read()
+            mime = mimetypes.guess_type(fixture)[0] or "application/octet-stream"
+            return "fulfill", "Fetch.fulfillRequest", {
+                "requestId": request_id,
+                "responseCode": 200,
+                "responseHeaders": [
+                    {"name": "Content-Type", "value": mime},
+                    {"name": "Content-Length", "value": str(len(body))},
+                    {"name": "Access-Control-Allow-Origin", "value": "*"},
+                ],
+                "body": base64.b64encode(body).decode("ascii"),
+            }
+        if params.get("resourceType") in self.block_types or any(
+                fnmatch.fnmatchcase(url, pattern) for pattern in self.block_urls):
+            return "block", "Fetch.failRequest", {"requestId": request_id, "errorReason": "BlockedByClient"}
+        return "continue", "Fetch.continueRequest", {"requestId": request_id}
+
+    def on_event(self, method, params):
+        action, call, call_params = self._answer(params)
+        url = params.get("request", {}).get("url", "")
+        delay = 0
+        if action != "block" and self.latency and (
+                not self.latency_url or fnmatch.fnmatchcase(url, self.latency_url)):
+            delay = self.latency
+        if action != "continue" or delay:
+            self.log.write_json({
+                "t": round(time.time(), 3), "action": action, "delay_ms": int(delay * 1000),
+                "type": params.get("resourceType", ""), "url": url,
+            })
+        if delay:
+            self.seq += 1
+            heapq.heappush(self.delayed, (time.time() + delay, self.seq, call, call_params))
+        else:
+            self.daemon.call(call, call_params)
+
+    def tick(self, now):
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, call, call_params = heapq.heappop(self.delayed)
+            self.daemon.call(call, call_params)
+        self.log.tick(now)
+
+    def stop(self):
+        # Release held requests now rather than leaving them paused.
+        while self.delayed:
+            _, _, call, call_params = heapq.heappop(self.delayed)
+            self.daemon.call(call, call_params)
+        self.daemon.call("Fetch.disable")
+        return True
+
+    def close(self):
+        self.log.close()
+
+
+VITALS_BINDING = "__cdpAttachVitals"
+
+# Installed in every new top-level document (and evaluated once in the current
+# one). Buffered observers also report what happened before installation.
+# Each report: {nav: performance.timeOrigin, url, name, value, ...} → binding.
+VITALS_SCRIPT = """(() => {
+  if (window !== window.top || window.__cdpAttachVitalsInstalled) return;
+  window.__cdpAttachVitalsInstalled = true;
+  const nav = performance.timeOrigin;
+  const send = (name, value, extra) => {
+    try {
+      window.%(binding)s(JSON.stringify(Object.assign({nav, url: location.href, name, value}, extra)));
+    } catch (e) {}
+  };
+  const observe = (type, fn, opts) => {
+    try {
+      new PerformanceObserver((list) => list.getEntries().forEach(fn))
+        .observe(Object.assign({type, buffered: true}, opts));
+    } catch (e) {}  // entry type unsupported in this browser
+  };
+  observe('navigation', (e) => send('ttfb', e.responseStart));
+  observe('paint', (e) => { if (e.name === 'first-contentful-paint') send('fcp', e.startTime); });
+  observe('largest-contentful-paint', (e) =>
+    send('lcp', e.startTime, {element: e.element ? e.element.tagName.toLowerCase() : ''}));
+  // CLS: largest session window (gaps < 1s, window < 5s), ignoring input-driven shifts.
+  let cls = 0, win = 0, winStart = 0, last = 0;
+  observe('layout-shift', (e) => {
+    if (e.hadRecentInput) return;
+    if (e.startTime - last > 1000 || e.startTime - winStart > 5000) { win = 0; winStart = e.startTime; }
+    win += e.value;
+    last = e.startTime;
+    if (win > cls) { cls = win; send('cls', cls); }
+  });
+  // INP: slowest interaction (max event duration per interactionId).
+  const interactions = {};
+  let inp = 0;
+  observe('event', (e) => {
+    if (!e.interactionId) return;
+    const d = Math.max(interactions[e.interactionId] || 0, e.duration);
+    interactions[e.interactionId] = d;
+    if (d > inp) { inp = d; send('inp', inp, {event: e.name}); }
+  }, {durationThreshold: 16});
+  observe('longtask', (e) => send('longtask', e.duration, {start: e.startTime}));
+})();""" % {"binding": VITALS_BINDING}
+
+
+class _VitalsCapture(_Capture):
+    """Web vitals from an in-page PerformanceObserver script, via Runtime.addBinding.
+
+    The binding and the init script are both session-scoped, so they live
+    on the collector's session: reports arrive as Runtime.bindingCalled and
+    are appended to vitals.jsonl. load_vitals() folds them per navigation.
+    """
+
+    name = "vitals"
+    cdp_domains = ("Runtime",)
+    events = frozenset({"Runtime.bindingCalled"})
+
+    def open(self):
+        self.sink = _BufferedSink(VITALS_EVENTS)
+        self.identifier = None
+
+    def start(self):
+        self.daemon.acquire("Runtime")
+        self.daemon.call("Runtime.addBinding", {"name": VITALS_BINDING})
+        self.daemon.call("Page.addScriptToEvaluateOnNewDocument", {"source": VITALS_SCRIPT},
+                         callback=self._on_script)
+        self.daemon.call("Runtime.evaluate", {"expression": VITALS_SCRIPT}, callback=self._ready)
+
+    def _on_script(self, data):
+        self.identifier = data.get("result", {}).get("identifier")
+
+    def on_event(self, method, params):
+        if params.get("name") != VITALS_BINDING:
+            return
+        try:
+            report = json.loads(params.get("payload", ""))
+        except ValueError:
+            return
+        if isinstance(report, dict):
+            self.sink.write_json(dict(report, t=round(time.time(), 3)))
+
+    def tick(self, now):
+        self.sink.tick(now)
+
+    def stop(self):
+        if self.identifier:
+            self.daemon.call("Page.removeScriptToEvaluateOnNewDocument", {"identifier": self.identifier})
+        self.daemon.call("Runtime.removeBinding", {"name": VITALS_BINDING})
+        return super().stop()
+
+    def close(self):
+        self.sink.close()
+
+
+def load_vitals():
+    """Per-navigation vitals, oldest first: {"nav", "url", "t", metric: value, "long_tasks", "long_task_ms"}."""
+    navs = {}
+    for _, report in iter_events(VITALS_EVENTS):
+        key = report.get("nav")
+        nav = navs.get(key)
+        if nav is None:
+            nav = navs[key] = {"nav": key, "url": report.get("url", ""), "t": report.get("t"),
+                               "long_tasks": 0, "long_task_ms": 0.0}
+        name, value = report.get("name"), report.get("value")
+        if name == "longtask":
+            nav["long_tasks"] += 1
+            nav["long_task_ms"] += value or 0
+        elif name in ("lcp", "cls", "inp", "ttfb", "fcp"):
+            # Later reports supersede earlier ones (LCP candidates, growing CLS/INP).
+            nav[name] = value
+    return list(navs.values())
+
+
+class _ThrottleCapture(_Capture):
+    """Network conditions / CPU slowdown set by `v3 emulate`, held on this session.
+
+    Emulation state belongs to the session that set it, so a foreground
+    command's throttling would end when it exits. Here it lasts until
+    emulate_reset stops the capture (or the collector expires). Like perf's,
+    it goes through the daemon's emulation stack, so a trace recorded with
+    its own throttling hands this back when it stops.
+    """
+
+    name = "throttle"
+
+    def start(self):
+        # The last setter's reply marks the capture active (or reports the error).
+        self.daemon.push_emulation(self, callback=self._ready)
+
+    def stop(self):
+        self.daemon.pop_emulation(self)
+        return True
+
+
+class _HealthCapture(_Capture):
+    """Renderer liveness: a cheap Runtime.evaluate("1") every interval.
+
+    Same busy-vs-wedged rule as the post-navigation probe: a reply that is
+    HEALTH_TIMEOUTS[0] late marks the tab busy (long main-thread task), one
+    that is sum(HEALTH_TIMEOUTS) late marks it wedged. The outstanding probe
+    keeps waiting either way, so a late answer clears the mark. Records go to
+    state.json (cdp_client.set_target_health) on every status change and at
+    least every HEALTH_WRITE_INTERVAL, which keeps a wedged mark fresh enough
+    for CDPClient.connect() to fail fast on it.
+    """
+
+    name = "health"
+    per_target = True
+
+    def open(self):
+        self.interval = self.options.get("interval", HEALTH_INTERVAL)
+        self.history = collections.deque(maxlen=HEALTH_HISTORY)
+        self.status = "ok"
+        self.since = time.time()
+        self.sent = None
+        self.next_probe = 0.0
+        self.written = 0.0
+        self.probes = 0
+
+    def start(self):
+        self._ready({})
+
+    def _answer(self, data):
+        now = time.time()
+        self.history.append(round((now - self.sent) * 1000))
+        self.sent = None
+        self.next_probe = now + self.interval
+        self.probes += 1
+        self._set("ok", now)
+
+    def _set(self, status, now, since=None):
+        if status != self.status:
+            self.status, self.since = status, since or now
+        elif now - self.written < HEALTH_WRITE_INTERVAL:
+            return
+        self.written = now
+        set_target_health(self.daemon.target_id, {
+            "status": self.status,
+            "since": round(self.since, 3),
+            "t": round(now, 3),
+            "latency_ms": self.history[-1] if self.history else None,
+            "history": list(self.history),
+            "probes": self.probes,
+            "interval": self.interval,
+        })
+
+    def tick(self, now):
+        if self.sent is None:
+            if now >= self.next_probe:
+                self.sent = now
+                self.daemon.call("Runtime.evaluate", {"expression": "1", "returnByValue": True},
+                                 callback=self._answer)
+            return
+        waited = now - self.sent
+        # `since` is when the unanswered probe went out: the silence started there.
+        if waited >= sum(HEALTH_TIMEOUTS):
+            self._set("wedged", now, self.sent)
+        elif waited >= HEALTH_TIMEOUTS[0]:
+            self._set("busy", now, self.sent)
+
+    def close(self):
+        set_target_health(self.daemon.target_id, None)
+
+
+CAPTURES = {cls.name: cls for cls in (
+    _NetworkCapture, _ConsoleCapture, _TraceCapture, _MetricsCapture, _RouteCapture,
+    _VitalsCapture, _ThrottleCapture, _HealthCapture,
+)}
+
+
+class _CollectorDaemon:
+    """The forked process: one WebSocket, many captures."""
+
+    def __init__(self, host, port, target_id):
+        self.host = host
+        self.port = port
+        self.target_id = target_id
+        self.ws = None
+        self.msg_id = 0
+        self.callbacks = {}   # msg id -> (owning capture, fn(response))
+        self._owner = None    # capture whose hook is running (owns new callbacks)
+        self.refcount = {}    # CDP domain -> number of captures holding it
+        self.captures = {}    # name -> running _Capture
+        self.draining = []    # (capture, deadline) stopped but still flushing
+        self.active = {}      # name -> epoch, once enabled
+        self.errors = {}      # name -> {"epoch", "message"}
+        self.emulation = []   # (capture, options) holding network_conditions / cpu_rate; last wins
+        self._network = None  # network conditions / CPU rate currently set on the session
+        self._cpu_rate = 1
+        self.expires = 0
+        self._progress_written = 0.0
+        self._reload = True
+        self._shutdown = False
+
+    # ── session plumbing ──
+
+    def call(self, method, params=None, callback=None):
+        self.msg_id += 1
+        if callback is not None:
+            self.callbacks[self.msg_id] = (self._owner, callback)
+        payload = {"id": self.msg_id, "method": method}
+        if params:
+            payload["params"] = params
+        self.ws.send(json.dumps(payload))
+        return self.msg_id
+
+    def acquire(self, domain, callback=None):
+        """Enable a CDP domain unless another capture already holds it."""
+        self.refcount[domain] = self.refcount.get(domain, 0) + 1
+        if self.refcount[domain] == 1:
+            self.call(f"{domain}.enable", callback=callback)
+        elif callback is not None:
+            callback({})
+
+    def release(self, domain):
+        self.refcount[domain] = self.refcount.get(domain, 1) - 1
+        if self.refcount[domain] <= 0:
+            del self.refcount[domain]
+            self.call(f"{domain}.disable")
+
+    def push_emulation(self, capture, callback=None):
+        """Apply `capture`'s network_conditions / cpu_rate over any held by others."""
+        self.emulation.append((capture, capture.options))
+        self._apply_emulation(callback)
+
+    def pop_emulation(self, capture):
+        """Drop `capture`'s throttling; the next holder's (or none) takes effect."""
+        if any(c is capture for c, _ in self.emulation):
+            self.emulation = [(c, o) for c, o in self.emulation if c is not capture]
+            self._apply_emulation()
+
+    def _apply_emulation(self, callback=None):
+        """Set the most recent holder's network and CPU throttling, each on its own.
+
+        Only changed settings are sent; `callback` gets the last reply ({} when
+        nothing changed).
+        """
+        network = next((o["network_conditions"] for _, o in reversed(self.emulation)
+                        if o.get("network_conditions")), None)
+        cpu_rate = next((o["cpu_rate"] for _, o in reversed(self.emulation)
+                         if o.get("cpu_rate")), 1)
+        calls = []
+        if network != self._network:
+            if self._network is None:
+                self.acquire("Network")
+            calls.append(("Network.emulateNetworkConditions", network or NO_THROTTLING))
+        if cpu_rate != self._cpu_rate:
+            calls.append(("Emulation.setCPUThrottlingRate", {"rate": cpu_rate}))
+        for method, params in calls[:-1]:
+            self.call(method, params)
+        if calls:
+            self.call(*calls[-1], callback=callback)
+        elif callback is not None:
+            callback({})
+        if network is None and self._network is not None:
+            self.release("Network")
+        self._network, self._cpu_rate = network, cpu_rate
+
+    def capture_ready(self, capture, data):
+        epoch = capture.options.get("epoch")
+        if self.captures.get(capture.name) is not capture:
+            return
+        if "error" in data:
+            self.errors[capture.name] = {
+                "epoch": epoch,
+                "message": data["error"].get("message", str(data["error"])),
+            }
+            self._stop(capture.name)
+        else:
+            self.active[capture.name] = epoch
+        self._write_status()
+
+    def drain_progress(self, capture):
+        """A draining capture made progress: push its deadline out, publish it (throttled)."""
+        now = time.time()
+        self.draining = [(c, now + DRAIN_TIMEOUT if c is capture else deadline)
+                         for c, deadline in self.draining]
+        if now - self._progress_written >= PROGRESS_INTERVAL:
+            self._write_status()
+
+    # ── capture lifecycle ──
+
+    def _run_hook(self, capture, hook, *args):
+        """Run one capture's hook and return its result.
+
+        An exception stops that capture, not the collector: it is failed and
+        the hook returns None.
+        """
+        if capture is None:
+            return hook(*args)
+        if capture.failed:
+            return None
+        outer, self._owner = self._owner, capture
+        try:
+            return hook(*args)
+        except Exception as e:
+            self._fail(capture, e)
+            return None
+        finally:
+            self._owner = outer
+
+    def _fail(self, capture, exc):
+        """Record a capture's failure (status errors + error log) and stop only it."""
+        capture.failed = True
+        _log_collector_error(self.target_id, f"{capture.name} capture failed: {exc!r}")
+        self.errors[capture.name] = {"epoch": capture.options.get("epoch"), "message": str(exc)}
+        if self.captures.get(capture.name) is capture:
+            del self.captures[capture.name]
+            self.active.pop(capture.name, None)
+        self.draining = [(c, d) for c, d in self.draining if c is not capture]
+        # Best effort, skipping the stages it already went through (or failed
+        # in): release its domains (route: continue paused requests), then sinks.
+        cleanups = []
+        if capture.stage == "started":
+            cleanups.append(capture.stop)
+        if any(c is capture for c, _ in self.emulation):
+            cleanups.append(lambda: self.pop_emulation(capture))
+        if capture.stage != "closed":
+            cleanups.append(capture.close)
+        capture.stage = "closed"
+        for cleanup in cleanups:
+            try:
+                cleanup()
+            except Exception:
+                pass
+        self._write_status()
+
+    def _start(self, name, options):
+        capture = CAPTURES[name](self, options)
+        self.captures[name] = capture
+        self.errors.pop(name, None)
+        self._run_hook(capture, capture.open)
+        if not capture.failed:
+            capture.stage = "started"
+            self._run_hook(capture, capture.start)
+
+    def _stop(self, name):
+        capture = self.captures.pop(name)
+        self.active.pop(name, None)
+        capture.stage = "stopped"
+        drained = self._run_hook(capture, capture.stop)
+        if capture.failed:
+            return
+        if drained:
+            self._close(capture)
+        else:
+            self.draining.append((capture, time.time() + DRAIN_TIMEOUT))
+
+    def _close(self, capture):
+        capture.stage = "closed"
+        self._run_hook(capture, capture.close)
+
+    def _apply_spec(self):
+        spec = _read_json(_spec_path(self.target_id)) or {}
+        wanted = {n: o for n, o in spec.get("domains", {}).items() if n in CAPTURES}
+        self.expires = spec.get("expires", 0)
+        for name in list(self.captures):
+            if wanted.get(name) != self.captures[name].options:
+                self._stop(name)
+        for name, options in wanted.items():
+            if name not in self.captures:
+                self._start(name, options)
+        self._write_status()
+
+    def _write_status(self):
+        atomic_write_json(_status_path(self.target_id), {
+            "pid": os.getpid(),
+            "target_id": self.target_id,
+            "expires": self.expires,
+            "active": self.active,
+            "starting": [n for n in self.captures if n not in self.active],
+            "draining": [c.name for c, _ in self.draining],
+            "progress": {c.name: c.progress for c, _ in self.draining if c.progress is not None},
+            "errors": self.errors,
+        })
+        self._progress_written = time.time()
+
+    def _claim(self):
+        """Become the target's collector unless a live one already exists."""
+        with _spec_lock(self.target_id):
+            existing = collector_status(self.target_id)
+            if existing and existing["pid"] != os.getpid():
+                return False
+            self._write_status()
+            return True
+
+    def _idle_exit(self):
+        """Under the spec lock: exit when nothing is wanted (or expired)."""
+        with _spec_lock(self.target_id):
+            spec = _read_json(_spec_path(self.target_id)) or {}
+            if spec.get("domains") and time.time() < spec.get("expires", 0):
+                return False
+            self._cleanup_files()
+            return True
+
+    def _cleanup_files(self):
+        status = _read_json(_status_path(self.target_id)) or {}
+        if status.get("pid") == os.getpid():
+            _unlink(_status_path(self.target_id))
+            _unlink(_spec_path(self.target_id))
+
+    # ── main loop ──
+
+    def run(self):
+        import websocket
+
+        def _handle_sighup(*_):
+            self._reload = True
+
+        def _handle_sigterm(*_):
+            self._shutdown = True
+
+        signal.signal(signal.SIGHUP, _handle_sighup)
+        signal.signal(signal.SIGTERM, _handle_sigterm)
+        if not self._claim():
+            return
+
+        try:
+            self.ws = websocket.create_connection(
+                f"ws://{self.host}:{self.port}/devtools/page/{self.target_id}",
+                timeout=START_TIMEOUT,
+                suppress_origin=True,
+            )
+            self.ws.settimeout(POLL_INTERVAL)
+            while True:
+                if self._reload:
+                    self._reload = False
+                    self._apply_spec()
+                now = time.time()
+                for capture in list(self.captures.values()):
+                    self._run_hook(capture, capture.tick, now)
+                self._expire_drains()
+                if self._shutdown or time.time() >= self.expires:
+                    self._stop_all()
+                    self._shutdown = True
+                if not self.captures and not self.draining and (
+                        self._shutdown or self._idle_exit()):
+                    break
+                try:
+                    data = json.loads(self.ws.recv())
+                except websocket.WebSocketTimeoutException:
+                    continue
+                except (websocket.WebSocketConnectionClosedException, ConnectionError):
+                    break
+                self._dispatch(data)
+        finally:
+            for name in list(self.captures):
+                self._close(self.captures.pop(name))
+            for capture, _ in list(self.draining):
+                self._close(capture)
+            self.draining = []
+            with _spec_lock(self.target_id):
+                self._cleanup_files()
+            if self.ws is not None:
+                try:
+                    self.ws.close()
+                except Exception:
+                    pass
+
+    def _dispatch(self, data):
+        msg_id = data.get("id")
+        if msg_id is not None:
+            owner, callback = self.callbacks.pop(msg_id, (None, None))
+            if callback is not None:
+                self._run_hook(owner, callback, data)
+            return
+        method = data.get("method", "")
+        params = data.get("params", {})
+        for capture in list(self.captures.values()) + [c for c, _ in self.draining]:
+            if method in capture.events:
+                self._run_hook(capture, capture.on_event, method, params)
+
+    def _expire_drains(self):
+        if not self.draining:
+            return
+        now = time.time()
+        keep = []
+        for capture, deadline in self.draining:
+            if getattr(capture, "done", False) or now > deadline:
+                self._close(capture)
+            else:
+                keep.append((capture, deadline))
+        if len(keep) != len(self.draining):
+            self.draining = keep
+            self._write_status()
+
+    def _stop_all(self):
+        if self.captures:
+            for name in list(self.captures):
+                self._stop(name)
+            self._write_status()
@@ -0,0 +1,247 @@
+"""
+har_export — Stream the collector's network capture out as HAR 1.2.
+
+One pass over network-events.jsonl (any framing — plain, .gz, .zst): a
+request's events are folded into a pending entry and the entry is written
+as soon as loadingFinished / loadingFailed (or the next redirect hop)
+closes it, so memory tracks requests in flight, not capture size. Requests
+still open at the end of the capture are written last with status 0.
+Entries therefore appear in completion order; each carries its own
+startedDateTime.
+
+Timings follow the DevTools HAR conversion: Network.Response.timing offsets
+(ms relative to timing.requestTime) give dns/connect/ssl/send/wait, the gap
+between requestWillBeSent and requestTime counts as blocked, and receive
+runs to loadingFinished. Without CDP timing (cache, data: URLs) the whole
+duration is reported as receive, falling back to the collector's `t`
+stamps when CDP timestamps are missing.
+
+Stdlib only — imported by v3_advanced:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from har_export import write_har
+"""
+
+import base64
+import datetime
+import json
+import os
+import urllib.parse
+
+from collector import NETWORK_EVENTS, body_refs, iter_events, open_body
+
+HAR_VERSION = "1.2"
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+def _creator():
+    version = ""
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        with open(os.path.join(root, ".claude-plugin", "plugin.json")) as f:
+            version = json.load(f).get("version", "")
+    except (OSError, ValueError):
+        pass
+    return {"name": "cdp-attach", "version": version}
+
+
+def _iso(epoch_seconds):
+    dt = datetime.datetime.fromtimestamp(epoch_seconds, tz=datetime.timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _headers(headers):
+    return [{"name": k, "value": str(v)} for k, v in (headers or {}).items()]
+
+
+def _header(headers, name):
+    for k, v in (headers or {}).items():
+        if k.lower() == name:
+            return str(v)
+    return ""
+
+
+def _timings(pending, end_ts):
+    """HAR timings dict and total time (ms) for a pending entry."""
+    start_ts = pending.get("ts")
+    timing = (pending.get("response") or {}).get("timing")
+    if start_ts is not None and end_ts is not None:
+        total = max(0.0, (end_ts - start_ts) * 1000)
+    else:
+        total = max(0.0, (pending.get("t_end", pending["t"]) - pending["t"]) * 1000)
+    if not timing:
+        return {"blocked": -1, "dns": -1, "connect": -1, "send": 0, "wait": 0,
+                "receive": round(total, 3), "ssl": -1}, total
+
+    def span(a, b):
+        start, stop = timing.get(a, -1), timing.get(b, -1)
+        return stop - start if start >= 0 and stop >= 0 else -1
+
+    queued = max(0.0, (timing.get("requestTime", start_ts or 0) - (start_ts or 0)) * 1000)
+    first = next((timing[k] for k in ("dnsStart", "connectStart", "sendStart")
+                  if timing.get(k, -1) >= 0), 0)
+    send_end = timing.get("sendEnd", 0)
+    headers_end = timing.get("receiveHeadersEnd", send_end)
+    if end_ts is not None and timing.get("requestTime") is not None:
+        receive = max(0.0, (end_ts - timing["requestTime"]) * 1000 - headers_end)
+    else:
+        receive = 0.0
+    timings = {
+        "blocked": round(queued + first, 3),
+        "dns": round(span("dnsStart", "dnsEnd"), 3),
+        "connect": round(span("connectStart", "connectEnd"), 3),
+        "ssl": round(span("sslStart", "sslEnd"), 3),
+        "send": round(max(0.0, send_end - timing.get("sendStart", send_end)), 3),
+        "wait": round(max(0.0, headers_end - send_end), 3),
+        "receive": round(receive, 3),
+    }
+    # ssl is part of connect in HAR; it is not added to the total separately.
+    total = sum(v for k, v in timings.items() if k != "ssl" and v > 0)
+    return timings, total
+
+
+def _content(pending, rid, refs, include_bodies, max_body_bytes):
+    response = pending.get("response") or {}
+    content = {
+        "size": pending.get("size", -1) if pending.get("size") is not None else -1,
+        "mimeType": response.get("mimeType", "") or "x-unknown",
+    }
+    ref = refs.get(rid) if include_bodies else None
+    if ref is None:
+        return content
+    opened = open_body(ref)
+    if opened is None:
+        content["comment"] = "body evicted from the body store"
+        return content
+    f, binary = opened
+    with f:
+        data = f.read(max_body_bytes + 1)
+    if len(data) > max_body_bytes:
+        content["comment"] = f"body omitted (larger than {max_body_bytes} bytes)"
+        return content
+    content["size"] = len(data)
+    if binary:
+        content["text"] = base64.b64encode(data).decode("ascii")
+        content["encoding"] = "base64"
+    else:
+        content["text"] = data.decode("utf-8", "replace")
+    return content
+
+
+def _entry(rid, pending, refs, include_bodies, max_body_bytes, end_ts=None, redirect=None):
+    request = pending["request"]
+    response = redirect or pending.get("response") or {}
+    timings, total = _timings(pending, end_ts)
+    started = pending.get("wall") or pending["t"]
+    post = request.get("postData")
+    har_request = {
+        "method": request.get("method", ""),
+        "url": request.get("url", ""),
+        "httpVersion": response.get("protocol", "") or "HTTP/1.1",
+        "cookies": [],
+        "headers": _headers(request.get("headers")),
+        "queryString": [
+            {"name": k, "value": v}
+            for k, v in urllib.parse.parse_qsl(urllib.parse.urlsplit(request.get("url", "")).query,
+                                               keep_blank_values=True)
+        ],
+        "headersSize": -1,
+        "bodySize": len(post.encode("utf-8")) if post else 0,
+    }
+    if post:
+        har_request["postData"] = {
+            "mimeType": _header(request.get("headers"), "content-type"),
+            "text": post,
+        }
+    if redirect is not None:
+        content = {"size": 0, "mimeType": redirect.get("mimeType", "") or "x-unknown"}
+    else:
+        content = _content(pending, rid, refs, include_bodies, max_body_bytes)
+    entry = {
+        "startedDateTime": _iso(started),
+        "time": round(total, 3),
+        "request": har_request,
+        "response": {
+            "status": response.get("status", 0),
+            "statusText": response.get("statusText", "") or pending.get("error", ""),
+            "httpVersion": response.get("protocol", "") or "HTTP/1.1",
+            "cookies": [],
+            "headers": _headers(response.get("headers")),
+            "content": content,
+            "redirectURL": _header(response.get("headers"), "location"),
+            "headersSize": -1,
+            "bodySize": pending.get("size", -1) if pending.get("size") is not None else -1,
+        },
+        "cache": {},
+        "timings": timings,
+        "_resourceType": pending.get("type", ""),
+    }
+    if response.get("remoteIPAddress"):
+        entry["serverIPAddress"] = response["remoteIPAddress"]
+    if pending.get("error"):
+        entry["_error"] = pending["error"]
+    return entry
+
+
+def iter_har_entries(url_filter=None, include_bodies=True, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Yield HAR entries in completion order (see module docstring)."""
+    refs = body_refs() if include_bodies else {}
+    pending = {}
+    pattern = url_filter.lower() if url_filter else None
+
+    def wanted(p):
+        return pattern is None or pattern in p["request"].get("url", "").lower()
+
+    for _, event in iter_events(NETWORK_EVENTS):
+        method = event.get("method", "")
+        params = event.get("params", {})
+        rid = params.get("requestId")
+        if not rid:
+            continue
+        if method == "Network.requestWillBeSent":
+            previous = pending.pop(rid, None)
+            if previous is not None and params.get("redirectResponse") and wanted(previous):
+                # Same requestId for every hop: the redirect response closes the previous one.
+                previous["response"] = params["redirectResponse"]
+                yield _entry(rid, previous, refs, include_bodies, max_body_bytes,
+                             end_ts=params.get("timestamp"), redirect=params["redirectResponse"])
+            pending[rid] = {
+                "request": params.get("request", {}),
+                "ts": params.get("timestamp"),
+                "wall": params.get("wallTime"),
+                "t": event.get("t", 0),
+                "type": params.get("type", ""),
+            }
+            continue
+        p = pending.get(rid)
+        if p is None:
+            continue
+        if method == "Network.responseReceived":
+            p["response"] = params.get("response", {})
+            if params.get("type"):
+                p["type"] = params["type"]
+        elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+            del pending[rid]
+            p["t_end"] = event.get("t", p["t"])
+            if method == "Network.loadingFinished":
+                p["size"] = params.get("encodedDataLength")
+            else:
+                p["error"] = params.get("errorText", "") or ("canceled" if params.get("canceled") else "failed")
+            if wanted(p):
+                yield _entry(rid, p, refs, include_bodies, max_body_bytes, end_ts=params.get("timestamp"))
+    for rid, p in pending.items():
+        if wanted(p):
+            yield _entry(rid, p, refs, include_bodies, max_body_bytes)
+
+
+def write_har(out, url_filter=None, include_bodies=True, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Write a HAR 1.2 document to a text stream, one entry at a time. Returns the entry count."""
+    out.write('{"log": {"version": %s, "creator": %s, "pages": [], "entries": [\n'
+              % (json.dumps(HAR_VERSION), json.dumps(_creator())))
+    count = 0
+    for entry in iter_har_entries(url_filter, include_bodies, max_body_bytes):
+        if count:
+            out.write(",\n")
+        out.write(json.dumps(entry, ensure_ascii=False))
+        count += 1
+    out.write("\n]}}\n")
+    return count
@@ -0,0 +1,179 @@
+"""
+input_paths — Interpolated, timestamped pointer trajectories for drag / scroll / hover.
+
+Builds the Input.* CDP calls for a whole gesture up front so the caller can
+push them in one pipelined CDPClient.send_batch() instead of one round-trip
+(plus a sleep) per step. Every event carries an explicit `timestamp`
+(seconds since epoch, CDP TimeSinceEpoch) spaced by the requested rate, so
+pages that derive velocity from event.timeStamp (kinetic scrollers, drag
+thresholds, sortable lists) see a realistic gesture even though the events
+arrive back-to-back.
+
+Imported by v2_interact (scroll, hover) and v3_advanced (drag):
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from input_paths import trajectory, mouse_move_calls
+"""
+
+import time
+
+from cdp_client import CDPError
+
+CURVES = ("linear", "bezier")
+DEFAULT_RATE_HZ = 60
+# Perpendicular control-point offset as a fraction of the chord length. Small
+# enough that the arc stays inside typical drop zones, large enough that the
+# path is not a straight line (some drag libraries reject perfectly linear
+# synthetic paths as bot input).
+BEZIER_BEND = 0.2
+
+# Input.dispatchMouseEvent `buttons` bitmask (pressed buttons during a move).
+BUTTONS_MASK = {"none": 0, "left": 1, "right": 2, "middle": 4}
+
+
+def plan_steps(steps=None, duration_ms=None, rate_hz=DEFAULT_RATE_HZ, default=10):
+    """Resolve the number of interpolation steps.
+
+    An explicit `steps` wins; otherwise duration × rate; otherwise `default`.
+    Always at least 1. Raises CDPError for a non-positive rate (it also sets
+    the event spacing, so it must be usable even when steps is given).
+    """
+    if rate_hz <= 0:
+        raise CDPError(f"--rate must be positive (got {rate_hz:g})")
+    if steps:
+        return max(1, int(steps))
+    if duration_ms:
+        return max(1, round(duration_ms / 1000.0 * rate_hz))
+    return max(1, default)
+
+
+def _bezier_point(p0, p1, p2, p3, t):
+    u = 1 - t
+    return (
+        u * u * u * p0[0] + 3 * u * u * t * p1[0] + 3 * u * t * t * p2[0] + t * t * t * p3[0],
+        u * u * u * p0[1] + 3 * u * u * t * p1[1] + 3 * u * t * t * p2[1] + t * t * t * p3[1],
+    )
+
+
+def path_points(x1, y1, x2, y2, steps, curve="linear"):
+    """Return `steps` points from (x1, y1) (exclusive) to (x2, y2) (inclusive).
+
+    linear: evenly spaced along the chord.
+    bezier: cubic curve whose control points sit at 1/3 and 2/3 of the chord,
+            offset perpendicular to it by BEZIER_BEND × chord length.
+    """
+    if curve not in CURVES:
+        raise ValueError(f"Unknown curve {curve!r} (expected one of {', '.join(CURVES)})")
+    steps = max(1, int(steps))
+    if curve == "linear":
+        return [
+            (x1 + (x2 - x1) * i / steps, y1 + (y2 - y1) * i / steps)
+            for i in range(1, steps + 1)
+        ]
+    dx, dy = x2 - x1, y2 - y1
+    nx, ny = -dy * BEZIER_BEND, dx * BEZIER_BEND
+    p0 = (x1, y1)
+    p1 = (x1 + dx / 3 + nx, y1 + dy / 3 + ny)
+    p2 = (x1 + 2 * dx / 3 + nx, y1 + 2 * dy / 3 + ny)
+    p3 = (x2, y2)
+    return [_bezier_point(p0, p1, p2, p3, i / steps) for i in range(1, steps + 1)]
+
+
+def timestamps(count, interval_s, start=None):
+    """`count` event timestamps starting one interval after `start` (default: now)."""
+    base = time.time() if start is None else start
+    return [base + interval_s * i for i in range(1, count + 1)]
+
+
+def trajectory(x1, y1, x2, y2, curve="linear", steps=None, duration_ms=None,
+               rate_hz=DEFAULT_RATE_HZ, start=None):
+    """Interpolated (x, y, timestamp) triples from (x1, y1) to (x2, y2).
+
+    Without duration_ms, events are spaced by 1/rate_hz. With it, the whole
+    path spans duration_ms regardless of the step count.
+    """
+    n = plan_steps(steps, duration_ms, rate_hz)
+    interval = (duration_ms / 1000.0 / n) if duration_ms else 1.0 / rate_hz
+    points = path_points(x1, y1, x2, y2, n, curve)
+    return [(x, y, ts) for (x, y), ts in zip(points, timestamps(n, interval, start))]
+
+
+def mouse_event(event_type, x, y, timestamp, button="none", click_count=0, modifiers=0):
+    """One Input.dispatchMouseEvent (method, params) pair with explicit timestamp."""
+    return ("Input.dispatchMouseEvent", {
+        "type": event_type,
+        "x": x,
+        "y": y,
+        "button": button,
+        "buttons": BUTTONS_MASK.get(button, 0) if event_type != "mouseReleased" else 0,
+        "clickCount": click_count,
+        "modifiers": modifiers,
+        "timestamp": timestamp,
+    })
+
+
+def mouse_move_calls(points, button="none", modifiers=0):
+    """mouseMoved calls for (x, y, timestamp) points; `button` is the held button."""
+    return [mouse_event("mouseMoved", x, y, ts, button=button, modifiers=modifiers)
+            for x, y, ts in points]
+
+
+def drag_calls(x1, y1, x2, y2, button="left", curve="linear", steps=None,
+               duration_ms=None, rate_hz=DEFAULT_RATE_HZ, modifiers=0):
+    """Full press → interpolated moves → release sequence for one drag."""
+    start = time.time()
+    points = trajectory(x1, y1, x2, y2, curve, steps, duration_ms, rate_hz, start=start)
+    calls = [mouse_event("mousePressed", x1, y1, start, button=button,
+                         click_count=1, modifiers=modifiers)]
+    calls.extend(mouse_move_calls(points, button=button, modifiers=modifiers))
+    end_ts = points[-1][2] if points else start
+    calls.append(mouse_event("mouseReleased", x2, y2, end_ts, button=button,
+                             click_count=1, modifiers=modifiers))
+    return calls
+
+
+def wheel_calls(x, y, delta_x, delta_y, steps=None, duration_ms=None,
+                rate_hz=DEFAULT_RATE_HZ, start=None):
+    """Split one scroll of (delta_x, delta_y) into timestamped mouseWheel events.
+
+    The per-event deltas sum exactly to the requested total (the last event
+    absorbs rounding), so a smooth scroll lands where a single wheel would.
+    """
+    n = plan_steps(steps, duration_ms, rate_hz, default=1)
+    interval = (duration_ms / 1000.0 / n) if duration_ms else 1.0 / rate_hz
+    step_x, step_y = delta_x / n, delta_y / n
+    calls = []
+    for i, ts in enumerate(timestamps(n, interval, start)):
+        last = i == n - 1
+        calls.append(("Input.dispatchMouseEvent", {
+            "type": "mouseWheel",
+            "x": x,
+            "y": y,
+            "deltaX": delta_x - step_x * (n - 1) if last else step_x,
+            "deltaY": delta_y - step_y * (n - 1) if last else step_y,
+            "timestamp": ts,
+        }))
+    return calls
+
+
+def scroll_gesture_params(x, y, delta_x, delta_y, duration_ms=None, repeat=0,
+                          repeat_delay_ms=250):
+    """Input.synthesizeScrollGesture params equivalent to a wheel of (delta_x, delta_y).
+
+    Sign convention differs from mouseWheel: the gesture's distances are
+    positive to scroll up/left, so wheel deltas are negated. `speed` is px/s,
+    derived from the requested duration (CDP default 800 when unset).
+    """
+    params = {
+        "x": x,
+        "y": y,
+        "xDistance": -delta_x,
+        "yDistance": -delta_y,
+        "gestureSourceType": "mouse",
+    }
+    if duration_ms:
+        distance = max(abs(delta_x), abs(delta_y))
+        params["speed"] = max(1, int(distance / (duration_ms / 1000.0)))
+    if repeat:
+        params["repeatCount"] = repeat
+        params["repeatDelayMs"] = repeat_delay_ms
+    return params
@@ -0,0 +1,278 @@
+"""
+key_input — US-layout key table and key-sequence engine for press_key / type.
+
+Turns a sequence spec such as 'Ctrl+Shift+K, Enter, "Hello"' into the full
+Input.dispatchKeyEvent stream (rawKeyDown / char / keyUp) so the caller can
+send it in one pipelined CDPClient.send_batch() instead of one process
+launch per keystroke.
+
+Sequence grammar (press_key):
+    comma-separated tokens, each one of
+      Mod+...+Key    chord — modifiers Ctrl/Control, Shift, Alt/Option,
+                     Meta/Cmd/Command; Key is a named key or one character
+      KeyName        named key (Enter, Tab, Escape, ArrowUp, F5, ...),
+                     case-insensitive
+      c              one character, pressed as its key (typed through
+                     insertText when it is outside the US table)
+      "literal"      quoted text, typed character by character; the only
+                     way to type more than one character
+    Any other unquoted token ("Entr", "Ctrl+Entr") raises CDPError rather
+    than being typed into the page.
+    A comma that ends a chord ("Ctrl+,") or stands alone (",", "Enter, ,")
+    is the comma key, not a separator; `Comma` names it too.
+
+Characters outside the US table (e.g. Hangul, emoji) are sent through
+Input.insertText, the same path `fill` uses.
+
+Imported by v2_interact:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from key_input import parse_sequence, sequence_calls
+"""
+
+from collections import namedtuple
+
+from cdp_client import CDPError
+
+KeyDef = namedtuple("KeyDef", "key code key_code text shift location")
+
+# CDP modifier bitmask (Input.dispatchKeyEvent / dispatchMouseEvent).
+MODIFIER_BITS = {"Alt": 1, "Control": 2, "Meta": 4, "Shift": 8}
+MODIFIER_ALIASES = {
+    "alt": "Alt", "option": "Alt",
+    "ctrl": "Control", "control": "Control",
+    "meta": "Meta", "cmd": "Meta", "command": "Meta",
+    "shift": "Shift",
+}
+# Alt/Ctrl/Meta chords are shortcuts, not text entry — no char event.
+_NON_TEXT_MODIFIERS = 1 | 2 | 4
+
+# (code, windowsVirtualKeyCode, unshifted, shifted) — US ANSI punctuation/digits.
+_PRINTABLE = (
+    ("Backquote", 192, "`", "~"),
+    ("Digit1", 49, "1", "!"),
+    ("Digit2", 50, "2", "@"),
+    ("Digit3", 51, "3", "#"),
+    ("Digit4", 52, "4", "$"),
+    ("Digit5", 53, "5", "%"),
+    ("Digit6", 54, "6", "^"),
+    ("Digit7", 55, "7", "&"),
+    ("Digit8", 56, "8", "*"),
+    ("Digit9", 57, "9", "("),
+    ("Digit0", 48, "0", ")"),
+    ("Minus", 189, "-", "_"),
+    ("Equal", 187, "=", "+"),
+    ("BracketLeft", 219, "[", "{"),
+    ("BracketRight", 221, "]", "}"),
+    ("Backslash", 220, "\\", "|"),
+    ("Semicolon", 186, ";", ":"),
+    ("Quote", 222, "'", '"'),
+    ("Comma", 188, ",", "<"),
+    ("Period", 190, ".", ">"),
+    ("Slash", 191, "/", "?"),
+)
+
+# key name -> (code, windowsVirtualKeyCode, text, location)
+_NAMED = {
+    "Enter": ("Enter", 13, "\r", 0),
+    "Tab": ("Tab", 9, "", 0),
+    "Backspace": ("Backspace", 8, "", 0),
+    "Delete": ("Delete", 46, "", 0),
+    "Escape": ("Escape", 27, "", 0),
+    "Insert": ("Insert", 45, "", 0),
+    "Home": ("Home", 36, "", 0),
+    "End": ("End", 35, "", 0),
+    "PageUp": ("PageUp", 33, "", 0),
+    "PageDown": ("PageDown", 34, "", 0),
+    "ArrowLeft": ("ArrowLeft", 37, "", 0),
+    "ArrowUp": ("ArrowUp", 38, "", 0),
+    "ArrowRight": ("ArrowRight", 39, "", 0),
+    "ArrowDown": ("ArrowDown", 40, "", 0),
+    "CapsLock": ("CapsLock", 20, "", 0),
+    "ContextMenu": ("ContextMenu", 93, "", 0),
+    "Shift": ("ShiftLeft", 16, "", 1),
+    "Control": ("ControlLeft", 17, "", 1),
+    "Alt": ("AltLeft", 18, "", 1),
+    "Meta": ("MetaLeft", 91, "", 1),
+    **{f"F{n}": (f"F{n}", 111 + n, "", 0) for n in range(1, 13)},
+}
+
+_ALIASES = {
+    "esc": "Escape", "return": "Enter", "del": "Delete", "ins": "Insert",
+    "up": "ArrowUp", "down": "ArrowDown", "left": "ArrowLeft", "right": "ArrowRight",
+    "pgup": "PageUp", "pgdn": "PageDown", "menu": "ContextMenu",
+    "space": " ", "spacebar": " ", "comma": ",",
+    **MODIFIER_ALIASES,
+}
+
+
+def _build_table():
+    table = {}
+    for i, ch in enumerate("abcdefghijklmnopqrstuvwxyz"):
+        code = f"Key{ch.upper()}"
+        table[ch] = KeyDef(ch, code, 65 + i, ch, False, 0)
+        table[ch.upper()] = KeyDef(ch.upper(), code, 65 + i, ch.upper(), True, 0)
+    for code, key_code, base, shifted in _PRINTABLE:
+        table[base] = KeyDef(base, code, key_code, base, False, 0)
+        table[shifted] = KeyDef(shifted, code, key_code, shifted, True, 0)
+    table[" "] = KeyDef(" ", "Space", 32, " ", False, 0)
+    for name, (code, key_code, text, location) in _NAMED.items():
+        table[name] = KeyDef(name, code, key_code, text, False, location)
+    return table
+
+
+# Precomputed once at import: key name / character -> KeyDef.
+KEY_TABLE = _build_table()
+_NAMED_LOWER = {name.lower(): name for name in _NAMED}
+
+
+def lookup(name):
+    """Resolve a key name (case-insensitive, with aliases) or one character."""
+    if len(name) == 1:
+        return KEY_TABLE.get(name)
+    low = name.lower()
+    if low in _ALIASES:
+        return KEY_TABLE[_ALIASES[low]]
+    if low in _NAMED_LOWER:
+        return KEY_TABLE[_NAMED_LOWER[low]]
+    return None
+
+
+def _comma_is_key(buf, rest):
+    """True when an unquoted comma is the comma key: it ends a "Mod+" chord
+    or stands alone (nothing else in its token)."""
+    head = "".join(buf).strip()
+    if head:
+        return head.endswith("+") and _parse_chord(head + ",") is not None
+    rest = rest.lstrip()
+    return not rest or rest.startswith(",")
+
+
+def _split_tokens(spec):
+    """Split on commas outside double quotes. Quoted tokens keep their quotes."""
+    tokens, buf, quoted = [], [], False
+    for i, ch in enumerate(spec):
+        if ch == '"':
+            quoted = not quoted
+        if ch == "," and not quoted and not _comma_is_key(buf, spec[i + 1:]):
+            tokens.append("".join(buf))
+            buf = []
+        else:
+            buf.append(ch)
+    tokens.append("".join(buf))
+    return tokens
+
+
+def _parse_chord(token):
+    """Return (modifier names, KeyDef) for 'Mod+...+Key', or None if not a chord."""
+    if token.endswith("++"):
+        head, key_name = token[:-2], "+"
+    else:
+        head, _, key_name = token.rpartition("+")
+    if not head:
+        return None
+    mods = [MODIFIER_ALIASES.get(m.strip().lower()) for m in head.split("+")]
+    if not all(mods):
+        return None
+    key_name = key_name.strip() or key_name
+    if len(key_name) == 1 and key_name.isalpha():
+        # Chord letters are case-insensitive: "Ctrl+K" is not Ctrl+Shift+K.
+        key_name = key_name.upper() if "Shift" in mods else key_name.lower()
+    key = lookup(key_name)
+    if key is None:
+        return None
+    return mods, key
+
+
+def parse_sequence(spec):
+    """Parse a sequence spec into actions: ("key", [modifier names], KeyDef) or ("text", str)."""
+    actions = []
+    for raw in _split_tokens(spec):
+        token = raw.strip()
+        if not token:
+            continue
+        if len(token) >= 2 and token[0] == token[-1] == '"':
+            actions.append(("text", token[1:-1]))
+            continue
+        chord = _parse_chord(token)
+        if chord:
+            actions.append(("key", chord[0], chord[1]))
+            continue
+        if len(token) == 1 and token != ",":
+            actions.append(("text", token))
+            continue
+        key = lookup(token)
+        if key is not None:
+            actions.append(("key", [], key))
+        else:
+            raise CDPError(f"unknown key {token!r} in {spec!r} (quote literal text: '\"{token}\"')")
+    return actions
+
+
+def _key_event(event_type, key, modifiers, text=""):
+    params = {
+        "type": event_type,
+        "key": key.key,
+        "code": key.code,
+        "windowsVirtualKeyCode": key.key_code,
+        "nativeVirtualKeyCode": key.key_code,
+        "modifiers": modifiers,
+    }
+    if key.location:
+        params["location"] = key.location
+    if text:
+        params["text"] = text
+        params["unmodifiedText"] = text
+    return ("Input.dispatchKeyEvent", params)
+
+
+def press_calls(key, modifiers=0):
+    """rawKeyDown [+ char] + keyUp for one key with `modifiers` already held."""
+    if key.shift:
+        modifiers |= MODIFIER_BITS["Shift"]
+    text = key.text if not modifiers & _NON_TEXT_MODIFIERS else ""
+    calls = [_key_event("rawKeyDown", key, modifiers)]
+    if text:
+        calls.append(_key_event("char", key, modifiers, text))
+    calls.append(_key_event("keyUp", key, modifiers))
+    return calls
+
+
+def chord_calls(modifier_names, key, extra_modifiers=0):
+    """Modifiers down in order, key press, modifiers up in reverse."""
+    calls, held = [], extra_modifiers
+    for name in modifier_names:
+        held |= MODIFIER_BITS[name]
+        calls.append(_key_event("rawKeyDown", KEY_TABLE[name], held))
+    calls.extend(press_calls(key, held))
+    for name in reversed(modifier_names):
+        held &= ~MODIFIER_BITS[name]
+        calls.append(_key_event("keyUp", KEY_TABLE[name], held | extra_modifiers))
+    return calls
+
+
+def text_calls(text, modifiers=0):
+    """Key events for each character; runs outside the US table go via insertText."""
+    calls, pending = [], []
+    for ch in text:
+        key = KEY_TABLE["Enter"] if ch == "\n" else KEY_TABLE.get(ch)
+        if key is None:
+            pending.append(ch)
+            continue
+        if pending:
+            calls.append(("Input.insertText", {"text": "".join(pending)}))
+            pending = []
+        calls.extend(press_calls(key, modifiers))
+    if pending:
+        calls.append(("Input.insertText", {"text": "".join(pending)}))
+    return calls
+
+
+def sequence_calls(actions, modifiers=0):
+    """Flatten parse_sequence() actions into one list of CDP calls."""
+    calls = []
+    for action in actions:
+        if action[0] == "text":
+            calls.extend(text_calls(action[1], modifiers))
+        else:
+            calls.extend(chord_calls(action[1], action[2], modifiers))
+    return calls
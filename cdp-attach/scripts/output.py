@@ -0,0 +1,101 @@
+"""
+output — Machine-readable output for the global --json / --jsonl flags.
+
+Commands that support it check output_mode(args) and, instead of their
+human-formatted text, emit compact records:
+    --json    one JSON document per command (a list command prints one array)
+    --jsonl   one JSON record per line (a list command streams its rows)
+A command with a single result prints the same document in both modes.
+Notes that would otherwise go to stdout ("No matching requests.") go to
+stderr, so stdout stays parseable. Commands without a structured form keep
+printing text.
+
+For raw-data commands the browser's JSON is passed through untouched:
+CDPClient.send_raw() returns the response's `result` as the original text,
+and raw_value() slices a by-value RemoteObject's `value` out of it, so a
+multi-megabyte evaluate result is never decoded and re-encoded.
+
+Stdlib only — imported by v1_core / v2_interact / v3_advanced:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from output import add_output_args, emit, output_mode
+"""
+
+import argparse
+import json
+import re
+import sys
+
+OUTPUT_MODES = ("json", "jsonl")
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+# A returnByValue Runtime.evaluate / callFunctionOn result whose `value` is the
+# last key: {"result":{"type":"object"[,"subtype":..][,"className":..],"value":<V>}}.
+# Numbers are left out: Chrome appends a "description" after their value.
+_RAW_VALUE_RE = re.compile(
+    r'\{"result":\{"type":"(object|string|boolean)"(?:,"subtype":"[a-z]+")?'
+    r'(?:,"className":"[^"\\]*")?,"value":'
+)
+
+
+def add_output_args(parser, subparsers):
+    """Add --json / --jsonl to the top-level parser and to every subcommand.
+
+    Accepted before or after the subcommand name; the subcommand copies use
+    SUPPRESS so they do not overwrite a top-level choice with None.
+    """
+    for p, default in [(parser, None)] + [(p, argparse.SUPPRESS) for p in subparsers.choices.values()]:
+        group = p.add_mutually_exclusive_group()
+        group.add_argument("--json", dest="output_format", action="store_const", const="json",
+                           default=default, help="Compact machine-readable output (one JSON document)")
+        group.add_argument("--jsonl", dest="output_format", action="store_const", const="jsonl",
+                           default=default, help="One JSON record per line")
+
+
+def output_mode(args):
+    """"json", "jsonl" or None (human text)."""
+    return getattr(args, "output_format", None)
+
+
+def note(message):
+    """A human note that must not pollute structured stdout."""
+    print(message, file=sys.stderr)
+
+
+def emit(value):
+    """Write one compact JSON document."""
+    sys.stdout.write(_ENCODER.encode(value) + "\n")
+
+
+def emit_records(records, mode):
+    """Write records as a JSON array (json) or one per line (jsonl), streaming. Returns the count."""
+    count = 0
+    write = sys.stdout.write
+    if mode == "jsonl":
+        for record in records:
+            write(_ENCODER.encode(record) + "\n")
+            count += 1
+        return count
+    write("[")
+    for record in records:
+        write(("," if count else "") + _ENCODER.encode(record))
+        count += 1
+    write("]\n")
+    return count
+
+
+def emit_raw(text):
+    """Write JSON text received from the browser as-is."""
+    sys.stdout.write(text)
+    sys.stdout.write("\n")
+
+
+def raw_value(result_text):
+    """The `value` JSON text of a raw by-value evaluate result, or None when the layout differs."""
+    match = _RAW_VALUE_RE.match(result_text)
+    # exceptionDetails would follow the result object; such (rare) texts take the slow path.
+    if match is None or not result_text.endswith("}}") or '"exceptionDetails":{' in result_text:
+        return None
+    value = result_text[match.end():-2]
+    if match.group(1) == "object" and not (value[:1] in "{[" and value[-1:] in "}]" or value == "null"):
+        return None
+    return value
@@ -0,0 +1,216 @@
+"""
+storage_state — Paged page-storage transfer and the state file format for
+state_save / state_load.
+
+Nothing here builds a JS literal out of stored data. Reads page through
+Web Storage and IndexedDB in STATE_PAGE_CHARS slices (one
+Runtime.callFunctionOn each, returned by value), and writes pass their page
+as a callFunctionOn *argument*, so no single message carries the whole
+store and multi-megabyte values never hit the JS parser.
+
+IndexedDB values are structured-clone data, not JSON. The in-page encoder
+tags what JSON cannot carry — {"$t": "date" | "ab" (ArrayBuffer) | "view"
+(typed array) | "blob" | "map" | "set" | "re" | "bigint" | "num"
+(NaN/±Infinity) | "undef" | "obj" (an object with its own "$t" key)} —
+with bytes as base64, and the decoder rebuilds the originals on load.
+
+State file (version 2): one JSON document, gzip-compressed when the path
+ends in .gz —
+    {"version": 2, "timestamp", "url", "origin", "cookies",
+     "localStorage": {k: v}, "sessionStorage": {k: v},
+     "indexedDB": [{"name", "version",
+                    "stores": [{"name", "keyPath", "autoIncrement",
+                                "indexes": [{"name", "keyPath", "unique", "multiEntry"}],
+                                "records": [[key, value], ...]}]}]}
+Version 1 files (no origin / indexedDB, indented JSON) still load.
+
+Stdlib only — imported by v3_advanced:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from storage_state import read_state, write_state
+"""
+
+import gzip
+import json
+
+STATE_VERSION = 2
+STATE_PAGE_CHARS = 1024 * 1024  # approx. JSON chars per read/write page
+
+# Shared by every IndexedDB function below (prepended to each body).
+_CODEC_JS = r"""
+const b64 = (bytes) => {
+  let s = '';
+  for (let i = 0; i < bytes.length; i += 0x8000) s += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+  return btoa(s);
+};
+const unb64 = (s) => Uint8Array.from(atob(s), (c) => c.charCodeAt(0));
+const enc = async (v) => {
+  if (v === undefined) return {$t: 'undef'};
+  if (v === null || typeof v === 'boolean' || typeof v === 'string') return v;
+  if (typeof v === 'number') return Number.isFinite(v) ? v : {$t: 'num', v: String(v)};
+  if (typeof v === 'bigint') return {$t: 'bigint', v: v.toString()};
+  if (v instanceof Date) return {$t: 'date', v: v.getTime()};
+  if (v instanceof ArrayBuffer) return {$t: 'ab', v: b64(new Uint8Array(v))};
+  if (ArrayBuffer.isView(v)) return {$t: 'view', c: v.constructor.name, v: b64(new Uint8Array(v.buffer, v.byteOffset, v.byteLength))};
+  if (v instanceof Blob) return {$t: 'blob', type: v.type, name: v.name, v: b64(new Uint8Array(await v.arrayBuffer()))};
+  if (v instanceof Map) return {$t: 'map', v: await Promise.all([...v].map(async ([a, b]) => [await enc(a), await enc(b)]))};
+  if (v instanceof Set) return {$t: 'set', v: await Promise.all([...v].map(enc))};
+  if (v instanceof RegExp) return {$t: 're', s: v.source, f: v.flags};
+  if (Array.isArray(v)) return Promise.all(v.map(enc));
+  const o = {};
+  for (const k of Object.keys(v)) o[k] = await enc(v[k]);
+  return Object.prototype.hasOwnProperty.call(v, '$t') ? {$t: 'obj', v: o} : o;
+};
+const dec = (v) => {
+  if (v === null || typeof v !== 'object') return v;
+  if (Array.isArray(v)) return v.map(dec);
+  switch (v.$t) {
+    case 'undef': return undefined;
+    case 'num': return Number(v.v);
+    case 'bigint': return BigInt(v.v);
+    case 'date': return new Date(v.v);
+    case 'ab': return unb64(v.v).buffer;
+    case 'view': {
+      const bytes = unb64(v.v);
+      const C = globalThis[v.c] || Uint8Array;
+      return C === DataView ? new DataView(bytes.buffer) : new C(bytes.buffer, 0, bytes.byteLength / (C.BYTES_PER_ELEMENT || 1));
+    }
+    case 'blob': return v.name !== undefined ? new File([unb64(v.v)], v.name, {type: v.type}) : new Blob([unb64(v.v)], {type: v.type});
+    case 'map': return new Map(v.v.map(([a, b]) => [dec(a), dec(b)]));
+    case 'set': return new Set(v.v.map(dec));
+    case 're': return new RegExp(v.s, v.f);
+    case 'obj': { const o = {}; for (const k of Object.keys(v.v)) o[k] = dec(v.v[k]); return o; }
+  }
+  const o = {};
+  for (const k of Object.keys(v)) o[k] = dec(v[k]);
+  return o;
+};
+const req = (r) => new Promise((resolve, reject) => { r.onsuccess = () => resolve(r.result); r.onerror = () => reject(r.error); });
+"""
+
+# (area, start, budget) → {items: [[k, v]...], next, total, url, origin}
+STORAGE_READ_JS = """function (area, start, budget) {
+  const s = area === 'local' ? localStorage : sessionStorage;
+  const items = [];
+  let size = 0, i = start;
+  for (; i < s.length && (size < budget || !items.length); i++) {
+    const k = s.key(i), v = s.getItem(k);
+    items.push([k, v]);
+    size += k.length + v.length + 8;
+  }
+  return {items, next: i, total: s.length, url: location.href, origin: location.origin};
+}"""
+
+# (area, items) → count written
+STORAGE_WRITE_JS = """function (area, items) {
+  const s = area === 'local' ? localStorage : sessionStorage;
+  for (const [k, v] of items) s.setItem(k, v);
+  return items.length;
+}"""
+
+# (dbName) → {name, version, stores: [{name, keyPath, autoIncrement, indexes}]}
+IDB_SCHEMA_JS = "async function (dbName) {" + _CODEC_JS + """
+  const db = await req(indexedDB.open(dbName));
+  try {
+    const names = [...db.objectStoreNames];
+    const stores = names.map((name) => {
+      const st = db.transaction(name, 'readonly').objectStore(name);
+      return {
+        name, keyPath: st.keyPath, autoIncrement: st.autoIncrement,
+        indexes: [...st.indexNames].map((n) => {
+          const ix = st.index(n);
+          return {name: n, keyPath: ix.keyPath, unique: ix.unique, multiEntry: ix.multiEntry};
+        }),
+      };
+    });
+    return {name: dbName, version: db.version, stores};
+  } finally { db.close(); }
+}"""
+
+# (dbName, storeName, after (encoded key) | null, budget) → {records: [[k, v]...], after, done}
+IDB_READ_JS = "async function (dbName, storeName, after, budget) {" + _CODEC_JS + """
+  const db = await req(indexedDB.open(dbName));
+  try {
+    const range = after === null ? null : IDBKeyRange.lowerBound(dec(after), true);
+    const st = db.transaction(storeName, 'readonly').objectStore(storeName);
+    // Collect raw entries inside the transaction, encode (async: Blobs) after it.
+    const raw = [];
+    let size = 0, done = true;
+    await new Promise((resolve, reject) => {
+      const r = st.openCursor(range);
+      r.onerror = () => reject(r.error);
+      r.onsuccess = () => {
+        const c = r.result;
+        if (!c) return resolve();
+        raw.push([c.primaryKey, c.value]);
+        try { size += JSON.stringify(c.value).length; } catch (e) { size += 1024; }
+        if (size >= budget) { done = false; return resolve(); }
+        c.continue();
+      };
+    });
+    const records = [];
+    for (const [k, v] of raw) records.push([await enc(k), await enc(v)]);
+    return {records, after: records.length ? records[records.length - 1][0] : after, done};
+  } finally { db.close(); }
+}"""
+
+# (schema) → recreate the database at its saved version with stores + indexes
+IDB_CREATE_JS = "async function (schema) {" + _CODEC_JS + """
+  const open = indexedDB.open(schema.name, schema.version);
+  open.onupgradeneeded = () => {
+    const db = open.result;
+    for (const s of schema.stores) {
+      if (db.objectStoreNames.contains(s.name)) continue;
+      const st = db.createObjectStore(s.name, {keyPath: s.keyPath, autoIncrement: s.autoIncrement});
+      for (const ix of s.indexes) st.createIndex(ix.name, ix.keyPath, {unique: ix.unique, multiEntry: ix.multiEntry});
+    }
+  };
+  const db = await req(open);
+  db.close();
+  return schema.stores.length;
+}"""
+
+# (dbName, storeName, inlineKeys, records) → count written
+IDB_WRITE_JS = "async function (dbName, storeName, inlineKeys, records) {" + _CODEC_JS + """
+  const db = await req(indexedDB.open(dbName));
+  try {
+    const tx = db.transaction(storeName, 'readwrite');
+    const st = tx.objectStore(storeName);
+    for (const [k, v] of records) inlineKeys ? st.put(dec(v)) : st.put(dec(v), dec(k));
+    await new Promise((resolve, reject) => { tx.oncomplete = resolve; tx.onerror = () => reject(tx.error); tx.onabort = () => reject(tx.error); });
+    return records.length;
+  } finally { db.close(); }
+}"""
+
+
+def paged(items, budget=STATE_PAGE_CHARS):
+    """Split [[k, v], ...] into pages of roughly `budget` JSON chars (at least one item each)."""
+    page, size = [], 0
+    for item in items:
+        item_size = len(json.dumps(item, ensure_ascii=False))
+        if page and size + item_size > budget:
+            yield page
+            page, size = [], 0
+        page.append(item)
+        size += item_size
+    if page:
+        yield page
+
+
+def write_state(path, snapshot):
+    """Write a state snapshot: compact JSON, gzip-compressed for *.gz paths."""
+    data = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogatepass")
+    if path.endswith(".gz"):
+        with gzip.open(path, "wb", compresslevel=6) as f:
+            f.write(data)
+    else:
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def read_state(path):
+    """Read a state snapshot (gzip detected by magic bytes, not extension)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return json.loads(data.decode("utf-8", "surrogatepass"))
@@ -0,0 +1,65 @@
+"""
+subcommands — Build only the invoked subcommand's argparse parser.
+
+Every subparser is a full ArgumentParser (~0.3ms to create) and v1/v2/v3
+define 18-32 of them, so building the whole tree on each call was a visible
+slice of startup for commands whose browser work takes a few milliseconds.
+main() declares its dispatch table first; invoked_command() picks the
+command name out of argv without parsing it, and LazySubparsers.add_parser()
+builds that one parser and hands back a no-op stand-in for the others.
+When the name cannot be determined (-h before the command, a typo, an
+abbreviated global option) every parser is built, so help output and
+"invalid choice" errors are unchanged.
+
+Stdlib only — imported by v1_core / v2_interact / v3_advanced:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from subcommands import LazySubparsers, invoked_command
+"""
+
+# Global options of v1/v2/v3 that may precede the command name.
+_VALUE_OPTIONS = {"--host", "--port"}
+_FLAG_OPTIONS = {"--json", "--jsonl"}
+
+
+def invoked_command(argv, commands):
+    """The command name in argv (without the program) if it is one of `commands`, else None."""
+    tokens = iter(argv)
+    for token in tokens:
+        if token in _VALUE_OPTIONS:
+            next(tokens, None)
+        elif token in _FLAG_OPTIONS or token.split("=", 1)[0] in _VALUE_OPTIONS:
+            continue
+        else:
+            return token if token in commands else None
+    return None
+
+
+class _Skipped:
+    """Stand-in for a subcommand parser that is not built: every method call is a no-op."""
+
+    def __getattr__(self, name):
+        return self._ignore
+
+    def _ignore(self, *args, **kwargs):
+        return self
+
+
+_SKIPPED = _Skipped()
+
+
+class LazySubparsers:
+    """Wraps parser.add_subparsers(); add_parser() only builds `wanted` (every parser when None)."""
+
+    def __init__(self, subparsers, wanted):
+        self._subparsers = subparsers
+        self.wanted = wanted
+
+    @property
+    def choices(self):
+        """The subcommand parsers actually built."""
+        return self._subparsers.choices
+
+    def add_parser(self, name, **kwargs):
+        if self.wanted is None or name == self.wanted:
+            return self._subparsers.add_parser(name, **kwargs)
+        return _SKIPPED
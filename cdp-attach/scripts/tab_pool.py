@@ -0,0 +1,228 @@
+"""
+tab_pool — Warm pool of pre-opened about:blank tabs for new_page / revive.
+
+Opening a tab and spinning up its renderer costs hundreds of milliseconds
+on the critical path of every fresh task. With a pool configured
+(`v1 pool_start --size N [--context ID]`), that many background
+about:blank tabs are kept open per browser context; new_page and revive
+take one, navigate it and bring it to the front instead of waiting on
+/json/new.
+
+State is one file per browser endpoint, edited under its own flock:
+    tab-pool-{host}-{port}.json   {"sizes": {ctx: N}, "default_context": ctx,
+                                   "tabs": {ctx: [targetId, ...]}}
+Taking a tab forks a short-lived refill process (new setsid session,
+stdio on /dev/null, inherited descriptors closed) that tops every context
+back up over the browser-level WebSocket and exits; at most one refill
+runs at a time (non-blocking refill lock). Pooled tabs are created with
+Target.createTarget(background=true) so they never steal focus.
+
+A pooled tab is only handed out while /json/list still shows it on
+about:blank — tabs closed or navigated by someone else are dropped.
+
+Stdlib only — imported by v1_core / v2_interact:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from tab_pool import take_tab
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+
+from cdp_client import STATE_DIR, CDPClient, CDPError, atomic_write_json
+
+POOL_URL = "about:blank"
+POOL_MAX_SIZE = 8
+REFILL_CLOSE_FDS = 1024  # fds >= 3 below this are closed in the refill child
+
+
+def _pool_path(host, port):
+    return os.path.join(STATE_DIR, f"tab-pool-{host}-{port}.json")
+
+
+def _read_pool(host, port):
+    try:
+        with open(_pool_path(host, port)) as f:
+            pool = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        pool = {}
+    pool.setdefault("sizes", {})
+    pool.setdefault("tabs", {})
+    return pool
+
+
+@contextlib.contextmanager
+def _pool_lock(host, port, suffix="lock", blocking=True):
+    """Exclusive flock next to the pool file. Yields False if non-blocking and busy."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(_pool_path(host, port) + "." + suffix, "w") as lock_f:
+        try:
+            fcntl.flock(lock_f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+
+def pool_status(client):
+    """The pool file as a dict (sizes, default_context, tabs); empty sizes when disabled."""
+    return _read_pool(client.host, client.port)
+
+
+def pooled_ids(client):
+    """Target ids currently parked in the pool (any context)."""
+    pool = _read_pool(client.host, client.port)
+    return {tid for ids in pool["tabs"].values() for tid in ids}
+
+
+def _create_pooled_tab(browser, context):
+    params = {"url": POOL_URL, "background": True}
+    if context is not None:
+        params["browserContextId"] = context
+    target_id = browser.send("Target.createTarget", params)["targetId"]
+    if context is None:
+        info = browser.send("Target.getTargetInfo", {"targetId": target_id})["targetInfo"]
+        context = info.get("browserContextId")
+    return target_id, context
+
+
+def fill_pool(client, blocking=True):
+    """Top every configured context up to its size. Returns the number of tabs opened.
+
+    Dead or navigated-away tabs are pruned first. Opens one browser-level
+    connection on a separate CDPClient, so `client` stays untouched.
+    """
+    host, port = client.host, client.port
+    with _pool_lock(host, port, suffix="refill", blocking=blocking) as acquired:
+        if not acquired:
+            return 0
+        browser = CDPClient(host=host, port=port).connect_browser()
+        opened = 0
+        try:
+            live = {
+                t["targetId"] for t in browser.send("Target.getTargets").get("targetInfos", [])
+                if t.get("type") == "page" and t.get("url") == POOL_URL
+            }
+            with _pool_lock(host, port):
+                pool = _read_pool(host, port)
+                pool["tabs"] = {ctx: [tid for tid in ids if tid in live]
+                                for ctx, ids in pool["tabs"].items()}
+                atomic_write_json(_pool_path(host, port), pool)
+            while True:
+                # Re-read each round: a concurrent take or pool_stop may have changed it.
+                pool = _read_pool(host, port)
+                missing = [ctx for ctx, size in pool["sizes"].items()
+                           if len(pool["tabs"].get(ctx, [])) < size]
+                if not missing:
+                    return opened
+                ctx = missing[0]
+                target_id, actual = _create_pooled_tab(
+                    browser, None if ctx == "default" else ctx)
+                opened += 1
+                with _pool_lock(host, port):
+                    pool = _read_pool(host, port)
+                    if ctx not in pool["sizes"]:
+                        browser.send("Target.closeTarget", {"targetId": target_id})
+                        continue
+                    if ctx == "default":
+                        pool["default_context"] = actual
+                    pool["tabs"].setdefault(ctx, []).append(target_id)
+                    atomic_write_json(_pool_path(host, port), pool)
+        finally:
+            browser.close()
+
+
+def _spawn_refill(host, port):
+    """Fork a detached process that refills the pool. Returns immediately in the parent."""
+    pid = os.fork()
+    if pid > 0:
+        return
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        # new_page / revive fork under cdp_lock: drop the inherited lock fd (and
+        # any other) so the refill can never keep the global lock held.
+        os.closerange(3, REFILL_CLOSE_FDS)
+        fill_pool(CDPClient(host=host, port=port), blocking=False)
+        os._exit(0)
+    except Exception:
+        os._exit(1)
+
+
+def _close_pooled(client, target_id):
+    """Close one pooled tab; False if it is already gone (closed by hand, crashed)."""
+    try:
+        return client.close_tab(target_id)
+    except CDPError:
+        return False
+
+
+def configure_pool(client, size, context=None):
+    """Set the pool size for a context ("default" when None) and fill it now."""
+    if not 0 <= size <= POOL_MAX_SIZE:
+        raise CDPError(f"pool size must be between 0 and {POOL_MAX_SIZE}")
+    key = context or "default"
+    host, port = client.host, client.port
+    surplus = []
+    with _pool_lock(host, port):
+        pool = _read_pool(host, port)
+        if size:
+            pool["sizes"][key] = size
+        else:
+            pool["sizes"].pop(key, None)
+        ids = pool["tabs"].get(key, [])
+        pool["tabs"][key], surplus = ids[:size], ids[size:]
+        atomic_write_json(_pool_path(host, port), pool)
+    for target_id in surplus:
+        _close_pooled(client, target_id)
+    return fill_pool(client)
+
+
+def stop_pool(client):
+    """Disable the pool and close every pooled tab. Returns the number closed."""
+    host, port = client.host, client.port
+    with _pool_lock(host, port):
+        pool = _read_pool(host, port)
+        try:
+            os.unlink(_pool_path(host, port))
+        except OSError:
+            pass
+    closed = 0
+    for ids in pool["tabs"].values():
+        for target_id in ids:
+            closed += _close_pooled(client, target_id)
+    return closed
+
+
+def take_tab(client, context=None):
+    """Pop a warm about:blank tab for `context` (None = default), or None.
+
+    Schedules a background refill whenever the pool is configured, so the
+    next caller finds a tab waiting.
+    """
+    host, port = client.host, client.port
+    with _pool_lock(host, port):
+        pool = _read_pool(host, port)
+        if not pool["sizes"]:
+            return None
+        if context is None or context == pool.get("default_context"):
+            key = "default"
+        else:
+            key = context
+        ids = pool["tabs"].get(key, [])
+        target_id = None
+        if ids:
+            live = {t.get("id") for t in client.list_tabs() if t.get("url") == POOL_URL}
+            while ids and target_id is None:
+                candidate = ids.pop(0)
+                if candidate in live:
+                    target_id = candidate
+            atomic_write_json(_pool_path(host, port), pool)
+    _spawn_refill(host, port)
+    return target_id
@@ -0,0 +1,286 @@
+"""
+trace_summary — Stream-parse a saved Chrome trace into a performance summary.
+
+The trace file (perf_stop output: {"traceEvents": [...]} or a bare array,
+plain or gzipped) is read in TRACE_READ_CHARS chunks and decoded one event
+at a time with JSONDecoder.raw_decode, so a 200MB trace is summarized
+without ever holding more than one chunk plus per-thread totals in memory.
+
+What is reported (all durations in ms):
+  long tasks       RunTask slices on the renderer main thread(s) at or over
+                   the threshold (default 50ms), plus the blocking time
+                   beyond the threshold, as in Total Blocking Time
+  rendering        Layout / Recalculate style / Pre-paint / Paint /
+                   Composite totals on the main thread(s)
+  scripts          per-URL EvaluateScript (top-level run, includes nested
+                   compile), v8.compile and FunctionCall time
+  functions        JS self time per function, from the V8 CPU profile
+                   (ProfileChunk samples); only present when the trace was
+                   recorded with the disabled-by-default-v8.cpu_profiler
+                   category — see SUMMARY_CATEGORIES
+
+Main threads are the ones named CrRendererMain in the trace metadata; when
+a trace has no thread names, the thread with the most task time is used.
+
+Stdlib only — imported by v3_advanced:
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    from trace_summary import summarize
+"""
+
+import gzip
+import json
+
+TRACE_READ_CHARS = 1024 * 1024
+LONG_TASK_MS = 50
+
+# perf_start --categories value that records everything summarize() reads.
+SUMMARY_CATEGORIES = ",".join((
+    "devtools.timeline",
+    "disabled-by-default-devtools.timeline",
+    "v8.execute",
+    "disabled-by-default-v8.cpu_profiler",
+    "toplevel",
+))
+
+_TASK_EVENTS = {"RunTask", "ThreadControllerImpl::RunTask"}
+_RENDER_EVENTS = {
+    "Layout": "Layout",
+    "UpdateLayoutTree": "Recalculate style",
+    "RecalculateStyles": "Recalculate style",
+    "PrePaint": "Pre-paint",
+    "Paint": "Paint",
+    "Layerize": "Composite",
+    "CompositeLayers": "Composite",
+    "UpdateLayerTree": "Composite",
+}
+_SCRIPT_EVENTS = {
+    "EvaluateScript": "evaluate",
+    "v8.evaluateModule": "evaluate",
+    "v8.compile": "compile",
+    "v8.compileModule": "compile",
+    "FunctionCall": "call",
+}
+_SLICE_EVENTS = _TASK_EVENTS | set(_RENDER_EVENTS) | set(_SCRIPT_EVENTS)
+# CPU profile pseudo-frames that are not JS work.
+_SKIP_FRAMES = {"(root)", "(idle)"}
+
+
+def _open_text(path):
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_trace_events(path):
+    """Yield trace events one by one from a JSON Object or JSON Array trace file."""
+    decoder = json.JSONDecoder()
+    with _open_text(path) as f:
+        buf, pos, eof = "", 0, False
+
+        def more():
+            nonlocal buf, pos, eof
+            chunk = f.read(TRACE_READ_CHARS)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            return not eof
+
+        # Seek to the opening bracket of the event array.
+        while True:
+            stripped = buf.lstrip()
+            if stripped.startswith("["):
+                pos = len(buf) - len(stripped) + 1
+                break
+            key = buf.find('"traceEvents"')
+            bracket = buf.find("[", key) if key >= 0 else -1
+            if bracket >= 0:
+                pos = bracket + 1
+                break
+            if not more():
+                raise ValueError(f"{path}: not a Chrome trace (no traceEvents array)")
+            pos = 0
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                if not more():
+                    return  # truncated trace: keep what was parsed
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                event, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not more():
+                    return
+                continue
+            pos = end
+            if pos > TRACE_READ_CHARS:
+                buf, pos = buf[pos:], 0
+            yield event
+
+
+def _script_url(event):
+    args = event.get("args") or {}
+    data = args.get("data") or {}
+    return data.get("url") or args.get("fileName") or data.get("scriptName") or ""
+
+
+class _Thread:
+    __slots__ = ("task_us", "tasks", "long_tasks", "render", "scripts", "open")
+
+    def __init__(self):
+        self.task_us = 0
+        self.tasks = 0
+        self.long_tasks = []          # (ts, dur) in µs
+        self.render = {}              # label -> [µs, count]
+        self.scripts = {}             # url -> {"evaluate"|"compile"|"call": µs}
+        self.open = {}                # name -> [B events] awaiting their E
+
+
+def _profile_self_time(state, event):
+    """Fold one ProfileChunk into state: node frames and per-node self time (µs)."""
+    data = (event.get("args") or {}).get("data") or {}
+    profile_id = (event.get("pid"), event.get("id"))
+    profile = data.get("cpuProfile") or {}
+    for node in profile.get("nodes") or ():
+        frame = node.get("callFrame") or {}
+        state["frames"][(profile_id, node["id"])] = (
+            frame.get("functionName") or "(anonymous)",
+            frame.get("url", ""),
+            frame.get("lineNumber", -1) + 1,
+        )
+    # timeDeltas[i] is the gap before samples[i]: it is the previous sample's duration.
+    prev = state["last_sample"].get(profile_id)
+    for sample, delta in zip(profile.get("samples") or (), data.get("timeDeltas") or ()):
+        if prev is not None and delta > 0:
+            key = (profile_id, prev)
+            state["self_us"][key] = state["self_us"].get(key, 0) + delta
+        prev = sample
+    state["last_sample"][profile_id] = prev
+
+
+def summarize(path, long_task_ms=LONG_TASK_MS, top=15):
+    """Summarize a trace file in one streaming pass. Returns a plain dict (see module docstring)."""
+    threads = {}
+    names = {}
+    profile = {"frames": {}, "self_us": {}, "last_sample": {}}
+    count = 0
+    first_ts = last_ts = None
+    threshold_us = long_task_ms * 1000
+
+    def slice_done(thread, name, ts, dur, event):
+        if name in _TASK_EVENTS:
+            thread.tasks += 1
+            thread.task_us += dur
+            if dur >= threshold_us:
+                thread.long_tasks.append((ts, dur))
+        elif name in _RENDER_EVENTS:
+            totals = thread.render.setdefault(_RENDER_EVENTS[name], [0, 0])
+            totals[0] += dur
+            totals[1] += 1
+        else:
+            per_url = thread.scripts.setdefault(_script_url(event), {})
+            kind = _SCRIPT_EVENTS[name]
+            per_url[kind] = per_url.get(kind, 0) + dur
+
+    for event in iter_trace_events(path):
+        count += 1
+        ph = event.get("ph")
+        name = event.get("name", "")
+        ts = event.get("ts")
+        if ts and ph != "M":
+            first_ts = ts if first_ts is None else min(first_ts, ts)
+            end = ts + (event.get("dur") or 0)
+            last_ts = end if last_ts is None else max(last_ts, end)
+        if ph == "M":
+            if name == "thread_name":
+                names[(event.get("pid"), event.get("tid"))] = (event.get("args") or {}).get("name", "")
+            continue
+        if name == "ProfileChunk":
+            _profile_self_time(profile, event)
+            continue
+        if name not in _SLICE_EVENTS:
+            continue
+        key = (event.get("pid"), event.get("tid"))
+        thread = threads.get(key)
+        if thread is None:
+            thread = threads[key] = _Thread()
+        if ph == "X":
+            slice_done(thread, name, ts, event.get("dur") or 0, event)
+        elif ph == "B":
+            thread.open.setdefault(name, []).append(event)
+        elif ph == "E" and thread.open.get(name):
+            begin = thread.open[name].pop()
+            if event.get("args"):
+                begin = dict(begin, args=dict(begin.get("args") or {}, **event["args"]))
+            slice_done(thread, name, begin["ts"], ts - begin["ts"], begin)
+
+    main = [key for key, name in names.items() if name == "CrRendererMain" and key in threads]
+    if not main and threads:
+        main = [max(threads, key=lambda k: threads[k].task_us)]
+    main_threads = [threads[key] for key in main]
+
+    long_tasks = sorted(
+        (task for thread in main_threads for task in thread.long_tasks),
+        key=lambda task: -task[1],
+    )
+    render = {}
+    for thread in main_threads:
+        for label, (us, n) in thread.render.items():
+            totals = render.setdefault(label, [0, 0])
+            totals[0] += us
+            totals[1] += n
+    scripts = {}
+    for thread in main_threads:
+        for url, kinds in thread.scripts.items():
+            merged = scripts.setdefault(url, {})
+            for kind, us in kinds.items():
+                merged[kind] = merged.get(kind, 0) + us
+    functions = {}
+    for node_key, us in profile["self_us"].items():
+        frame = profile["frames"].get(node_key)
+        if frame is not None and frame[0] not in _SKIP_FRAMES:
+            functions[frame] = functions.get(frame, 0) + us
+
+    origin = first_ts or 0
+    script_rows = [
+        {
+            "url": url,
+            "evaluate_ms": kinds.get("evaluate", 0) / 1000,
+            "compile_ms": kinds.get("compile", 0) / 1000,
+            "call_ms": kinds.get("call", 0) / 1000,
+            "total_ms": (kinds.get("evaluate", 0) + kinds.get("call", 0)) / 1000,
+        }
+        for url, kinds in scripts.items()
+    ]
+    script_rows.sort(key=lambda row: -row["total_ms"])
+    return {
+        "path": path,
+        "events": count,
+        "duration_ms": ((last_ts - first_ts) / 1000) if first_ts is not None else 0,
+        "main_threads": [f"{pid}:{tid}" for pid, tid in main],
+        "tasks": sum(thread.tasks for thread in main_threads),
+        "task_ms": sum(thread.task_us for thread in main_threads) / 1000,
+        "long_task_ms": long_task_ms,
+        "long_task_count": len(long_tasks),
+        "long_task_total_ms": sum(dur for _, dur in long_tasks) / 1000,
+        "blocking_ms": sum(dur - threshold_us for _, dur in long_tasks) / 1000,
+        "long_tasks": [
+            {"start_ms": (ts - origin) / 1000, "dur_ms": dur / 1000}
+            for ts, dur in long_tasks[:top]
+        ],
+        "rendering": {
+            label: {"ms": us / 1000, "count": n}
+            for label, (us, n) in sorted(render.items(), key=lambda item: -item[1][0])
+        },
+        "scripts": script_rows[:top],
+        "profiled": bool(profile["frames"]),
+        "functions": [
+            {"function": frame[0], "url": frame[1], "line": frame[2], "self_ms": us / 1000}
+            for frame, us in sorted(functions.items(), key=lambda item: -item[1])[:top]
+        ],
+    }
@@ -10,17 +10,27 @@ v1_core — Core CDP operations: list, select, screenshot, snapshot, evaluate, n
 """
 
 import argparse
-import base64
 import json
 import os
 import re
 import sys
 import time
-from pathlib import Path
 
 # Import shared client from same directory
-sys.path.insert(0, str(Path(__file__).resolve().parent))
-from cdp_client import CDPClient, CDPError, ERRORS_FILE, STATE_DIR, atomic_write_json, cdp_lock
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from cdp_client import (
+    CDPClient,
+    CDPConnectionError,
+    CDPError,
+    DEFAULT_TIMEOUT,
+    ERRORS_FILE,
+    STATE_DIR,
+    atomic_write_json,
+    cdp_lock,
+)
+from output import add_output_args, emit, emit_raw, emit_records, note, output_mode, raw_value
+from subcommands import LazySubparsers, invoked_command
+from tab_pool import configure_pool, pool_status, pooled_ids, stop_pool, take_tab
 
 SNAPSHOT_CACHE_DIR = os.path.join(STATE_DIR, "snapshots")
 SNAPSHOT_DIFF_MAX_LINES = 200
@@ -40,6 +50,10 @@ def _redeclare_safe(expression):
 def cmd_version(client, args):
     """Show browser version info."""
     info = client.get_version()
+    mode = output_mode(args)
+    if mode:
+        emit(info)
+        return
     print(f"Browser: {info.get('Browser', 'Unknown')}")
     print(f"Protocol: {info.get('Protocol-Version', 'Unknown')}")
     print(f"V8: {info.get('V8-Version', 'Unknown')}")
@@ -141,6 +155,88 @@ def _cmd_list_contexts(client, args):
         print()
 
 
+def _resolve_fanout_targets(client, spec):
+    """Resolve a --targets spec to page tabs (HTTP /json/list dicts).
+
+    all             — every page target
+    context:<id>    — pages in one browser context (id or short prefix)
+    search:<query>  — pages whose title or URL contains the query
+
+    Warm-pool tabs (pool_start) are never included.
+    """
+    pooled = pooled_ids(client)
+    tabs = [t for t in client.list_tabs(type_filter="page") if t.get("id") not in pooled]
+    kind, _, value = spec.partition(":")
+    if kind == "all" and not value:
+        return tabs
+    if kind == "context":
+        target_ids, _ = _resolve_context_filter(client, value)
+        return [t for t in tabs if t.get("id") in target_ids]
+    if kind == "search" and value:
+        query = value.lower()
+        return [
+            t for t in tabs
+            if query in t.get("title", "").lower() or query in t.get("url", "").lower()
+        ]
+    raise CDPError(f"--targets expects all, context:<id> or search:<query> (got {spec!r})")
+
+
+def _run_fanout(client, args, worker):
+    """Run worker(tab_client, tab) across many tabs on a bounded thread pool.
+
+    Each worker gets its own CDPClient connected to its tab — the selected
+    target in state.json is neither read nor changed. The caller already
+    holds cdp_lock once for the whole fan-out, instead of one
+    select + command pair per tab. Prints one JSON line per tab as it
+    finishes ({"target", "url", "ok", ...result | "error"}) and a summary
+    on stderr; exits 1 when any tab failed.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    tabs = _resolve_fanout_targets(client, args.targets)
+    if not tabs:
+        print(f"No page targets match {args.targets!r}", file=sys.stderr)
+        sys.exit(1)
+
+    def _one(tab):
+        tab_client = CDPClient(host=client.host, port=client.port)
+        tab_client.connect(target_id=tab["id"])
+        try:
+            return worker(tab_client, tab)
+        finally:
+            tab_client.close()
+
+    start = time.time()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(_one, tab): tab for tab in tabs}
+        for future in as_completed(futures):
+            tab = futures[future]
+            record = {"target": tab["id"], "url": tab.get("url", "")}
+            try:
+                record.update(ok=True, **future.result())
+            except Exception as e:
+                failed += 1
+                record.update(ok=False, error=str(e).splitlines()[0] if str(e) else type(e).__name__)
+            print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+    print(
+        f"Fan-out: {len(tabs)} target(s), {len(tabs) - failed} ok, {failed} failed "
+        f"({time.time() - start:.1f}s, {min(args.workers, len(tabs))} worker(s))",
+        file=sys.stderr,
+    )
+    if failed:
+        sys.exit(1)
+
+
+def _add_fanout_args(p):
+    p.add_argument("--targets",
+                   help="Fan out across tabs concurrently: all | context:<id> | search:<query> "
+                        "(JSON lines keyed by target id; selection unchanged)")
+    p.add_argument("--workers", type=int, default=8,
+                   help="Max concurrent tabs for --targets (default: 8)")
+
+
 def cmd_list(client, args):
     """List browser tabs."""
     if args.contexts:
@@ -171,6 +267,16 @@ def cmd_list(client, args):
     indexed_tabs = indexed_tabs[:args.limit]
 
     selected = client.get_selected_target()
+    pooled = pooled_ids(client)
+
+    mode = output_mode(args)
+    if mode:
+        emit_records(({
+            "index": i, "id": tab.get("id"), "type": tab.get("type"),
+            "title": tab.get("title", ""), "url": tab.get("url", ""),
+            "selected": tab.get("id") == selected, "pooled": tab.get("id") in pooled,
+        } for i, tab in indexed_tabs), mode)
+        return
 
     for i, tab in indexed_tabs:
         tid = tab.get("id", "?")
@@ -178,6 +284,8 @@ def cmd_list(client, args):
         url = tab.get("url", "")[:80]
         tab_type = tab.get("type", "?")
         marker = " *" if tid == selected else ""
+        if tid in pooled:
+            marker += " [pool]"
         print(f"  [{i}]{marker} ({tab_type}) {title}")
         print(f"       {url}")
         print(f"       id: {tid}")
@@ -240,16 +348,17 @@ def cmd_select(client, args):
     sys.exit(1)
 
 
-def cmd_screenshot(client, args):
-    """Take a screenshot of the selected tab."""
-    client.connect()
+def _capture_screenshot(client, fmt, full_page):
+    """Capture the connected tab as image bytes (caller owns connect/close)."""
+    import base64
+
     full_page_active = False
     try:
-        params = {"format": args.format}
-        if args.format == "jpeg":
+        params = {"format": fmt}
+        if fmt == "jpeg":
             params["quality"] = 80
 
-        if args.full_page:
+        if full_page:
             # Get full page dimensions
             metrics = client.send("Page.getLayoutMetrics")
             content = metrics.get("contentSize", {})
@@ -267,19 +376,42 @@ def cmd_screenshot(client, args):
             params["captureBeyondViewport"] = True
 
         result = client.send("Page.captureScreenshot", params)
-
-        # Decode and save
-        data = base64.b64decode(result["data"])
-        ext = "jpg" if args.format == "jpeg" else args.format
-        output = args.output or f"/tmp/cdp-screenshot-{int(time.time())}.{ext}"
-        Path(output).write_bytes(data)
-        print(f"Screenshot saved: {output} ({len(data)} bytes)")
+        return base64.b64decode(result["data"])
     finally:
         if full_page_active:
             try:
                 client.send("Emulation.clearDeviceMetricsOverride")
             except Exception:
                 pass
+
+
+def cmd_screenshot(client, args):
+    """Take a screenshot of the selected tab."""
+    if args.targets:
+        ext = "jpg" if args.format == "jpeg" else args.format
+        out_dir = args.output or "/tmp"
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = int(time.time())
+
+        def _shot(tab_client, tab):
+            data = _capture_screenshot(tab_client, args.format, args.full_page)
+            path = os.path.join(out_dir, f"cdp-screenshot-{tab['id'][:8]}-{stamp}.{ext}")
+            with open(path, "wb") as f:
+                f.write(data)
+            return {"path": path, "bytes": len(data)}
+
+        _run_fanout(client, args, _shot)
+        return
+
+    client.connect()
+    try:
+        data = _capture_screenshot(client, args.format, args.full_page)
+        ext = "jpg" if args.format == "jpeg" else args.format
+        output = args.output or f"/tmp/cdp-screenshot-{int(time.time())}.{ext}"
+        with open(output, "wb") as f:
+            f.write(data)
+        print(f"Screenshot saved: {output} ({len(data)} bytes)")
+    finally:
         client.close()
 
 
@@ -390,6 +522,53 @@ def _save_snapshot_cache(target_id, entries, retrieval_depth):
         print(f"Warning: failed to update snapshot cache: {e}", file=sys.stderr)
 
 
+def _snapshot_delta(cached, entries, order):
+    """(added, removed, changed) node keys between a cached and a fresh snapshot."""
+    added = [k for k in order if k not in cached]
+    removed = [k for k in cached if k not in entries]
+    changed = [
+        k for k in order
+        if k in cached and (
+            cached[k].get("role") != entries[k]["role"]
+            or cached[k].get("name") != entries[k]["name"]
+            or cached[k].get("depth") != entries[k]["depth"]
+            or cached[k].get("parent") != entries[k]["parent"]
+        )
+    ]
+    return added, removed, changed
+
+
+def _snapshot_records(target_id, entries, order, retrieval_depth, diff, mode):
+    """--json / --jsonl snapshot: node records, or change records with --diff.
+
+    Without a comparable baseline --diff emits the full tree, with the
+    reason on stderr, exactly like the text form.
+    """
+    def node(e):
+        return {"role": e.get("role", ""), "name": e.get("name") or "", "depth": e.get("depth", 0)}
+
+    cached = None
+    if diff and target_id:
+        cached, cached_depth = _load_snapshot_cache(target_id)
+        if cached is None:
+            note(f"No cached baseline for target {target_id[:8]}... — emitting full tree")
+        elif cached_depth != retrieval_depth:
+            note(f"Cached snapshot depth {cached_depth} != {retrieval_depth} — emitting full tree")
+            cached = None
+    if cached is None:
+        emit_records((node(entries[k]) for k in order), mode)
+        return
+    added, removed, changed = _snapshot_delta(cached, entries, order)
+    records = [dict(node(entries[k]), change="added") for k in added]
+    records += [dict(node(cached[k]), change="removed") for k in removed]
+    records += [
+        dict(node(entries[k]), change="changed", was=node(cached[k]),
+             reparented=cached[k].get("parent") != entries[k].get("parent"))
+        for k in changed
+    ]
+    emit_records(records, mode)
+
+
 def _print_snapshot_diff(target_id, entries, order, retrieval_depth):
     """Print only the delta vs the cached snapshot for this target.
 
@@ -415,17 +594,7 @@ def _print_snapshot_diff(target_id, entries, order, retrieval_depth):
         _print_snapshot_full(entries, order)
         return
 
-    added = [k for k in order if k not in cached]
-    removed = [k for k in cached if k not in entries]
-    changed = [
-        k for k in order
-        if k in cached and (
-            cached[k].get("role") != entries[k]["role"]
-            or cached[k].get("name") != entries[k]["name"]
-            or cached[k].get("depth") != entries[k]["depth"]
-            or cached[k].get("parent") != entries[k]["parent"]
-        )
-    ]
+    added, removed, changed = _snapshot_delta(cached, entries, order)
 
     if not added and not removed and not changed:
         print(f"Snapshot diff vs cached (target {target_id[:8]}...): no changes")
@@ -464,6 +633,13 @@ def _print_snapshot_diff(target_id, entries, order, retrieval_depth):
         print(f"... and {remaining} more changes (use without --diff for full tree)")
 
 
+def _fetch_ax_entries(client, depth):
+    """Fetch the AX tree of the connected tab and reduce it to (entries, order)."""
+    client.send("Accessibility.enable")
+    result = client.send("Accessibility.getFullAXTree", {"depth": depth})
+    return _build_ax_entries(result.get("nodes", []))
+
+
 def cmd_snapshot(client, args):
     """Get accessibility tree snapshot.
 
@@ -472,15 +648,31 @@ def cmd_snapshot(client, args):
     of the full tree. The cache is always refreshed — with or without
     --diff — so a later --diff call has a baseline.
     """
+    if args.targets:
+        if args.diff:
+            raise CDPError("--diff is not supported with --targets (fan-out prints full trees)")
+
+        def _snap(tab_client, tab):
+            entries, order = _fetch_ax_entries(tab_client, args.depth)
+            _save_snapshot_cache(tab["id"], entries, args.depth)
+            return {"nodes": [
+                {"role": entries[k]["role"], "name": entries[k]["name"],
+                 "depth": entries[k]["depth"]}
+                for k in order
+            ]}
+
+        _run_fanout(client, args, _snap)
+        return
+
     target_id = client.get_selected_target()
     client.connect()
     try:
-        client.send("Accessibility.enable")
-        result = client.send("Accessibility.getFullAXTree", {"depth": args.depth})
-        nodes = result.get("nodes", [])
-        entries, order = _build_ax_entries(nodes)
+        entries, order = _fetch_ax_entries(client, args.depth)
 
-        if args.diff:
+        mode = output_mode(args)
+        if mode:
+            _snapshot_records(target_id, entries, order, args.depth, args.diff, mode)
+        elif args.diff:
             if target_id:
                 _print_snapshot_diff(target_id, entries, order, args.depth)
             else:
@@ -499,16 +691,8 @@ def cmd_snapshot(client, args):
         client.close()
 
 
-def cmd_evaluate(client, args):
-    """Evaluate JavaScript expression."""
-    if args.stdin:
-        expression = sys.stdin.read().strip()
-    elif args.expression:
-        expression = args.expression
-    else:
-        print("Error: Provide expression argument or use --stdin", file=sys.stderr)
-        sys.exit(1)
-
+def _prepare_expression(expression, args):
+    """Apply const/let rewriting and the --await async-IIFE auto-wrap."""
     if not args.no_rewrite:
         expression = _redeclare_safe(expression)
 
@@ -519,17 +703,66 @@ def cmd_evaluate(client, args):
             expression = f"(async () => {{ return {stripped}; }})()"
         else:
             expression = f"(async () => {{ {expression} }})()"
+    return expression
+
+
+def _evaluate_value(client, expression, await_promise, context_id):
+    """Runtime.evaluate by value for fan-out: returns {"value": ...} or raises
+    CDPError carrying the page exception text."""
+    params = {"expression": expression, "returnByValue": True}
+    if await_promise:
+        params["awaitPromise"] = True
+    if context_id is not None:
+        params["contextId"] = context_id
+    # User code runs as long as it likes: keep the fixed budget.
+    result = client.send("Runtime.evaluate", params, timeout=DEFAULT_TIMEOUT)
+    exc = result.get("exceptionDetails")
+    if exc:
+        desc = exc.get("exception", {}).get("description", "")
+        raise CDPError(f"Exception: {exc.get('text', '')} {desc}".strip())
+    obj = result.get("result", {})
+    if obj.get("type") == "undefined":
+        return {"value": None, "type": "undefined"}
+    if "value" in obj:
+        return {"value": obj["value"]}
+    return {"value": obj.get("description"), "type": obj.get("type")}
+
+
+def cmd_evaluate(client, args):
+    """Evaluate JavaScript expression."""
+    if args.stdin:
+        expression = sys.stdin.read().strip()
+    elif args.expression:
+        expression = args.expression
+    else:
+        print("Error: Provide expression argument or use --stdin", file=sys.stderr)
+        sys.exit(1)
+
+    expression = _prepare_expression(expression, args)
 
     if args.frame and args.frame_url:
         print("Error: --frame and --frame-url are mutually exclusive", file=sys.stderr)
         sys.exit(1)
 
+    if args.targets:
+        def _eval(tab_client, tab):
+            context_id = (
+                tab_client.resolve_frame_context_id_by_url(args.frame_url)
+                if args.frame_url else tab_client.resolve_frame_context_id(args.frame)
+            )
+            return _evaluate_value(tab_client, expression, args.await_promise, context_id)
+
+        _run_fanout(client, args, _eval)
+        return
+
+    def _resolve_context():
+        if args.frame_url:
+            return client.resolve_frame_context_id_by_url(args.frame_url)
+        return client.resolve_frame_context_id(args.frame)
+
     client.connect()
     try:
-        if args.frame_url:
-            context_id = client.resolve_frame_context_id_by_url(args.frame_url)
-        else:
-            context_id = client.resolve_frame_context_id(args.frame)
+        context_id = _resolve_context()
 
         params = {
             "expression": expression,
@@ -540,7 +773,43 @@ def cmd_evaluate(client, args):
         if context_id is not None:
             params["contextId"] = context_id
 
-        result = client.send("Runtime.evaluate", params)
+        def _evaluate(send):
+            try:
+                # User code runs as long as it likes: keep the fixed budget.
+                return send("Runtime.evaluate", params, timeout=DEFAULT_TIMEOUT)
+            except CDPConnectionError:
+                raise
+            except CDPError as e:
+                # A context id from a collector's cache can go stale if the frame
+                # navigated after the collector's last write — re-resolve through
+                # this session's own Runtime.enable pass and retry once.
+                if context_id is None or not client.uses_shared_frame_cache() \
+                        or "context" not in str(e).lower():
+                    raise
+                client.invalidate_frame_cache()
+                params["contextId"] = _resolve_context()
+                return send("Runtime.evaluate", params, timeout=DEFAULT_TIMEOUT)
+
+        mode = output_mode(args)
+        if mode:
+            # Pass the browser's JSON for the value straight through when the
+            # reply layout allows (no decode/re-encode of large results).
+            text = _evaluate(client.send_raw)
+            value = raw_value(text)
+            if value is not None:
+                emit_raw(value)
+                return
+            result = json.loads(text)
+            exc = result.get("exceptionDetails")
+            if exc:
+                desc = exc.get("exception", {}).get("description", "")
+                print(f"Exception: {exc.get('text', '')} {desc}", file=sys.stderr)
+                sys.exit(1)
+            obj = result.get("result", {})
+            emit(obj["value"] if "value" in obj else obj.get("description"))
+            return
+
+        result = _evaluate(client.send)
         obj = result.get("result", {})
 
         if obj.get("type") == "undefined":
@@ -569,7 +838,13 @@ def cmd_evaluate(client, args):
         client.close()
 
 
-def _post_nav_probe(client, timeouts=(5, 10)):
+def _probe_timeouts(client):
+    """(first, second) probe budgets: the learned Runtime.evaluate timeout
+    (2-5s), then the 10s busy-renderer allowance."""
+    return (min(5, client.adaptive_timeout("Runtime.evaluate", floor=2)), 10)
+
+
+def _post_nav_probe(client, timeouts=None):
     """Bounded renderer-liveness probe after navigate/reload.
 
     A reload issued while the renderer had pending/blocked cross-origin
@@ -583,6 +858,8 @@ def _post_nav_probe(client, timeouts=(5, 10)):
 
     Returns True when the renderer answered.
     """
+    if timeouts is None:
+        timeouts = _probe_timeouts(client)
     reason = "no response"
     for timeout in timeouts:
         try:
@@ -599,7 +876,7 @@ def _post_nav_probe(client, timeouts=(5, 10)):
             reason = str(e).splitlines()[0]
     print(
         f"Error: tab unresponsive after navigation ({reason}; "
-        f"{len(timeouts)} attempt(s), {sum(timeouts)}s total). The renderer "
+        f"{len(timeouts)} attempt(s), {sum(timeouts):g}s total). The renderer "
         "may be wedged — or still busy with a long task. Re-check with "
         "`evaluate \"1\"`; if it stays silent, run 'revive' to close and "
         "reopen this tab via the HTTP API (discards renderer state: "
@@ -696,12 +973,22 @@ def cmd_revive(client, args):
         sys.exit(1)
 
     # Open-then-close: if /json/new fails, the wedged tab still exists and
-    # state.json keeps pointing at a live (if unresponsive) target.
-    new_tab = client.new_tab(url)
-    new_id = new_tab.get("id")
-    if not new_id:
-        print(f"Error: /json/new returned no target id: {new_tab}", file=sys.stderr)
-        sys.exit(1)
+    # state.json keeps pointing at a live (if unresponsive) target. A warm
+    # pool tab from the same browser context skips tab + renderer creation;
+    # it is navigated once connected below.
+    pool = pool_status(client)
+    context = None
+    if set(pool["sizes"]) - {"default"}:
+        context = next((t.get("browserContextId") for t in _get_browser_targets(client)
+                        if t.get("targetId") == target_id), None)
+    new_id = take_tab(client, context) if pool["sizes"] else None
+    pooled = new_id is not None
+    if not pooled:
+        new_tab = client.new_tab(url)
+        new_id = new_tab.get("id")
+        if not new_id:
+            print(f"Error: /json/new returned no target id: {new_tab}", file=sys.stderr)
+            sys.exit(1)
 
     if not client.close_tab(target_id):
         print(
@@ -712,12 +999,15 @@ def cmd_revive(client, args):
 
     client.save_state(new_id)
     client.activate_tab(new_id)
-    print(f"Revived tab: closed {target_id[:8]}..., reopened as {new_id[:8]}...")
+    print(f"Revived tab: closed {target_id[:8]}..., reopened as {new_id[:8]}..."
+          + (" (warm pool)" if pooled else ""))
     print(f"  URL: {url}")
 
     # Confirm the fresh renderer answers before handing control back.
     try:
         client.connect(target_id=new_id)
+        if pooled:
+            client.send("Page.navigate", {"url": url})
         if _post_nav_probe(client, timeouts=(10,)):
             print("  Renderer responsive.")
         else:
@@ -1058,6 +1348,10 @@ def cmd_cdp_call(client, args):
 
     client.connect()
     try:
+        mode = output_mode(args)
+        if mode:
+            emit_raw(client.send_raw(args.method, params=params))
+            return
         result = client.send(args.method, params=params)
         print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
     finally:
@@ -1097,6 +1391,11 @@ def cmd_error_list(client, args):
 
     matching = matching[-args.limit:]
 
+    mode = output_mode(args)
+    if mode:
+        emit_records(matching, mode)
+        return
+
     if not matching:
         print(f"No matching errors (limit={args.limit}, filter={args.filter!r})")
         return
@@ -1113,6 +1412,38 @@ def cmd_error_list(client, args):
         print(f"[{ts_str}] {category}{suffix}: {error}")
 
 
+def cmd_pool_start(client, args):
+    """Keep --size warm about:blank tabs open for new_page / revive (tab_pool)."""
+    context = None
+    if args.context:
+        _, context = _resolve_context_filter(client, args.context)
+    opened = configure_pool(client, args.size, context)
+    pool = pool_status(client)
+    label = context[:8] + "..." if context else "default"
+    print(f"Tab pool ({label}): {args.size} tab(s), opened {opened} now")
+    print(f"  Contexts pooled: {len(pool['sizes'])}")
+
+
+def cmd_pool_status(client, args):
+    """Show configured pool sizes and the tabs parked in each context."""
+    pool = pool_status(client)
+    if not pool["sizes"]:
+        print("Tab pool: disabled (pool_start --size N to enable)")
+        return
+    for key, size in sorted(pool["sizes"].items()):
+        ids = pool["tabs"].get(key, [])
+        label = "default" if key == "default" else key[:8] + "..."
+        print(f"  {label}: {len(ids)}/{size} warm")
+        for tid in ids:
+            print(f"       id: {tid}")
+
+
+def cmd_pool_stop(client, args):
+    """Disable the pool and close its tabs."""
+    closed = stop_pool(client)
+    print(f"Tab pool disabled; closed {closed} pooled tab(s)")
+
+
 # Commands that bypass the headless guard:
 # - version: diagnostic/info-only
 # - error_list: reads local JSONL file, no CDP commands
@@ -1121,13 +1452,36 @@ LOCAL_COMMANDS = {"version", "error_list", "doctor"}
 
 
 def main():
+    commands = {
+        "version": cmd_version,
+        "list": cmd_list,
+        "select": cmd_select,
+        "screenshot": cmd_screenshot,
+        "snapshot": cmd_snapshot,
+        "evaluate": cmd_evaluate,
+        "navigate": cmd_navigate,
+        "reload": cmd_reload,
+        "revive": cmd_revive,
+        "pool_start": cmd_pool_start,
+        "pool_status": cmd_pool_status,
+        "pool_stop": cmd_pool_stop,
+        "back": cmd_back,
+        "forward": cmd_forward,
+        "wait": cmd_wait,
+        "doctor": cmd_doctor,
+        "cdp_call": cmd_cdp_call,
+        "error_list": cmd_error_list,
+    }
+
     parser = argparse.ArgumentParser(
         prog="cdp-v1",
         description="Core CDP browser operations",
     )
     parser.add_argument("--host", help="CDP host (default: $CDP_HOST or 127.0.0.1)")
     parser.add_argument("--port", type=int, help="CDP port (default: $CDP_PORT or 9222)")
-    sub = parser.add_subparsers(dest="command", required=True)
+    # Only the invoked command's parser is built (see subcommands).
+    sub = LazySubparsers(parser.add_subparsers(dest="command", required=True),
+                         invoked_command(sys.argv[1:], commands))
 
     # version
     sub.add_parser("version", help="Show browser version")
@@ -1148,9 +1502,10 @@ def main():
 
     # screenshot
     p_ss = sub.add_parser("screenshot", help="Capture screenshot")
-    p_ss.add_argument("--output", "-o", help="Output file path")
+    p_ss.add_argument("--output", "-o", help="Output file path (directory with --targets)")
     p_ss.add_argument("--format", choices=["png", "jpeg"], default="png")
     p_ss.add_argument("--full-page", action="store_true", help="Capture full page")
+    _add_fanout_args(p_ss)
 
     # snapshot
     p_snap = sub.add_parser("snapshot", help="Accessibility tree snapshot")
@@ -1158,6 +1513,7 @@ def main():
     p_snap.add_argument("--diff", action="store_true",
                         help="Show delta vs the cached snapshot for this target (updates cache); "
                              "falls back to full tree with a note when there is no baseline yet")
+    _add_fanout_args(p_snap)
 
     # evaluate
     p_eval = sub.add_parser("evaluate", help="Evaluate JavaScript")
@@ -1173,6 +1529,7 @@ def main():
                         help="CSS selector of a frame owner element, or 'main' for top frame")
     p_eval.add_argument("--frame-url", dest="frame_url", default=None,
                         help="URL substring to match a frame (use when selectors are unstable)")
+    _add_fanout_args(p_eval)
 
     # navigate
     p_nav = sub.add_parser("navigate", help="Navigate to URL")
@@ -1195,6 +1552,14 @@ def main():
     p_revive.add_argument("--url", default=None,
                           help="Reopen with this URL instead of the tab's current URL")
 
+    # pool_start / pool_status / pool_stop
+    p_pool = sub.add_parser("pool_start",
+                            help="Keep N warm about:blank tabs for instant new_page / revive")
+    p_pool.add_argument("--size", type=int, default=2, help="Warm tabs to keep (default: 2, 0 removes)")
+    p_pool.add_argument("--context", help="Pool for this browser context (id or short prefix; default: default context)")
+    sub.add_parser("pool_status", help="Show the warm tab pool")
+    sub.add_parser("pool_stop", help="Disable the warm tab pool and close its tabs")
+
     # back
     p_back = sub.add_parser("back", help="Navigate back in history")
     p_back.add_argument("--wait-for", choices=["load", "none"], default="none",
@@ -1242,27 +1607,10 @@ def main():
     p_err.add_argument("--since-seconds", dest="since_seconds", type=int,
                        help="Only entries within last N seconds")
 
+    add_output_args(parser, sub)
     args = parser.parse_args()
     client = CDPClient(host=args.host, port=args.port)
 
-    commands = {
-        "version": cmd_version,
-        "list": cmd_list,
-        "select": cmd_select,
-        "screenshot": cmd_screenshot,
-        "snapshot": cmd_snapshot,
-        "evaluate": cmd_evaluate,
-        "navigate": cmd_navigate,
-        "reload": cmd_reload,
-        "revive": cmd_revive,
-        "back": cmd_back,
-        "forward": cmd_forward,
-        "wait": cmd_wait,
-        "doctor": cmd_doctor,
-        "cdp_call": cmd_cdp_call,
-        "error_list": cmd_error_list,
-    }
-
     try:
         # doctor is exempt from the global lock: diagnostics must remain
         # runnable during contention. All other commands serialize CDP access.
@@ -6,7 +6,7 @@
 # ]
 # ///
 """
-v2_interact — Browser interaction: click, fill, press_key, hover, new_page, close_page.
+v2_interact — Browser interaction: click, fill, press_key, type, hover, new_page, close_page.
 """
 
 import argparse
@@ -14,10 +14,22 @@ import json
 import os
 import sys
 import time
-from pathlib import Path
 
-sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
 from cdp_client import CDPClient, CDPConnectionError, CDPError, cdp_lock
+from input_paths import (
+    CURVES,
+    DEFAULT_RATE_HZ,
+    mouse_move_calls,
+    plan_steps,
+    scroll_gesture_params,
+    trajectory,
+    wheel_calls,
+)
+from key_input import parse_sequence, sequence_calls, text_calls
+from output import add_output_args, emit, emit_records, note, output_mode
+from subcommands import LazySubparsers, invoked_command
+from tab_pool import take_tab
 
 
 def _resolve_selector(client, selector):
@@ -55,6 +67,96 @@ def _resolve_selector(client, selector):
     return obj
 
 
+# In-page actionability wait for click --selector. One Runtime.evaluate
+# (awaitPromise) loops until the element is visible, enabled, has the same
+# box on two consecutive animation frames, and is the hit-test target at its
+# center (elementFromPoint — the in-page twin of DOM.getNodeForLocation,
+# descending into open shadow roots) — or the deadline passes. rAF never
+# fires in background tabs, so each frame wait is raced against a timer.
+_ACTIONABLE_JS = """
+(async (sel, timeoutMs) => {
+  const start = performance.now();
+  const frame = () => new Promise(r => { requestAnimationFrame(() => r()); setTimeout(r, 100); });
+  const same = (a, b) => Math.abs(a.x - b.x) < 0.5 && Math.abs(a.y - b.y) < 0.5
+    && Math.abs(a.width - b.width) < 0.5 && Math.abs(a.height - b.height) < 0.5;
+  const inside = (el, node) => {
+    for (let n = node; n; n = n.parentNode || n.host) if (n === el) return true;
+    return false;
+  };
+  const describe = n => n ? n.tagName.toLowerCase()
+    + (n.id ? '#' + n.id : '')
+    + (typeof n.className === 'string' && n.className.trim()
+       ? '.' + n.className.trim().split(/\\s+/).slice(0, 2).join('.') : '') : 'nothing';
+  let reason = 'not found', scrolled = false;
+  while (true) {
+    const el = document.querySelector(sel);
+    if (el) {
+      const r1 = el.getBoundingClientRect();
+      const style = getComputedStyle(el);
+      if (r1.width === 0 || r1.height === 0 || style.visibility === 'hidden') {
+        reason = 'not visible (zero size or visibility:hidden)';
+      } else if (el.matches(':disabled') || el.getAttribute('aria-disabled') === 'true') {
+        reason = 'disabled';
+      } else {
+        await frame();
+        const r2 = el.getBoundingClientRect();
+        const x = r2.x + r2.width / 2, y = r2.y + r2.height / 2;
+        if (!same(r1, r2)) {
+          reason = 'not stable (box moving between animation frames)';
+        } else if (x < 0 || y < 0 || x > innerWidth || y > innerHeight) {
+          reason = 'outside viewport';
+          if (!scrolled) { el.scrollIntoView({block: 'center', inline: 'center'}); scrolled = true; }
+        } else {
+          let hit = document.elementFromPoint(x, y);
+          while (hit && hit.shadowRoot) {
+            const inner = hit.shadowRoot.elementFromPoint(x, y);
+            if (!inner || inner === hit) break;
+            hit = inner;
+          }
+          if (inside(el, hit)) {
+            return {x, y, width: r2.width, height: r2.height,
+                    tag: el.tagName.toLowerCase(),
+                    text: (el.textContent || '').trim().slice(0, 50),
+                    waited: Math.round(performance.now() - start)};
+          }
+          reason = 'occluded by <' + describe(hit) + '>';
+        }
+      }
+    }
+    if (performance.now() - start > timeoutMs) return {error: reason};
+    await frame();
+  }
+})
+"""
+
+
+def _wait_actionable(client, selector, timeout_ms):
+    """Wait in-page until selector is clickable; return its center like _resolve_selector.
+
+    Replaces several full-command retries on animating or lazily laid-out
+    pages with a single round-trip that waits (bounded by timeout_ms) for
+    visibility, enabled state, a stable box, and an unobstructed center.
+    Raises CDPError naming the last failing check on timeout.
+    """
+    result = client.send("Runtime.evaluate", {
+        "expression": f"{_ACTIONABLE_JS}({json.dumps(selector)}, {int(timeout_ms)})",
+        "awaitPromise": True,
+        "returnByValue": True,
+    }, timeout=timeout_ms / 1000.0 + 10)
+    exc = result.get("exceptionDetails")
+    if exc:
+        desc = exc.get("exception", {}).get("description", "") or exc.get("text", "")
+        raise CDPError(f"Actionability check failed for {selector!r}: {desc}")
+    obj = result.get("result", {}).get("value") or {}
+    if "error" in obj:
+        raise CDPError(
+            f"Element {selector!r} not clickable after {timeout_ms}ms: {obj['error']}.\n"
+            f"  Inspect: v2 get_bounds --selector '{selector}'\n"
+            "  Or skip the check: click --selector ... --force"
+        )
+    return obj
+
+
 def _dispatch_mouse(client, x, y, event_type, button="left", click_count=1, modifiers=0):
     """Send mouse event at coordinates."""
     client.send("Input.dispatchMouseEvent", {
@@ -278,6 +380,10 @@ def cmd_click(client, args):
 
     Supports button (left/right/middle), multi-click (double/triple), and modifier keys.
     Defaults preserve original single-left-click behavior.
+
+    With --selector, waits (up to --timeout-ms) until the element is
+    actionable — visible, enabled, stable, unobstructed — before firing;
+    --force restores the old resolve-once-and-fire behavior.
     """
     if not args.selector and (args.x is None or args.y is None):
         print("Error: Provide --selector or both x y coordinates", file=sys.stderr)
@@ -289,9 +395,14 @@ def cmd_click(client, args):
     client.connect()
     try:
         if args.selector:
-            info = _resolve_selector(client, args.selector)
+            if args.force:
+                info = _resolve_selector(client, args.selector)
+                waited = ""
+            else:
+                info = _wait_actionable(client, args.selector, args.timeout_ms)
+                waited = f", actionable after {info['waited']}ms" if info.get("waited") else ""
             x, y = info["x"], info["y"]
-            print(f"Resolved: <{info['tag']}> \"{info['text']}\" at ({x:.0f}, {y:.0f})")
+            print(f"Resolved: <{info['tag']}> \"{info['text']}\" at ({x:.0f}, {y:.0f}){waited}")
         else:
             x, y = args.x, args.y
 
@@ -318,15 +429,55 @@ def cmd_click(client, args):
         client.close()
 
 
+def _scroll_wheel(client, x, y, args):
+    """Wheel-event scroll: one event, or a timestamped pipelined series with --smooth."""
+    steps = plan_steps(None, args.duration_ms, args.rate, default=1) if args.smooth else 1
+    for i in range(args.repeat + 1):
+        if i:
+            time.sleep(args.repeat_delay_ms / 1000.0)
+        client.send_batch(wheel_calls(
+            x, y, args.delta_x, args.delta_y, steps=steps,
+            duration_ms=args.duration_ms if args.smooth else None, rate_hz=args.rate,
+        ))
+    return f"{steps} wheel event(s)" if steps > 1 else "wheel"
+
+
+def _scroll_gesture(client, x, y, args):
+    """Browser-synthesized scroll via Input.synthesizeScrollGesture.
+
+    One call covers the whole gesture including repeats (the browser paces
+    repeatCount/repeatDelayMs itself). The method is experimental — on a
+    CDP error the caller falls back to the pipelined wheel path.
+    """
+    params = scroll_gesture_params(
+        x, y, args.delta_x, args.delta_y,
+        duration_ms=args.duration_ms, repeat=args.repeat,
+        repeat_delay_ms=args.repeat_delay_ms,
+    )
+    # The response only arrives once the gesture (and every repeat) finished.
+    budget = (args.repeat + 1) * (args.duration_ms + args.repeat_delay_ms) / 1000.0
+    client.send("Input.synthesizeScrollGesture", params, timeout=30 + budget)
+    return "synthesized gesture"
+
+
 def cmd_scroll(client, args):
     """Scroll the page (or at specific coordinates) via mouseWheel.
 
     Coordinates default to viewport center if neither x/y nor --selector given.
     Positive delta_y scrolls down; negative scrolls up.
+
+    --smooth splits the delta into timestamped wheel events (duration × rate)
+    sent pipelined; --gesture asks the browser to synthesize the scroll
+    (Input.synthesizeScrollGesture), falling back to --smooth if unavailable.
+    --repeat N re-issues the scroll N more times, --repeat-delay-ms apart —
+    enough to drive infinite-scroll loading in one command.
     """
     if (args.x is None) != (args.y is None):
         print("Error: provide both x and y, or neither", file=sys.stderr)
         sys.exit(1)
+    if args.repeat < 0:
+        print(f"Error: --repeat must be >= 0 (got {args.repeat})", file=sys.stderr)
+        sys.exit(1)
 
     client.connect()
     try:
@@ -342,17 +493,29 @@ def cmd_scroll(client, args):
             x = vp.get("clientWidth", 800) / 2
             y = vp.get("clientHeight", 600) / 2
 
-        client.send("Input.dispatchMouseEvent", {
-            "type": "mouseWheel",
-            "x": x,
-            "y": y,
-            "deltaX": args.delta_x,
-            "deltaY": args.delta_y,
-        })
+        mode = None
+        if args.gesture:
+            try:
+                mode = _scroll_gesture(client, x, y, args)
+            except CDPConnectionError:
+                raise
+            except CDPError as e:
+                print(
+                    f"Warning: synthesizeScrollGesture unavailable ({e}) — "
+                    "falling back to smooth wheel events",
+                    file=sys.stderr,
+                )
+                args.smooth = True
+        if mode is None:
+            mode = _scroll_wheel(client, x, y, args)
 
         direction = "down" if args.delta_y > 0 else ("up" if args.delta_y < 0 else "")
         suffix = f" ({direction})" if direction else ""
-        print(f"Scrolled at ({x:.0f}, {y:.0f}) dx={args.delta_x} dy={args.delta_y}{suffix}")
+        repeat = f" ×{args.repeat + 1}" if args.repeat else ""
+        print(
+            f"Scrolled at ({x:.0f}, {y:.0f}) dx={args.delta_x} dy={args.delta_y}"
+            f"{suffix}{repeat} [{mode}]"
+        )
     finally:
         client.close()
 
@@ -450,55 +613,76 @@ def cmd_fill(client, args):
 
 
 def cmd_press_key(client, args):
-    """Press a keyboard key."""
+    """Press a key, chord, or comma-separated key sequence.
+
+    'Ctrl+Shift+K, Enter, "Hello"' — see key_input for the grammar. The whole
+    rawKeyDown/char/keyUp stream goes out as one pipelined batch.
+    """
+    modifiers = _parse_modifiers(args.modifiers)
+    actions = parse_sequence(args.key)
+    if not actions:
+        raise CDPError(f"Empty key sequence: {args.key!r}")
+    calls = sequence_calls(actions, modifiers)
     client.connect()
     try:
-        modifiers = _parse_modifiers(args.modifiers)
+        client.send_batch(calls)
+        print(f"Pressed: {args.key}" + (f" (modifiers: {args.modifiers})" if args.modifiers else "")
+              + (f" [{len(calls)} events]" if len(calls) > 2 else ""))
+    finally:
+        client.close()
 
-        key = args.key
-        # Map common key names
-        key_map = {
-            "enter": ("Enter", "Enter", 13),
-            "tab": ("Tab", "Tab", 9),
-            "escape": ("Escape", "Escape", 27),
-            "esc": ("Escape", "Escape", 27),
-            "backspace": ("Backspace", "Backspace", 8),
-            "delete": ("Delete", "Delete", 46),
-            "space": (" ", "Space", 32),
-            "arrowup": ("ArrowUp", "ArrowUp", 38),
-            "arrowdown": ("ArrowDown", "ArrowDown", 40),
-            "arrowleft": ("ArrowLeft", "ArrowLeft", 37),
-            "arrowright": ("ArrowRight", "ArrowRight", 39),
-        }
 
-        if key.lower() in key_map:
-            key_val, code, keycode = key_map[key.lower()]
-        else:
-            key_val = key
-            code = f"Key{key.upper()}" if len(key) == 1 else key
-            keycode = ord(key.upper()) if len(key) == 1 else 0
+def cmd_type(client, args):
+    """Type literal text as real key events (keydown/keypress/input/keyup per char).
 
-        params = {
-            "type": "keyDown",
-            "key": key_val,
-            "code": code,
-            "modifiers": modifiers,
-            "windowsVirtualKeyCode": keycode,
-        }
-        client.send("Input.dispatchKeyEvent", params)
-
-        params["type"] = "keyUp"
-        client.send("Input.dispatchKeyEvent", params)
-        print(f"Pressed: {key}" + (f" (modifiers: {args.modifiers})" if args.modifiers else ""))
+    Unlike `fill` (one Input.insertText), pages with per-keystroke handlers —
+    autocomplete, masked inputs, hotkey listeners — see every key. Characters
+    outside the US layout table fall back to insertText.
+    """
+    text = sys.stdin.read() if args.text == "-" else args.text
+    calls = text_calls(text)
+    client.connect()
+    try:
+        if args.selector:
+            result = client.send("Runtime.evaluate", {
+                "expression": f"""(() => {{
+                    const el = document.querySelector({json.dumps(args.selector)});
+                    if (!el) return false;
+                    el.focus();
+                    return true;
+                }})()""",
+                "returnByValue": True,
+            })
+            if not result.get("result", {}).get("value"):
+                raise CDPError(f"Element not found: {args.selector}")
+        if calls:
+            client.send_batch(calls)
+        print(f"Typed {len(text)} chars: {text[:50]}")
     finally:
         client.close()
 
 
+def _parse_point(spec):
+    """Parse 'x,y' into a float pair; raises CDPError on malformed input."""
+    parts = [p.strip() for p in (spec or "").split(",")]
+    try:
+        x, y = (float(p) for p in parts)
+    except ValueError:
+        raise CDPError(f"Expected 'x,y' coordinates (got {spec!r})")
+    return x, y
+
+
 def cmd_hover(client, args):
-    """Hover over coordinates or CSS selector."""
+    """Hover over coordinates or CSS selector.
+
+    --from X,Y moves the pointer along an interpolated path (--curve,
+    --duration-ms, --rate) ending at the target, sent as one pipelined
+    batch — for hover menus that only open on a continuous approach.
+    """
     if not args.selector and (args.x is None or args.y is None):
         print("Error: Provide --selector or both x y coordinates", file=sys.stderr)
         sys.exit(1)
+    start = _parse_point(args.from_point) if args.from_point else None
     client.connect()
     try:
         if args.selector:
@@ -508,18 +692,38 @@ def cmd_hover(client, args):
         else:
             x, y = args.x, args.y
 
-        _dispatch_mouse(client, x, y, "mouseMoved")
-        print(f"Hovered at ({x:.0f}, {y:.0f})")
+        if start is None:
+            _dispatch_mouse(client, x, y, "mouseMoved")
+            print(f"Hovered at ({x:.0f}, {y:.0f})")
+            return
+
+        points = trajectory(start[0], start[1], x, y, curve=args.curve,
+                            duration_ms=args.duration_ms, rate_hz=args.rate)
+        client.send_batch(mouse_move_calls(points))
+        print(
+            f"Hovered at ({x:.0f}, {y:.0f}) via {len(points)}-step {args.curve} path "
+            f"from ({start[0]:.0f}, {start[1]:.0f})"
+        )
     finally:
         client.close()
 
 
 def cmd_new_page(client, args):
-    """Open a new tab."""
-    tab = client.new_tab(args.url or "")
-    target_id = tab.get("id", "?")
-    title = tab.get("title", "New Tab")
-    print(f"New tab: {title}")
+    """Open a new tab, taken from the warm tab pool when one is configured."""
+    target_id = None if args.no_pool else take_tab(client)
+    if target_id is not None:
+        if args.url:
+            client.connect(target_id=target_id)
+            try:
+                client.send("Page.navigate", {"url": args.url})
+            finally:
+                client.close()
+        client.activate_tab(target_id)
+        print(f"New tab: {args.url or 'about:blank'} (warm pool)")
+    else:
+        tab = client.new_tab(args.url or "")
+        target_id = tab.get("id", "?")
+        print(f"New tab: {tab.get('title', 'New Tab')}")
     print(f"  ID: {target_id}")
     # Auto-select the new tab
     client.save_state(target_id)
@@ -605,6 +809,11 @@ def cmd_find_element(client, args):
                         "tag": node_info.get("localName", "").lower(),
                     })
 
+        mode = output_mode(args)
+        if mode:
+            emit_records(results, mode)
+            return
+
         if not results:
             print("No elements found.")
             return
@@ -663,6 +872,11 @@ def cmd_get_bounds(client, args):
             scroll=scroll,
         )
 
+        mode = output_mode(args)
+        if mode:
+            emit(info)
+            return
+
         print(f"Element: <{info['tag']}> \"{info['text']}\"")
         print(f"  Center: ({info['x']:.0f}, {info['y']:.0f})")
         print(f"  Box: {info['width']:.0f}x{info['height']:.0f}")
@@ -719,7 +933,12 @@ def cmd_scan_interactive(client, args):
 
         candidates = candidates[:args.limit]
 
+        mode = output_mode(args)
         if not candidates:
+            if mode:
+                note("No interactive elements found.")
+                emit_records([], mode)
+                return
             print("No interactive elements found.")
             return
 
@@ -763,6 +982,10 @@ def cmd_scan_interactive(client, args):
             except CDPError:
                 continue
 
+        if mode:
+            emit_records(results, mode)
+            return
+
         if not results:
             print("No visible interactive elements found.")
             return
@@ -781,13 +1004,30 @@ def cmd_scan_interactive(client, args):
 
 
 def main():
+    commands = {
+        "click": cmd_click,
+        "scroll": cmd_scroll,
+        "upload_file": cmd_upload_file,
+        "fill": cmd_fill,
+        "press_key": cmd_press_key,
+        "type": cmd_type,
+        "hover": cmd_hover,
+        "new_page": cmd_new_page,
+        "close_page": cmd_close_page,
+        "find_element": cmd_find_element,
+        "get_bounds": cmd_get_bounds,
+        "scan_interactive": cmd_scan_interactive,
+    }
+
     parser = argparse.ArgumentParser(
         prog="cdp-v2",
         description="CDP browser interaction",
     )
     parser.add_argument("--host", help="CDP host")
     parser.add_argument("--port", type=int, help="CDP port")
-    sub = parser.add_subparsers(dest="command", required=True)
+    # Only the invoked command's parser is built (see subcommands).
+    sub = LazySubparsers(parser.add_subparsers(dest="command", required=True),
+                         invoked_command(sys.argv[1:], commands))
 
     # click
     p_click = sub.add_parser("click", help="Click element")
@@ -800,6 +1040,10 @@ def main():
                          help="Click count: 1=single, 2=double, 3=triple (default: 1)")
     p_click.add_argument("--modifiers", "-m",
                          help="Comma-separated: ctrl,shift,alt,meta (e.g., 'ctrl' = new-tab click)")
+    p_click.add_argument("--timeout-ms", dest="timeout_ms", type=int, default=5000,
+                         help="Max wait for --selector to become actionable (default: 5000)")
+    p_click.add_argument("--force", action="store_true",
+                         help="Skip the actionability wait for --selector (fire at the first resolved center)")
 
     # scroll
     p_scroll = sub.add_parser("scroll", help="Scroll via mouseWheel (page or at coordinates)")
@@ -810,6 +1054,18 @@ def main():
                           help="Vertical scroll delta px (positive=down, default: 300)")
     p_scroll.add_argument("--delta-x", dest="delta_x", type=float, default=0,
                           help="Horizontal scroll delta px (positive=right, default: 0)")
+    p_scroll.add_argument("--smooth", action="store_true",
+                          help="Split the delta into timestamped wheel events (duration × rate), pipelined")
+    p_scroll.add_argument("--gesture", action="store_true",
+                          help="Use Input.synthesizeScrollGesture (falls back to --smooth if unavailable)")
+    p_scroll.add_argument("--duration-ms", dest="duration_ms", type=float, default=300,
+                          help="Smooth/gesture scroll duration (default: 300)")
+    p_scroll.add_argument("--rate", type=float, default=DEFAULT_RATE_HZ,
+                          help=f"Wheel events per second for --smooth (default: {DEFAULT_RATE_HZ})")
+    p_scroll.add_argument("--repeat", type=int, default=0,
+                          help="Repeat the scroll N more times (infinite-scroll loading, default: 0)")
+    p_scroll.add_argument("--repeat-delay-ms", dest="repeat_delay_ms", type=float, default=250,
+                          help="Pause between repeats so new content can load (default: 250)")
 
     # upload_file
     p_upload = sub.add_parser(
@@ -826,19 +1082,35 @@ def main():
     p_fill.add_argument("text", help="Text to fill")
 
     # press_key
-    p_key = sub.add_parser("press_key", help="Press keyboard key")
-    p_key.add_argument("key", help="Key name (e.g., Enter, Tab, a)")
-    p_key.add_argument("--modifiers", "-m", help="Comma-separated: ctrl,shift,alt,meta")
+    p_key = sub.add_parser("press_key", help="Press key, chord, or key sequence")
+    p_key.add_argument("key",
+                       help='Key, chord, or comma-separated sequence; quote literal text (e.g. Enter, \'Ctrl+Shift+K, Enter, "Hello"\')')
+    p_key.add_argument("--modifiers", "-m", help="Comma-separated: ctrl,shift,alt,meta (held for every key)")
+
+    # type
+    p_type = sub.add_parser("type", help="Type literal text as per-character key events")
+    p_type.add_argument("text", help="Text to type ('-' reads stdin)")
+    p_type.add_argument("--selector", "-s", help="Focus this element first")
 
     # hover
     p_hover = sub.add_parser("hover", help="Hover over element")
     p_hover.add_argument("x", nargs="?", type=float, help="X coordinate")
     p_hover.add_argument("y", nargs="?", type=float, help="Y coordinate")
     p_hover.add_argument("--selector", "-s", help="CSS selector")
+    p_hover.add_argument("--from", dest="from_point",
+                         help="Start point 'x,y' — approach the target along an interpolated path")
+    p_hover.add_argument("--curve", choices=CURVES, default="linear",
+                         help="Path shape for --from (default: linear)")
+    p_hover.add_argument("--duration-ms", dest="duration_ms", type=float, default=200,
+                         help="Path duration for --from (default: 200)")
+    p_hover.add_argument("--rate", type=float, default=DEFAULT_RATE_HZ,
+                         help=f"Path event rate in Hz for --from (default: {DEFAULT_RATE_HZ})")
 
     # new_page
     p_new = sub.add_parser("new_page", help="Open new tab")
     p_new.add_argument("url", nargs="?", default="", help="URL to open")
+    p_new.add_argument("--no-pool", dest="no_pool", action="store_true",
+                       help="Open a fresh tab even when the warm tab pool has one")
 
     # close_page
     p_close = sub.add_parser("close_page", help="Close a tab")
@@ -866,23 +1138,10 @@ def main():
     p_scan.add_argument("--role", help="Comma-separated role filter")
     p_scan.add_argument("--limit", type=int, default=50, help="Max elements (default: 50)")
 
+    add_output_args(parser, sub)
     args = parser.parse_args()
     client = CDPClient(host=args.host, port=args.port)
 
-    commands = {
-        "click": cmd_click,
-        "scroll": cmd_scroll,
-        "upload_file": cmd_upload_file,
-        "fill": cmd_fill,
-        "press_key": cmd_press_key,
-        "hover": cmd_hover,
-        "new_page": cmd_new_page,
-        "close_page": cmd_close_page,
-        "find_element": cmd_find_element,
-        "get_bounds": cmd_get_bounds,
-        "scan_interactive": cmd_scan_interactive,
-    }
-
     try:
         # Serialize all CDP access machine-wide (per host:port) so concurrent
         # sessions/subagents never drive the same browser simultaneously.
@@ -12,614 +12,794 @@ v3_advanced — Advanced CDP: network/console monitoring, perf tracing, emulatio
 import argparse
 import json
 import os
-import signal
+import shutil
 import sys
 import time
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).resolve().parent))
-from cdp_client import CDPClient, CDPConnectionError, CDPError, cdp_lock
-
-CACHE_DIR = os.path.expanduser("~/.cache/cdp-attach")
-NETWORK_EVENTS = os.path.join(CACHE_DIR, "network-events.jsonl")
-NETWORK_BODIES_DIR = os.path.join(CACHE_DIR, "network-bodies")
-CONSOLE_EVENTS = os.path.join(CACHE_DIR, "console-events.jsonl")
-AUTO_TIMEOUT = 300  # 5 minutes
-
-# Network response body capture
-# - Only fetch bodies for these resource types (avoids saving every script/image)
-# - Required because Network.getResponseBody is only valid while the same CDP
-#   client session has Network.enable set; foreground sessions (e.g. cdp_call)
-#   cannot retrieve bodies for responses received before they connected.
-BODY_CAPTURE_TYPES = {"XHR", "Fetch", "EventSource"}
-BODY_MAX_BYTES = 5 * 1024 * 1024  # 5MB cap per response
-
-
-def _body_path(rid):
-    """Disk path for a captured response body, keyed by full CDP requestId."""
-    return os.path.join(NETWORK_BODIES_DIR, f"{rid}.json")
-
-
-def _save_body(rid, body, base64_encoded):
-    """Write a captured response body file. The filename carries the rid;
-    callers reading the file get just `(body, base64_encoded)` via _load_body.
-    Best-effort: write failures are swallowed so the collector keeps running.
-    """
-    try:
-        with open(_body_path(rid), "w") as bf:
-            json.dump(
-                {"base64Encoded": base64_encoded, "body": body},
-                bf,
-                ensure_ascii=False,
-            )
-    except OSError:
-        pass
-
-
-def _load_body(filename):
-    """Read a captured body file by filename. Returns (body, base64_encoded).
-    Accepts files written by _save_body (no requestId field) and legacy files
-    that included a requestId field — both work because we don't read it back.
-    """
-    with open(os.path.join(NETWORK_BODIES_DIR, filename)) as f:
-        data = json.load(f)
-    return data.get("body", ""), data.get("base64Encoded", False)
-
-
-def _kill_existing(client, process_type):
-    """Kill existing background process if running."""
-    entry = client.get_pid(process_type)
-    if entry:
-        pid = entry["pid"]
-        create_time = entry.get("create_time", 0)
-        # Skip kill if process has long exceeded its expected lifetime (likely PID reuse)
-        if create_time and time.time() - create_time > AUTO_TIMEOUT + 60:
-            client.clear_pid(process_type)
-            return
-        try:
-            os.kill(pid, signal.SIGTERM)
-            time.sleep(0.2)
-        except ProcessLookupError:
-            pass
-        client.clear_pid(process_type)
-
-
-def _run_collector(client, process_type, events_file, enable_method, event_names):
-    """Fork a background collector process."""
-    import websocket
-
-    target_id = client.get_selected_target()
-    if not target_id:
-        raise CDPError("No tab selected. Use 'select' first.")
-
-    _kill_existing(client, process_type)
-    os.makedirs(CACHE_DIR, exist_ok=True)
-
-    # Clear previous events
-    open(events_file, "w").close()
-
-    pid = os.fork()
-    if pid > 0:
-        # Parent
-        client.save_pid(process_type, pid)
-        print(f"{process_type} collector started (PID {pid})")
-        print(f"Events: {events_file}")
-        return
-
-    # Child — collector process
-    _shutdown = False
-
-    def _handle_sigterm(*_):
-        nonlocal _shutdown
-        _shutdown = True
-
-    error_log = os.path.join(CACHE_DIR, f"{process_type}-error.log")
-    try:
-        # Detach from parent
-        os.setsid()
-        signal.signal(signal.SIGTERM, _handle_sigterm)
-
-        ws = websocket.create_connection(
-            f"ws://{client.host}:{client.port}/devtools/page/{target_id}",
-            timeout=AUTO_TIMEOUT,
-            suppress_origin=True,
-        )
-
-        # Enable domain
-        msg_id = 1
-        ws.send(json.dumps({"id": msg_id, "method": enable_method}))
-        # Wait for ack
-        deadline = time.time() + 10
-        while time.time() < deadline:
-            resp = json.loads(ws.recv())
-            if resp.get("id") == msg_id:
-                break
-
-        # Collect events
-        start_time = time.time()
-        with open(events_file, "a") as f:
-            while not _shutdown and time.time() - start_time < AUTO_TIMEOUT:
-                try:
-                    ws.settimeout(1.0)
-                    raw = ws.recv()
-                    data = json.loads(raw)
-                    method = data.get("method", "")
-                    if method in event_names:
-                        entry = {
-                            "t": time.time(),
-                            "method": method,
-                            "params": data.get("params", {}),
-                        }
-                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-                        f.flush()
-                except websocket.WebSocketTimeoutException:
-                    continue
-                except (websocket.WebSocketConnectionClosedException, ConnectionError):
-                    break
-
-        ws.close()
-        os._exit(0)
-    except Exception as exc:
-        try:
-            with open(error_log, "a") as ef:
-                ef.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {exc}\n")
-        except Exception:
-            pass
-        os._exit(1)
 
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from cdp_client import CDPClient, CDPConnectionError, CDPError, HEALTH_STALE, cdp_lock
+from collector import (
+    BLOCK_PRESETS,
+    BODY_MAX_BYTES,
+    BODY_MAX_INFLIGHT,
+    BODY_STORE_MAX_BYTES,
+    COLLECTOR_LIFETIME,
+    COMPRESSIONS,
+    CONSOLE_EVENTS,
+    HEALTH_INTERVAL,
+    HEALTH_TIMEOUTS,
+    METRICS_EVENTS,
+    METRICS_INTERVAL,
+    NETWORK_BODIES_DIR,
+    NETWORK_EVENTS,
+    RESOURCE_TYPES,
+    ROUTE_LOG,
+    VITALS_EVENTS,
+    capture_options,
+    check_compression,
+    console_captured,
+    console_dropped,
+    events_path,
+    iter_console,
+    iter_events,
+    iter_metrics,
+    load_body,
+    load_network_index,
+    load_vitals,
+    start_capture,
+    stop_capture,
+    stop_capture_everywhere,
+    trace_path,
+)
+from har_export import DEFAULT_MAX_BODY_BYTES, write_har
+from input_paths import CURVES, DEFAULT_RATE_HZ, drag_calls, plan_steps
+from output import add_output_args, emit_records, note, output_mode
+from storage_state import (
+    IDB_CREATE_JS,
+    IDB_READ_JS,
+    IDB_SCHEMA_JS,
+    IDB_WRITE_JS,
+    STATE_PAGE_CHARS,
+    STATE_VERSION,
+    STORAGE_READ_JS,
+    STORAGE_WRITE_JS,
+    paged,
+    read_state,
+    write_state,
+)
+from subcommands import LazySubparsers, invoked_command
+from tab_pool import pooled_ids
+from trace_summary import LONG_TASK_MS, SUMMARY_CATEGORIES, summarize
 
-def _run_network_collector(client):
-    """Network-specific collector that also captures response bodies.
-
-    Bodies are required for debugging virtualized data grids and any
-    SPA whose authoritative data lives in XHR/Fetch responses (the DOM
-    only renders the visible window). Network.getResponseBody must be
-    invoked from the same CDP session that received the response, so the
-    fetch happens here in the collector fork.
-    """
-    import websocket
 
+def _selected_target(client):
     target_id = client.get_selected_target()
     if not target_id:
         raise CDPError("No tab selected. Use 'select' first.")
-
-    _kill_existing(client, "network")
-    os.makedirs(CACHE_DIR, exist_ok=True)
-    os.makedirs(NETWORK_BODIES_DIR, exist_ok=True)
-
-    # Clear previous events and body files (fresh capture window)
-    open(NETWORK_EVENTS, "w").close()
-    for name in os.listdir(NETWORK_BODIES_DIR):
-        try:
-            os.unlink(os.path.join(NETWORK_BODIES_DIR, name))
-        except OSError:
-            pass
-
-    pid = os.fork()
-    if pid > 0:
-        client.save_pid("network", pid)
-        print(f"network collector started (PID {pid})")
-        print(f"Events: {NETWORK_EVENTS}")
-        print(f"Bodies: {NETWORK_BODIES_DIR}/ (XHR/Fetch, <{BODY_MAX_BYTES // (1024*1024)}MB)")
-        return
-
-    # Child — collector process
-    _shutdown = False
-
-    def _handle_sigterm(*_):
-        nonlocal _shutdown
-        _shutdown = True
-
-    error_log = os.path.join(CACHE_DIR, "network-error.log")
-    event_names = {
-        "Network.requestWillBeSent",
-        "Network.responseReceived",
-        "Network.loadingFinished",
-        "Network.loadingFailed",
-    }
-    try:
-        os.setsid()
-        signal.signal(signal.SIGTERM, _handle_sigterm)
-
-        ws = websocket.create_connection(
-            f"ws://{client.host}:{client.port}/devtools/page/{target_id}",
-            timeout=AUTO_TIMEOUT,
-            suppress_origin=True,
-        )
-
-        msg_id = 1
-        ws.send(json.dumps({"id": msg_id, "method": "Network.enable"}))
-        deadline = time.time() + 10
-        while time.time() < deadline:
-            resp = json.loads(ws.recv())
-            if resp.get("id") == msg_id:
-                break
-
-        # Per-request tracking
-        req_type = {}      # requestId -> resource type (XHR, Fetch, ...)
-        pending_body = {}  # outgoing msg_id -> requestId (awaiting reply)
-
-        start_time = time.time()
-        with open(NETWORK_EVENTS, "a") as f:
-            while not _shutdown and time.time() - start_time < AUTO_TIMEOUT:
-                try:
-                    ws.settimeout(1.0)
-                    raw = ws.recv()
-                    data = json.loads(raw)
-                except websocket.WebSocketTimeoutException:
-                    continue
-                except (websocket.WebSocketConnectionClosedException, ConnectionError):
-                    break
-
-                # Branch 1: response to our own getResponseBody call
-                resp_id = data.get("id")
-                if resp_id is not None and resp_id in pending_body:
-                    rid = pending_body.pop(resp_id)
-                    if "result" in data:
-                        _save_body(
-                            rid,
-                            data["result"].get("body", ""),
-                            data["result"].get("base64Encoded", False),
-                        )
-                    # CDP error responses are silently dropped — body fetch is
-                    # best-effort (e.g. 204 No Content, redirects, aborted).
-                    continue
-
-                # Branch 2: CDP event we care about
-                method = data.get("method", "")
-                if method not in event_names:
-                    continue
-                params = data.get("params", {})
-
-                entry = {"t": time.time(), "method": method, "params": params}
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-                f.flush()
-
-                if method == "Network.requestWillBeSent":
-                    rt = params.get("type", "")
-                    rid = params.get("requestId", "")
-                    if rt and rid:
-                        req_type[rid] = rt
-                elif method == "Network.responseReceived":
-                    rt = params.get("type", "")
-                    rid = params.get("requestId", "")
-                    if rt and rid:
-                        # responseReceived has the final type — overwrites
-                        # any earlier value from requestWillBeSent.
-                        req_type[rid] = rt
-                elif method == "Network.loadingFinished":
-                    rid = params.get("requestId", "")
-                    size = params.get("encodedDataLength", 0) or 0
-                    rt = req_type.get(rid, "")
-                    if rt in BODY_CAPTURE_TYPES and 0 < size < BODY_MAX_BYTES:
-                        msg_id += 1
-                        pending_body[msg_id] = rid
-                        try:
-                            ws.send(json.dumps({
-                                "id": msg_id,
-                                "method": "Network.getResponseBody",
-                                "params": {"requestId": rid},
-                            }))
-                        except Exception:
-                            pending_body.pop(msg_id, None)
-                    # Type was only needed to decide body capture; drop now to
-                    # keep req_type bounded to in-flight requests instead of
-                    # growing for the collector's full AUTO_TIMEOUT lifetime.
-                    req_type.pop(rid, None)
-                elif method == "Network.loadingFailed":
-                    # Same bounding rule on the failure path.
-                    req_type.pop(params.get("requestId", ""), None)
-
-        ws.close()
-        os._exit(0)
-    except Exception as exc:
-        try:
-            with open(error_log, "a") as ef:
-                ef.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {exc}\n")
-        except Exception:
-            pass
-        os._exit(1)
+    return target_id
 
 
 def cmd_network_start(client, args):
-    """Start network request collector (with response body capture)."""
-    _run_network_collector(client)
+    """Start network capture (with response body capture) on the tab's collector."""
+    check_compression(args.compress)
+    options = {"compress": args.compress} if args.compress else {}
+    if args.max_inflight:
+        options["max_inflight"] = args.max_inflight
+    if args.body_types:
+        options["body_types"] = (
+            "all" if args.body_types == "all"
+            else [t.strip() for t in args.body_types.split(",") if t.strip()]
+        )
+    status = start_capture(client, _selected_target(client), "network", options)
+    print(f"network capture started (collector PID {status['pid']})")
+    print(f"Events: {events_path(NETWORK_EVENTS) or NETWORK_EVENTS}")
+    print(f"Bodies: {NETWORK_BODIES_DIR}/ ({args.body_types or 'XHR/Fetch'}; streamed above "
+          f"{BODY_MAX_BYTES // (1024*1024)}MB; deduplicated store, LRU-bounded at "
+          f"{BODY_STORE_MAX_BYTES // (1024*1024)}MB)")
 
 
 def cmd_network_list(client, args):
-    """List collected network requests."""
-    if not os.path.exists(NETWORK_EVENTS):
+    """List collected network requests (folded from the collector's index)."""
+    index = load_network_index()
+    mode = output_mode(args)
+    if index is None:
+        if mode:
+            note("No network events collected. Run network_start first.")
+            emit_records([], mode)
+            return
         print("No network events collected. Run network_start first.")
         return
 
-    requests = {}  # requestId -> info
-    with open(NETWORK_EVENTS) as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            method = entry["method"]
-            params = entry["params"]
-
-            if method == "Network.requestWillBeSent":
-                req = params.get("request", {})
-                rid = params.get("requestId", "")
-                requests[rid] = {
-                    "url": req.get("url", "")[:100],
-                    "method": req.get("method", ""),
-                    "status": "pending",
-                    "type": params.get("type", ""),
-                }
-            elif method == "Network.responseReceived":
-                rid = params.get("requestId", "")
-                resp = params.get("response", {})
-                if rid in requests:
-                    requests[rid]["status"] = str(resp.get("status", "?"))
-                    requests[rid]["mime"] = resp.get("mimeType", "")[:30]
-                    # responseReceived has the final type — overwrites earlier
-                    rt = params.get("type", "")
-                    if rt:
-                        requests[rid]["type"] = rt
-            elif method == "Network.loadingFailed":
-                rid = params.get("requestId", "")
-                if rid in requests:
-                    requests[rid]["status"] = "FAILED"
-
     # Filter — keep (rid, info) pairs so the rid stays out of info itself
-    items = list(requests.items())
+    items = [(rid, info) for rid, info in index.items() if "url" in info]
     if args.filter:
         pattern = args.filter.lower()
-        items = [(rid, info) for rid, info in items if pattern in info.get("url", "").lower()]
+        items = [(rid, info) for rid, info in items if pattern in info["url"].lower()]
+
+    if mode:
+        emit_records(({
+            "requestId": rid, "method": r.get("method"), "status": r.get("status"),
+            "type": r.get("type"), "url": r["url"], "body": bool(r.get("body")),
+        } for rid, r in items), mode)
+        return
 
     if not items:
         print("No matching requests.")
         return
 
-    # Look up captured bodies (when --bodies is set)
-    captured_rids = set()
-    if args.bodies and os.path.isdir(NETWORK_BODIES_DIR):
-        captured_rids = {
-            os.path.splitext(name)[0]
-            for name in os.listdir(NETWORK_BODIES_DIR)
-            if name.endswith(".json")
-        }
-
     if args.bodies:
         # Show requestId (short suffix is unique enough for prefix lookup)
         # and body availability marker.
         print(f"{'Method':<7} {'Status':<8} {'Type':<12} {'Body':<5} {'RequestID':<20} URL")
         print("-" * 110)
         for rid, r in items:
-            body_mark = "✓" if rid in captured_rids else ""
+            body_mark = "✓" if r.get("body") else ""
             rid_short = rid[-18:]
             print(
                 f"{r.get('method','?'):<7} {r.get('status','?'):<8} "
-                f"{r.get('type',''):<12} {body_mark:<5} {rid_short:<20} {r['url']}"
+                f"{r.get('type',''):<12} {body_mark:<5} {rid_short:<20} {r['url'][:100]}"
             )
     else:
         print(f"{'Method':<7} {'Status':<8} {'Type':<12} URL")
         print("-" * 80)
         for _, r in items:
-            print(f"{r.get('method','?'):<7} {r.get('status','?'):<8} {r.get('type',''):<12} {r['url']}")
+            print(f"{r.get('method','?'):<7} {r.get('status','?'):<8} {r.get('type',''):<12} {r['url'][:100]}")
+    captured = sum(1 for info in index.values() if info.get("body"))
     print(f"\nTotal: {len(items)} requests" + (
-        f" ({len(captured_rids)} with captured bodies)" if args.bodies else ""
+        f" ({captured} with captured bodies)" if args.bodies else ""
     ))
 
 
 def cmd_network_body(client, args):
     """Print a captured response body by requestId (exact or unique suffix)."""
-    if not os.path.isdir(NETWORK_BODIES_DIR):
-        print("No bodies captured. Run network_start first.", file=sys.stderr)
-        sys.exit(1)
-
-    target = args.request_id
-    files = sorted(
-        name for name in os.listdir(NETWORK_BODIES_DIR) if name.endswith(".json")
-    )
-    if not files:
+    index = load_network_index() or {}
+    bodies = {rid: info for rid, info in index.items() if info.get("body")}
+    if not bodies:
         print("No bodies captured. Run network_start first.", file=sys.stderr)
         sys.exit(1)
 
     # Match: exact requestId first, then suffix match (collector saves the
     # full CDP requestId like "AB12.34" — the short tail is unique enough)
-    exact = f"{target}.json"
-    if exact in files:
-        match = exact
+    target = args.request_id
+    if target in bodies:
+        match = bodies[target]
     else:
-        candidates = [f for f in files if os.path.splitext(f)[0].endswith(target)]
+        candidates = sorted(rid for rid in bodies if rid.endswith(target))
         if not candidates:
             print(f"No body for requestId: {target!r}", file=sys.stderr)
-            print(f"  {len(files)} bodies in {NETWORK_BODIES_DIR}", file=sys.stderr)
+            print(f"  {len(bodies)} bodies in {NETWORK_BODIES_DIR}", file=sys.stderr)
             sys.exit(1)
         if len(candidates) > 1:
             print(f"Ambiguous suffix {target!r} — {len(candidates)} matches:", file=sys.stderr)
             for c in candidates[:10]:
-                print(f"  {os.path.splitext(c)[0]}", file=sys.stderr)
+                print(f"  {c}", file=sys.stderr)
             sys.exit(1)
-        match = candidates[0]
+        match = bodies[candidates[0]]
 
-    body, b64 = _load_body(match)
+    loaded = load_body(match)
+    if loaded is None:
+        print(f"Body for {args.request_id!r} was evicted from the body store "
+              f"(bounded by CDP_ATTACH_BODY_STORE_MB).", file=sys.stderr)
+        sys.exit(1)
+    raw, binary = loaded
 
     if args.output:
         out_path = os.path.abspath(os.path.expanduser(args.output))
         parent_dir = os.path.dirname(out_path)
         if parent_dir:
             os.makedirs(parent_dir, exist_ok=True)
-        if b64:
-            import base64
-            decoded = base64.b64decode(body)
-            with open(out_path, "wb") as f:
-                f.write(decoded)
-            print(f"Body saved: {out_path} ({len(decoded)} bytes, base64-decoded)")
+        with open(out_path, "wb") as f:
+            f.write(raw)
+        if binary:
+            print(f"Body saved: {out_path} ({len(raw)} bytes, binary)")
         else:
-            with open(out_path, "w") as f:
-                f.write(body)
-            print(f"Body saved: {out_path} ({len(body)} chars)")
+            print(f"Body saved: {out_path} ({len(raw.decode('utf-8', 'surrogatepass'))} chars)")
         return
 
-    if b64:
+    if binary:
         print(
-            f"Body is base64-encoded binary ({len(body)} chars). "
-            "Use -o <file> to save.",
+            f"Body is binary ({len(raw)} bytes). Use -o <file> to save.",
             file=sys.stderr,
         )
         sys.exit(1)
-    sys.stdout.write(body)
+    sys.stdout.write(raw.decode("utf-8", "replace"))
+
+
+def cmd_network_export(client, args):
+    """Export the network capture as HAR 1.2, streamed entry by entry."""
+    if events_path(NETWORK_EVENTS) is None:
+        raise CDPError("No network events collected. Run network_start first.")
+    kwargs = {
+        "url_filter": args.filter,
+        "include_bodies": not args.no_bodies,
+        "max_body_bytes": int(args.max_body_mb * 1024 * 1024),
+    }
+    if args.output == "-":
+        write_har(sys.stdout, **kwargs)
+        return
+    output = os.path.abspath(os.path.expanduser(
+        args.output or f"/tmp/cdp-network-{int(time.time())}.har"
+    ))
+    parent_dir = os.path.dirname(output)
+    if parent_dir:
+        os.makedirs(parent_dir, exist_ok=True)
+    with open(output, "w") as f:
+        count = write_har(f, **kwargs)
+    print(f"HAR saved: {output} ({count} entries, {os.path.getsize(output)} bytes)")
 
 
 def cmd_network_stop(client, args):
-    """Stop network collector."""
-    _kill_existing(client, "network")
+    """Stop network capture."""
+    stop_capture(client, "network")
     print("Network collector stopped.")
-    # Show final count
-    if os.path.exists(NETWORK_EVENTS):
-        with open(NETWORK_EVENTS) as f:
-            count = sum(1 for _ in f)
-        print(f"Collected {count} events → {NETWORK_EVENTS}")
+    # Show final count (one index delta per recorded event)
+    index = load_network_index()
+    if index is not None:
+        count = sum(len(info["offs"]) for info in index.values())
+        print(f"Collected {count} events → {events_path(NETWORK_EVENTS)}")
 
 
 def cmd_console_start(client, args):
-    """Start console message collector."""
-    _run_collector(
-        client, "console", CONSOLE_EVENTS,
-        "Runtime.enable",
-        {"Runtime.consoleAPICalled", "Runtime.exceptionThrown"},
-    )
+    """Start console capture on the tab's collector."""
+    check_compression(args.compress)
+    options = {"compress": args.compress} if args.compress else {}
+    status = start_capture(client, _selected_target(client), "console", options)
+    print(f"console capture started (collector PID {status['pid']})")
+    print(f"Events: {events_path(CONSOLE_EVENTS) or CONSOLE_EVENTS}")
 
 
 def cmd_console_list(client, args):
-    """List collected console messages."""
-    if not os.path.exists(CONSOLE_EVENTS):
+    """List collected console messages (repeats collapsed into counts)."""
+    mode = output_mode(args)
+    if not console_captured():
+        if mode:
+            note("No console events collected. Run console_start first.")
+            emit_records([], mode)
+            return
         print("No console events collected. Run console_start first.")
         return
 
-    messages = []
-    with open(CONSOLE_EVENTS) as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            params = entry["params"]
-
-            if entry["method"] == "Runtime.consoleAPICalled":
-                level = params.get("type", "log")
-                call_args = params.get("args", [])
-                text = " ".join(
-                    str(a.get("value", a.get("description", repr(a))))
-                    for a in call_args
-                )[:200]
-                messages.append({"level": level, "text": text, "t": entry["t"]})
-            elif entry["method"] == "Runtime.exceptionThrown":
-                exc = params.get("exceptionDetails", {})
-                text = exc.get("text", "")
-                exception = exc.get("exception", {})
-                desc = exception.get("description", "")
-                messages.append({
-                    "level": "error",
-                    "text": f"{text} {desc}"[:200],
-                    "t": entry["t"],
-                })
-
-    # Filter by level (normalize warn/warning as equivalent)
+    # Normalize warn/warning as equivalent; the index answers the level filter.
+    levels = None
     if args.level and args.level != "all":
-        if args.level in ("warn", "warning"):
-            messages = [m for m in messages if m["level"] in ("warn", "warning")]
-        else:
-            messages = [m for m in messages if m["level"] == args.level]
+        levels = {"warn", "warning"} if args.level in ("warn", "warning") else {args.level}
 
-    if not messages:
-        print("No matching console messages.")
+    if mode:
+        emit_records(iter_console(levels), mode)
         return
 
-    for m in messages:
+    total = 0
+    for m in iter_console(levels):
         ts = time.strftime("%H:%M:%S", time.localtime(m["t"]))
-        print(f"[{ts}] {m['level'].upper():<7} {m['text']}")
-    print(f"\nTotal: {len(messages)} messages")
+        repeat = f" (x{m['count']}, last {time.strftime('%H:%M:%S', time.localtime(m['last']))})" \
+            if m["count"] > 1 else ""
+        print(f"[{ts}] {m['level'].upper():<7} {m['text'][:200]}{repeat}")
+        total += m["count"]
+    if not total:
+        print("No matching console messages.")
+        return
+    print(f"\nTotal: {total} messages")
+    dropped = console_dropped()
+    if dropped:
+        print(f"  ({dropped} more dropped by the rate limit)")
 
 
 def cmd_console_stop(client, args):
-    """Stop console collector."""
-    _kill_existing(client, "console")
+    """Stop console capture."""
+    stop_capture(client, "console")
     print("Console collector stopped.")
-    if os.path.exists(CONSOLE_EVENTS):
-        with open(CONSOLE_EVENTS) as f:
-            count = sum(1 for _ in f)
-        print(f"Collected {count} events → {CONSOLE_EVENTS}")
+    path = events_path(CONSOLE_EVENTS)
+    if path:
+        distinct = total = 0
+        for m in iter_console():
+            distinct += 1
+            total += m["count"]
+        print(f"Collected {total} messages ({distinct} distinct) → {path}")
+
+
+# Performance.getMetrics names shown by metrics_list without --all.
+KEY_METRICS = (
+    "JSHeapUsedSize", "JSHeapTotalSize", "Nodes", "Documents", "Frames",
+    "JSEventListeners", "LayoutCount", "RecalcStyleCount",
+    "TaskDuration", "ScriptDuration", "LayoutDuration", "RecalcStyleDuration",
+)
+
+
+def _format_metric(name, value):
+    if name.endswith("Size"):
+        return f"{value / (1024 * 1024):.2f}MB"
+    if name.endswith("Duration"):
+        return f"{value:.3f}s"
+    return f"{value:g}"
+
+
+def _metrics_summary():
+    """One pass over the metrics sink: (samples, first t, last t, {name: [first, last, min, max]})."""
+    count, first_t, last_t, stats = 0, None, None, {}
+    for t, values in iter_metrics():
+        count += 1
+        first_t = t if first_t is None else first_t
+        last_t = t
+        for name, value in values.items():
+            st = stats.get(name)
+            if st is None:
+                stats[name] = [value, value, value, value]
+            else:
+                st[1] = value
+                st[2] = min(st[2], value)
+                st[3] = max(st[3], value)
+    return count, first_t, last_t, stats
+
+
+def cmd_metrics_start(client, args):
+    """Start sampling Performance.getMetrics on the tab's collector."""
+    if args.interval <= 0:
+        raise CDPError("--interval must be positive")
+    options = {"interval": args.interval}
+    status = start_capture(client, _selected_target(client), "metrics", options,
+                           lifetime=args.duration)
+    print(f"metrics capture started (collector PID {status['pid']}), every {args.interval:g}s "
+          f"for up to {args.duration:g}s")
+    print(f"Samples: {METRICS_EVENTS}")
+
+
+def cmd_metrics_list(client, args):
+    """Summarize sampled metrics (first/last/min/max/delta), or print one metric's series."""
+    if events_path(METRICS_EVENTS) is None:
+        print("No metrics collected. Run metrics_start first.")
+        return
+
+    if args.series:
+        rows = [(t, values[args.series]) for t, values in iter_metrics() if args.series in values]
+        if not rows:
+            print(f"No samples for metric {args.series!r}.")
+            return
+        start = rows[0][0]
+        for t, value in rows[-args.tail:] if args.tail else rows:
+            print(f"{t - start:>9.1f}s  {_format_metric(args.series, value)}")
+        return
+
+    count, first_t, last_t, stats = _metrics_summary()
+    if not count:
+        print("No samples yet.")
+        return
+    names = sorted(stats) if args.all else [n for n in KEY_METRICS if n in stats]
+    print(f"{'Metric':<22} {'First':>12} {'Last':>12} {'Min':>12} {'Max':>12} {'Delta':>12}")
+    print("-" * 88)
+    for name in names:
+        first, last, low, high = stats[name]
+        delta = _format_metric(name, last - first)
+        if last - first > 0:
+            delta = "+" + delta
+        print(
+            f"{name:<22} {_format_metric(name, first):>12} {_format_metric(name, last):>12} "
+            f"{_format_metric(name, low):>12} {_format_metric(name, high):>12} {delta:>12}"
+        )
+    print(f"\n{count} samples over {last_t - first_t:.1f}s")
+
+
+def cmd_metrics_stop(client, args):
+    """Stop the metrics sampler."""
+    stop_capture(client, "metrics")
+    print("Metrics collector stopped.")
+    count, first_t, last_t, _ = _metrics_summary()
+    if count:
+        print(f"Collected {count} samples over {last_t - first_t:.1f}s → {METRICS_EVENTS}")
+
+
+def cmd_route_start(client, args):
+    """Start request interception (block / fixtures / latency) on the tab's collector."""
+    types = {t.lower(): t for t in RESOURCE_TYPES}
+    block_types, block_urls = [], list(args.block_url or [])
+    for token in (args.block or "").split(","):
+        token = token.strip()
+        if not token:
+            continue
+        key = token.lower()
+        if key not in types and key.endswith("s") and key[:-1] in types:
+            key = key[:-1]  # plural: "images", "fonts"
+        if key in BLOCK_PRESETS:
+            block_urls.extend(BLOCK_PRESETS[key])
+        elif key in types:
+            block_types.append(types[key])
+        else:
+            raise CDPError(
+                f"Unknown --block value {token!r}. Use a resource type "
+                f"({', '.join(RESOURCE_TYPES)}) or a preset ({', '.join(BLOCK_PRESETS)})"
+            )
+    options = {}
+    if block_types:
+        options["block_types"] = sorted(set(block_types))
+    if block_urls:
+        options["block_urls"] = block_urls
+    if args.fixtures:
+        fixtures = os.path.abspath(os.path.expanduser(args.fixtures))
+        if not os.path.isdir(fixtures):
+            raise CDPError(f"Fixture directory not found: {fixtures}")
+        options["fixtures"] = fixtures
+    if args.latency:
+        options["latency"] = args.latency
+        if args.latency_url:
+            options["latency_url"] = args.latency_url
+    if not options:
+        raise CDPError("Provide at least one of --block, --block-url, --fixtures, --latency")
+    status = start_capture(client, _selected_target(client), "route", options)
+    print(f"Routing active (collector PID {status['pid']})")
+    _print_route_rules(options)
+
+
+def _print_route_rules(options):
+    if options.get("fixtures"):
+        print(f"  Fixtures: {options['fixtures']}/{{host}}/{{path}} or /{{path}}")
+    if options.get("block_types"):
+        print(f"  Block types: {', '.join(options['block_types'])}")
+    for pattern in options.get("block_urls", []):
+        print(f"  Block URL: {pattern}")
+    if options.get("latency"):
+        print(f"  Latency: +{options['latency']}ms on {options.get('latency_url') or 'every request'}")
+
+
+def cmd_route_list(client, args):
+    """Show active route rules and what they did."""
+    options = capture_options("route")
+    if options:
+        print("Route rules:")
+        _print_route_rules(options)
+    else:
+        print("No routing active.")
+    if events_path(ROUTE_LOG) is None:
+        return
+    counts, entries = {}, []
+    for _, entry in iter_events(ROUTE_LOG):
+        counts[entry["action"]] = counts.get(entry["action"], 0) + 1
+        entries.append(entry)
+    if not entries:
+        return
+    print("\nActions: " + ", ".join(f"{n} {action}" for action, n in sorted(counts.items())))
+    print(f"{'Action':<9} {'Delay':>6} {'Type':<12} URL")
+    for entry in entries[-args.tail:]:
+        delay = f"{entry['delay_ms']}ms" if entry.get("delay_ms") else ""
+        print(f"{entry['action']:<9} {delay:>6} {entry.get('type', ''):<12} {entry['url'][:100]}")
+
+
+def cmd_route_stop(client, args):
+    """Stop request interception."""
+    if stop_capture(client, "route") is None:
+        print("No routing active.")
+        return
+    print("Routing stopped.")
+
+
+# Network.emulateNetworkConditions presets: (latency ms, download B/s, upload B/s).
+# Same numbers as the DevTools throttling menu; slow-4g is Lighthouse's mobile
+# profile (DevTools "Fast 3G").
+NETWORK_PROFILES = {
+    "slow-3g": (2000, 50000, 50000),
+    "fast-3g": (562.5, 180000, 84375),
+    "slow-4g": (562.5, 180000, 84375),
+    "fast-4g": (165, 1012500, 168750),
+    "none": (0, -1, -1),
+}
+
+
+def _throttled(args):
+    return args.network is not None or any(
+        v is not None for v in (args.latency, args.download_kbps, args.upload_kbps))
+
+
+def _network_conditions(args, offline=None):
+    """emulateNetworkConditions params from --network / --latency / --*-kbps (+ offline), or None."""
+    if not _throttled(args) and offline is None:
+        return None
+    latency, download, upload = NETWORK_PROFILES[args.network or "none"]
+    if args.latency is not None:
+        latency = args.latency
+    if args.download_kbps is not None:
+        download = args.download_kbps * 1000 / 8
+    if args.upload_kbps is not None:
+        upload = args.upload_kbps * 1000 / 8
+    if latency < 0:
+        raise CDPError("--latency must be >= 0")
+    return {
+        "offline": bool(offline),
+        "latency": latency,
+        "downloadThroughput": download,
+        "uploadThroughput": upload,
+    }
+
+
+def _describe_conditions(conditions):
+    def rate(value):
+        return "unlimited" if value < 0 else f"{value * 8 / 1000:g}kbps"
+    return (f"latency {conditions['latency']:g}ms, down {rate(conditions['downloadThroughput'])}, "
+            f"up {rate(conditions['uploadThroughput'])}")
+
+
+def _add_throttle_args(parser):
+    parser.add_argument("--network", choices=sorted(NETWORK_PROFILES),
+                        help="Network throttling profile")
+    parser.add_argument("--latency", type=float, help="Custom added round-trip latency (ms)")
+    parser.add_argument("--download-kbps", dest="download_kbps", type=float,
+                        help="Custom download throughput (kbit/s)")
+    parser.add_argument("--upload-kbps", dest="upload_kbps", type=float,
+                        help="Custom upload throughput (kbit/s)")
+    parser.add_argument("--cpu", type=float, help="CPU slowdown factor (1 = none, 4 = 4x slower)")
+
+
+def _check_cpu_rate(rate):
+    if rate is not None and rate < 1:
+        raise CDPError("--cpu must be >= 1 (slowdown factor)")
+
+
+# (good, poor) thresholds from web.dev: good <= first, poor > second.
+VITALS_THRESHOLDS = {
+    "lcp": (2500, 4000),
+    "fcp": (1800, 3000),
+    "inp": (200, 500),
+    "cls": (0.1, 0.25),
+    "ttfb": (800, 1800),
+}
+
+
+def _format_vital(name, value):
+    if value is None:
+        return "-"
+    good, poor = VITALS_THRESHOLDS[name]
+    mark = "" if value <= good else ("!" if value <= poor else "!!")
+    text = f"{value:.3f}" if name == "cls" else f"{value:.0f}ms"
+    return text + mark
+
+
+def cmd_vitals_start(client, args):
+    """Start collecting LCP / FCP / CLS / INP / TTFB / long tasks on the tab's collector."""
+    status = start_capture(client, _selected_target(client), "vitals", {},
+                           lifetime=args.duration)
+    print(f"vitals capture started (collector PID {status['pid']})")
+    print("  Reports the current page now and every navigation after it.")
+    print(f"Reports: {VITALS_EVENTS}")
+
+
+def cmd_vitals_list(client, args):
+    """Summarize collected web vitals per navigation."""
+    if events_path(VITALS_EVENTS) is None:
+        print("No vitals collected. Run vitals_start first.")
+        return
+    navs = load_vitals()
+    if args.filter:
+        pattern = args.filter.lower()
+        navs = [nav for nav in navs if pattern in nav["url"].lower()]
+    if not navs:
+        print("No matching navigations.")
+        return
+    print(f"{'Time':<9} {'TTFB':>9} {'FCP':>9} {'LCP':>9} {'CLS':>8} {'INP':>9} {'LongTasks':>14}  URL")
+    print("-" * 110)
+    for nav in navs:
+        ts = time.strftime("%H:%M:%S", time.localtime(nav["t"])) if nav.get("t") else ""
+        long_tasks = f"{nav['long_tasks']} / {nav['long_task_ms']:.0f}ms"
+        print(
+            f"{ts:<9} {_format_vital('ttfb', nav.get('ttfb')):>9} {_format_vital('fcp', nav.get('fcp')):>9} "
+            f"{_format_vital('lcp', nav.get('lcp')):>9} {_format_vital('cls', nav.get('cls')):>8} "
+            f"{_format_vital('inp', nav.get('inp')):>9} {long_tasks:>14}  {nav['url'][:80]}"
+        )
+    print("\n! needs improvement, !! poor (web.dev thresholds). INP stays '-' until the page is interacted with.")
+
+
+def cmd_vitals_stop(client, args):
+    """Stop vitals collection (removes the init script and binding)."""
+    stop_capture(client, "vitals")
+    print("Vitals collector stopped.")
+    if events_path(VITALS_EVENTS):
+        print(f"Collected {len(load_vitals())} navigations → {VITALS_EVENTS}")
+
+
+def cmd_health_start(client, args):
+    """Start the renderer health monitor on the selected tab (or every page tab)."""
+    if args.interval <= 0:
+        raise CDPError("--interval must be positive")
+    if args.all_tabs:
+        pooled = pooled_ids(client)
+        targets = [t["id"] for t in client.list_tabs() if t.get("id") not in pooled]
+    else:
+        targets = [_selected_target(client)]
+    for target_id in targets:
+        start_capture(client, target_id, "health", {"interval": args.interval},
+                      lifetime=args.duration)
+    print(f"Health monitor started on {len(targets)} tab(s): probe every {args.interval:g}s "
+          f"for up to {args.duration:g}s")
+    print(f"A tab silent for {sum(HEALTH_TIMEOUTS)}s is marked wedged; commands on it then fail fast.")
+
+
+def cmd_health_status(client, args):
+    """Show each monitored tab's status and recent probe latencies (state.json)."""
+    health = client.load_state().get("health", {})
+    mode = output_mode(args)
+    if mode:
+        now = time.time()
+        emit_records((dict(record, target=target_id,
+                           status="stale" if now - record.get("t", 0) > HEALTH_STALE
+                           else record.get("status"))
+                      for target_id, record in sorted(health.items())), mode)
+        return
+    if not health:
+        print("No health records. Run health_start first.")
+        return
+    now = time.time()
+    print(f"{'Target':<12} {'Status':<8} {'For':>7} {'Last':>8} {'Max':>8}  Recent (ms)")
+    print("-" * 78)
+    for target_id, record in sorted(health.items()):
+        history = record.get("history") or []
+        stale = now - record.get("t", 0) > HEALTH_STALE
+        status = "stale" if stale else record.get("status", "?")
+        last = f"{record['latency_ms']}ms" if record.get("latency_ms") is not None else "-"
+        print(
+            f"{target_id[:8] + '...':<12} {status:<8} {now - record.get('since', now):>6.0f}s "
+            f"{last:>8} {max(history, default=0):>6}ms  "
+            + " ".join(str(ms) for ms in history[-args.tail:])
+        )
+
+
+def cmd_health_stop(client, args):
+    """Stop every health monitor (their wedged marks are cleared)."""
+    targets = stop_capture_everywhere(client, "health")
+    print(f"Health monitor stopped on {len(targets)} tab(s).")
 
 
 def cmd_perf_start(client, args):
-    """Start performance tracing."""
-    client.connect()
-    try:
-        params = {}
-        if args.categories:
-            params["categories"] = args.categories
-        client.send("Tracing.start", params)
-        print("Tracing started.")
-        if args.categories:
-            print(f"  Categories: {args.categories}")
-    finally:
-        client.close()
+    """Start performance tracing on the tab's collector.
+
+    Tracing state is session-scoped: Tracing.end must come from the session
+    that sent Tracing.start, so the collector holds it until perf_stop.
+    Throttling given here is applied on that same session before tracing
+    starts and cleared after it ends, so every run records under the same
+    conditions.
+    """
+    _check_cpu_rate(args.cpu)
+    options = {}
+    if args.categories:
+        options["categories"] = args.categories
+    if args.compress:
+        options["compress"] = args.compress
+    conditions = _network_conditions(args)
+    if conditions:
+        options["network_conditions"] = conditions
+    if args.cpu:
+        options["cpu_rate"] = args.cpu
+    status = start_capture(client, _selected_target(client), "perf", options)
+    print(f"Tracing started (collector PID {status['pid']}).")
+    if args.categories:
+        print(f"  Categories: {args.categories}")
+    if args.compress:
+        print(f"  Compression: {args.compress}")
+    if conditions:
+        print(f"  Network: {args.network or 'custom'} ({_describe_conditions(conditions)})")
+    if args.cpu:
+        print(f"  CPU: {args.cpu:g}x slowdown")
 
 
 def cmd_perf_stop(client, args):
-    """Stop tracing and save results."""
-    import websocket
+    """Stop tracing and save results.
 
-    client.connect()
+    The collector pulls the trace stream with IO.read into its trace file;
+    progress is reported on stderr while it drains.
+    """
+    def _progress(size):
+        print(f"  Reading trace: {size / (1024 * 1024):.1f} MB", file=sys.stderr)
+
+    target_id = stop_capture(client, "perf", on_progress=_progress)
+    if target_id is None:
+        raise CDPError("No trace in progress. Run perf_start first.")
+    src = next((p for p in (trace_path(target_id, "gzip"), trace_path(target_id))
+                if os.path.exists(p)), None)
+    if src is None:
+        raise CDPError("Tracing ended without a trace (tab closed or trace stream timed out).")
+    suffix = ".json.gz" if src.endswith(".gz") else ".json"
+    output = args.output or f"/tmp/cdp-trace-{int(time.time())}{suffix}"
+    shutil.move(src, output)
+    print(f"Trace saved: {output} ({os.path.getsize(output)} bytes)")
+
+
+def cmd_perf_summary(client, args):
+    """Summarize a saved trace: long tasks, rendering, per-URL script cost, JS self time."""
+    path = os.path.expanduser(args.trace)
+    if not os.path.exists(path):
+        raise CDPError(f"Trace not found: {path}")
     try:
-        client.send("Tracing.end")
+        summary = summarize(path, long_task_ms=args.long_task_ms, top=args.top)
+    except (OSError, ValueError) as e:
+        raise CDPError(f"Cannot read trace: {e}")
 
-        # Collect trace chunks
-        chunks = []
-        deadline = time.time() + 60
-        while time.time() < deadline:
-            try:
-                client._ws.settimeout(2.0)
-                raw = client._ws.recv()
-                resp = json.loads(raw)
-                method = resp.get("method", "")
-                if method == "Tracing.dataCollected":
-                    chunks.extend(resp.get("params", {}).get("value", []))
-                elif method == "Tracing.tracingComplete":
-                    break
-            except websocket.WebSocketTimeoutException:
-                continue
-            except (websocket.WebSocketConnectionClosedException, ConnectionError):
-                break
+    print(f"Trace: {path} ({summary['events']} events, {summary['duration_ms'] / 1000:.1f}s)")
+    if not summary["main_threads"]:
+        print("No main-thread tasks found (record with --categories devtools.timeline).")
+        return
+    print(
+        f"Main thread: {summary['tasks']} tasks, {summary['task_ms']:.1f} ms busy; "
+        f"{summary['long_task_count']} long tasks (>= {summary['long_task_ms']} ms), "
+        f"{summary['long_task_total_ms']:.1f} ms total, {summary['blocking_ms']:.1f} ms blocking"
+    )
 
-        output = args.output or f"/tmp/cdp-trace-{int(time.time())}.json"
-        with open(output, "w") as f:
-            json.dump({"traceEvents": chunks}, f)
-        print(f"Trace saved: {output} ({len(chunks)} events)")
-    finally:
-        client.close()
+    if summary["long_tasks"]:
+        print("\nLongest tasks:")
+        print(f"{'Start(ms)':>10} {'Dur(ms)':>9}")
+        for task in summary["long_tasks"]:
+            print(f"{task['start_ms']:>10.1f} {task['dur_ms']:>9.1f}")
+
+    if summary["rendering"]:
+        print("\nRendering:")
+        for label, totals in summary["rendering"].items():
+            print(f"  {label:<20} {totals['ms']:>9.1f} ms  ({totals['count']}x)")
+
+    if summary["scripts"]:
+        print("\nScript cost by URL:")
+        print(f"{'Total':>9} {'Eval':>9} {'Compile':>9} {'Call':>9}  URL")
+        for row in summary["scripts"]:
+            print(
+                f"{row['total_ms']:>9.1f} {row['evaluate_ms']:>9.1f} {row['compile_ms']:>9.1f} "
+                f"{row['call_ms']:>9.1f}  {(row['url'] or '(inline)')[:100]}"
+            )
+
+    if summary["functions"]:
+        print("\nJS self time:")
+        print(f"{'Self(ms)':>9}  Function")
+        for row in summary["functions"]:
+            location = f"{row['url']}:{row['line']}" if row["url"] else ""
+            print(f"{row['self_ms']:>9.1f}  {row['function'][:40]:<40} {location[:80]}")
+    elif not summary["profiled"]:
+        print(f'\nNo CPU profile in trace; for JS self time record with --categories "{SUMMARY_CATEGORIES}"')
 
 
 def cmd_emulate(client, args):
-    """Apply device / geolocation / network-offline emulation."""
+    """Apply device / geolocation / network (offline, throttling) / CPU emulation.
+
+    Network conditions and CPU slowdown are session state: a one-shot
+    session would drop them on exit, so they are handed to the tab's
+    collector (throttle capture), which holds them until emulate_reset or
+    --duration. Runs outside the global lock (it may fork the collector)
+    and takes cdp_lock itself for the foreground setters.
+    """
     has_size = args.width is not None and args.height is not None
     if (args.width is None) != (args.height is None):
         print("Error: --width and --height must be provided together", file=sys.stderr)
         sys.exit(1)
 
-    if not (has_size or args.geolocation or args.offline is not None):
+    _check_cpu_rate(args.cpu)
+    conditions = _network_conditions(args, offline=args.offline)
+    if not (has_size or args.geolocation or conditions or args.cpu):
         print(
-            "Error: provide at least one of --width/--height, --geolocation, --offline",
+            "Error: provide at least one of --width/--height, --geolocation, --offline, "
+            "--network/--latency/--download-kbps/--upload-kbps, --cpu",
             file=sys.stderr,
         )
         sys.exit(1)
 
+    applied = []
+    if has_size or args.geolocation:
+        with cdp_lock(client.host, client.port):
+            _emulate_foreground(client, args, has_size, applied)
+
+    if conditions or args.cpu:
+        options = {}
+        if conditions:
+            options["network_conditions"] = conditions
+            if args.offline is not None:
+                applied.append(f"offline={args.offline}")
+            if _throttled(args):
+                applied.append(f"network {args.network or 'custom'} ({_describe_conditions(conditions)})")
+        if args.cpu:
+            options["cpu_rate"] = args.cpu
+            applied.append(f"cpu {args.cpu:g}x slowdown")
+        status = start_capture(client, _selected_target(client), "throttle", options,
+                               lifetime=args.duration)
+        applied.append(f"held by the tab's collector (PID {status['pid']}) for up to "
+                       f"{args.duration:g}s or until emulate_reset")
+
+    print(f"Emulation applied: {', '.join(applied)}")
+
+
+def _emulate_foreground(client, args, has_size, applied):
+    """Viewport / geolocation overrides on a foreground session."""
     client.connect()
     try:
-        applied = []
-
         if has_size:
             client.send("Emulation.setDeviceMetricsOverride", {
                 "width": args.width,
@@ -645,24 +825,17 @@ def cmd_emulate(client, args):
                 "accuracy": 10,
             })
             applied.append(f"geolocation ({lat}, {lon})")
-
-        if args.offline is not None:
-            client.send("Network.enable")
-            client.send("Network.emulateNetworkConditions", {
-                "offline": args.offline,
-                "latency": 0,
-                "downloadThroughput": -1,
-                "uploadThroughput": -1,
-            })
-            applied.append(f"offline={args.offline}")
-
-        print(f"Emulation applied: {', '.join(applied)}")
     finally:
         client.close()
 
 
 def cmd_emulate_reset(client, args):
-    """Reset device, geolocation, and offline emulation to defaults."""
+    """Reset device, geolocation, network and CPU emulation to defaults.
+
+    Stops the collector's throttle capture (emulate's network / CPU
+    settings) and clears the same state on a foreground session.
+    """
+    throttled = stop_capture(client, "throttle")
     client.connect()
     try:
         reset = []
@@ -688,11 +861,20 @@ def cmd_emulate_reset(client, args):
                 "downloadThroughput": -1,
                 "uploadThroughput": -1,
             })
-            reset.append("offline")
+            reset.append("network")
         except CDPConnectionError:
             raise
         except CDPError:
             pass
+        try:
+            client.send("Emulation.setCPUThrottlingRate", {"rate": 1})
+            reset.append("cpu")
+        except CDPConnectionError:
+            raise
+        except CDPError:
+            pass
+        if throttled:
+            reset.append("collector throttling")
         print(f"Emulation reset: {', '.join(reset) or 'none'}")
     finally:
         client.close()
@@ -738,102 +920,233 @@ def cmd_remove_init_script(client, args):
         client.close()
 
 
+def _format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def _unique_path(directory, filename):
+    """directory/filename, or 'name (1).ext', 'name (2).ext', ... if taken."""
+    path = os.path.join(directory, filename)
+    stem, ext = os.path.splitext(filename)
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{stem} ({n}){ext}")
+        n += 1
+    return path
+
+
 def cmd_download_wait(client, args):
-    """Block until the next download completes, writing to download-path."""
+    """Track concurrent downloads by guid until --count of them (matching --pattern) complete.
+
+    Chrome saves each download under its guid (allowAndName), so concurrent
+    downloads with the same suggested name never race for a path; on
+    completion the file is checked against totalBytes and renamed to its
+    suggested filename (deduplicated as 'name (1).ext').
+    """
+    import fnmatch
+
     import websocket
 
     download_path = os.path.abspath(
         os.path.expanduser(args.download_path or "/tmp/cdp-attach/downloads")
     )
     os.makedirs(download_path, exist_ok=True)
+    if args.count < 1:
+        raise CDPError("--count must be >= 1")
 
     client.connect()
     try:
         client.send("Browser.setDownloadBehavior", {
-            "behavior": "allow",
+            "behavior": "allowAndName",
             "downloadPath": download_path,
             "eventsEnabled": True,
         })
         client.send("Page.enable")
 
         deadline = time.time() + args.timeout_ms / 1000.0
-        inflight = {}
-
-        while time.time() < deadline:
+        downloads = {}   # guid -> {"filename", "url", "received", "total", "started", "state"}
+        finished = []    # completed/canceled downloads in completion order
+        matched = 0
+        next_report = time.time() + args.progress_interval
+
+        def wanted(filename):
+            return not args.pattern or fnmatch.fnmatch(filename, args.pattern)
+
+        while time.time() < deadline and matched < args.count:
+            now = time.time()
+            if args.progress_interval > 0 and now >= next_report:
+                next_report = now + args.progress_interval
+                for d in downloads.values():
+                    if d["state"] != "inProgress":
+                        continue
+                    total = f"/{_format_size(d['total'])} ({d['received'] * 100 // d['total']}%)" \
+                        if d["total"] else ""
+                    rate = d["received"] / max(now - d["started"], 1e-3)
+                    print(f"  {d['filename']}: {_format_size(d['received'])}{total} "
+                          f"{_format_size(rate)}/s")
             try:
-                client._ws.settimeout(1.0)
-                raw = client._ws.recv()
-                resp = json.loads(raw)
-                method = resp.get("method", "")
-                params = resp.get("params", {})
-
-                if method == "Browser.downloadWillBegin":
-                    guid = params.get("guid", "")
-                    inflight[guid] = {
-                        "url": params.get("url", ""),
-                        "filename": params.get("suggestedFilename", ""),
-                    }
-                    print(f"Download started: {inflight[guid]['filename']}")
-                elif method == "Browser.downloadProgress":
-                    guid = params.get("guid", "")
-                    state = params.get("state", "")
-                    if state == "completed":
-                        meta = inflight.get(guid, {})
-                        filename = meta.get("filename", "") or guid
-                        candidate_named = os.path.join(download_path, filename)
-                        candidate_guid = os.path.join(download_path, guid)
-                        if os.path.exists(candidate_named):
-                            saved_path = candidate_named
-                        elif os.path.exists(candidate_guid):
-                            saved_path = candidate_guid
-                        else:
-                            saved_path = candidate_named
-                        print(f"Download completed: {filename}")
-                        print(f"  Saved as: {saved_path}")
-                        print(f"  Bytes: {params.get('totalBytes', 0)}")
-                        return
-                    if state == "canceled":
-                        print("Download canceled", file=sys.stderr)
-                        sys.exit(1)
+                client._ws.settimeout(min(1.0, max(0.05, deadline - now)))
+                resp = json.loads(client._ws.recv())
             except websocket.WebSocketTimeoutException:
                 continue
             except (websocket.WebSocketConnectionClosedException, ConnectionError):
                 break
-
-        print(f"Download wait timeout after {args.timeout_ms}ms", file=sys.stderr)
-        sys.exit(1)
+            method = resp.get("method", "")
+            params = resp.get("params", {})
+            guid = params.get("guid", "")
+
+            if method == "Browser.downloadWillBegin":
+                downloads[guid] = {
+                    "filename": params.get("suggestedFilename", "") or guid,
+                    "url": params.get("url", ""),
+                    "received": 0, "total": 0, "started": time.time(), "state": "inProgress",
+                }
+                print(f"Download started: {downloads[guid]['filename']}")
+            elif method == "Browser.downloadProgress" and guid in downloads:
+                d = downloads[guid]
+                d.update(received=params.get("receivedBytes", 0), total=params.get("totalBytes", 0),
+                         state=params.get("state", d["state"]))
+                if d["state"] == "canceled":
+                    print(f"Download canceled: {d['filename']}", file=sys.stderr)
+                    finished.append(d)
+                elif d["state"] == "completed":
+                    src = os.path.join(download_path, guid)
+                    d["size"] = os.path.getsize(src) if os.path.exists(src) else None
+                    d["ok"] = d["size"] is not None and (not d["total"] or d["size"] == d["total"])
+                    d["path"] = src
+                    if d["size"] is not None:
+                        d["path"] = _unique_path(download_path, os.path.basename(d["filename"]))
+                        os.replace(src, d["path"])
+                    print(f"Download completed: {d['filename']} → {d['path']}")
+                    finished.append(d)
+                    if wanted(d["filename"]):
+                        matched += 1
+
+        failed = False
+        if finished:
+            print(f"\n{'Status':<10} {'Bytes':>12} {'Expected':>12}  Path")
+            for d in finished:
+                if d["state"] == "canceled":
+                    status = "canceled"
+                else:
+                    status = "ok" if d["ok"] else "SIZE DIFF" if d["size"] is not None else "MISSING"
+                failed = failed or status != "ok"
+                size = "" if d.get("size") is None else str(d["size"])
+                expected = str(d["total"]) if d["total"] else "?"
+                print(f"{status:<10} {size:>12} {expected:>12}  {d.get('path') or d['filename']}")
+        pending = [d["filename"] for d in downloads.values() if d["state"] == "inProgress"]
+        if pending:
+            print(f"Still in progress: {', '.join(pending)}", file=sys.stderr)
+        if matched < args.count:
+            what = f" matching {args.pattern!r}" if args.pattern else ""
+            print(f"Download wait timeout after {args.timeout_ms}ms "
+                  f"({matched}/{args.count} completed{what})", file=sys.stderr)
+            sys.exit(1)
+        if failed:
+            sys.exit(1)
     finally:
         client.close()
 
 
-_STATE_DUMP_JS = (
-    "(() => {"
-    " const ls = {};"
-    " for (const k of Object.keys(localStorage)) ls[k] = localStorage.getItem(k);"
-    " const ss = {};"
-    " for (const k of Object.keys(sessionStorage)) ss[k] = sessionStorage.getItem(k);"
-    " return {localStorage: ls, sessionStorage: ss, url: location.href};"
-    "})()"
-)
+def _global_object(client):
+    """objectId of the page's globalThis, the receiver for storage_state functions."""
+    result = client.send("Runtime.evaluate", {"expression": "globalThis"})
+    return result["result"]["objectId"]
+
+
+def _call_paged(client, object_id, function, *args):
+    """Runtime.callFunctionOn with JSON arguments, awaiting and returning the value."""
+    result = client.send("Runtime.callFunctionOn", {
+        "objectId": object_id,
+        "functionDeclaration": function,
+        "arguments": [{"value": a} for a in args],
+        "returnByValue": True,
+        "awaitPromise": True,
+    })
+    if result.get("exceptionDetails"):
+        details = result["exceptionDetails"]
+        message = (details.get("exception") or {}).get("description") or details.get("text", "")
+        raise CDPError(f"page storage call failed: {message}")
+    return result.get("result", {}).get("value")
+
+
+def _read_web_storage(client, object_id, area):
+    """Page through localStorage / sessionStorage. Returns ({k: v}, page info)."""
+    items, start, page = {}, 0, {}
+    while True:
+        page = _call_paged(client, object_id, STORAGE_READ_JS, area, start, STATE_PAGE_CHARS) or {}
+        items.update(page.get("items") or [])
+        start = page.get("next", 0)
+        if start >= page.get("total", 0):
+            return items, page
+
+
+def _read_indexeddb(client, object_id, origin):
+    """Schema + every record of every database visible to `origin`."""
+    try:
+        names = client.send("IndexedDB.requestDatabaseNames",
+                            {"securityOrigin": origin}).get("databaseNames", [])
+    except CDPError:
+        return []
+    databases = []
+    for name in sorted(names):
+        schema = _call_paged(client, object_id, IDB_SCHEMA_JS, name)
+        for store in schema["stores"]:
+            records, after = [], None
+            while True:
+                page = _call_paged(client, object_id, IDB_READ_JS,
+                                   name, store["name"], after, STATE_PAGE_CHARS)
+                records.extend(page["records"])
+                after = page["after"]
+                if page["done"]:
+                    break
+            store["records"] = records
+        databases.append(schema)
+    return databases
+
+
+def _write_pages(client, object_id, function, lead_args, items):
+    """Pipeline one callFunctionOn per STATE_PAGE_CHARS page of items. Returns the page count."""
+    calls = [
+        ("Runtime.callFunctionOn", {
+            "objectId": object_id,
+            "functionDeclaration": function,
+            "arguments": [{"value": a} for a in (*lead_args, page)],
+            "returnByValue": True,
+            "awaitPromise": True,
+        })
+        for page in paged(items)
+    ]
+    for result in client.send_batch(calls, timeout=30 + 5 * len(calls)):
+        if result.get("exceptionDetails"):
+            details = result["exceptionDetails"]
+            message = (details.get("exception") or {}).get("description") or details.get("text", "")
+            raise CDPError(f"page storage write failed: {message}")
+    return len(calls)
 
 
 def cmd_state_save(client, args):
-    """Save current-tab origin cookies + localStorage + sessionStorage to a JSON file.
+    """Save current-tab origin cookies + Web Storage + IndexedDB to a state file.
 
     Cookies are filtered to the current tab's URL via Network.getCookies,
     so only origin-applicable cookies are captured (about:blank/data: → 0).
     Use --all-cookies to capture the entire browser cookie jar instead.
+
+    Storage is read in STATE_PAGE_CHARS pages (storage_state), IndexedDB
+    values through a tagged encoding that keeps Dates, binary data, Blobs,
+    Maps and Sets intact. A path ending in .gz is written gzip-compressed.
     """
     client.connect()
     try:
         client.send("Network.enable")
-
-        storage_result = client.send("Runtime.evaluate", {
-            "expression": _STATE_DUMP_JS,
-            "returnByValue": True,
-        })
-        storage = storage_result.get("result", {}).get("value", {}) or {}
-        current_url = storage.get("url") or ""
+        object_id = _global_object(client)
+        local, page = _read_web_storage(client, object_id, "local")
+        session, _ = _read_web_storage(client, object_id, "session")
+        current_url = page.get("url") or ""
+        origin = page.get("origin") or ""
 
         if getattr(args, "all_cookies", False):
             cookies = client.send("Network.getAllCookies").get("cookies", [])
@@ -847,42 +1160,59 @@ def cmd_state_save(client, args):
             cookies = []
             scope_label = "origin-scoped (null origin → empty)"
 
+        databases = []
+        if not args.no_indexeddb and origin and origin != "null":
+            databases = _read_indexeddb(client, object_id, origin)
+
         snapshot = {
-            "version": 1,
+            "version": STATE_VERSION,
             "timestamp": time.time(),
             "url": current_url or None,
+            "origin": origin or None,
             "cookies": cookies,
-            "localStorage": storage.get("localStorage", {}),
-            "sessionStorage": storage.get("sessionStorage", {}),
+            "localStorage": local,
+            "sessionStorage": session,
+            "indexedDB": databases,
         }
 
         output_path = os.path.abspath(os.path.expanduser(args.path))
         parent_dir = os.path.dirname(output_path)
         if parent_dir:
             os.makedirs(parent_dir, exist_ok=True)
-        with open(output_path, "w") as f:
-            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        write_state(output_path, snapshot)
 
-        print(f"State saved: {output_path}")
+        records = sum(len(s["records"]) for db in databases for s in db["stores"])
+        print(f"State saved: {output_path} ({_format_size(os.path.getsize(output_path))})")
         print(f"  URL: {snapshot['url']}")
         print(f"  Cookies: {len(snapshot['cookies'])} ({scope_label})")
-        print(f"  localStorage keys: {len(snapshot['localStorage'])}")
-        print(f"  sessionStorage keys: {len(snapshot['sessionStorage'])}")
+        print(f"  localStorage keys: {len(local)}")
+        print(f"  sessionStorage keys: {len(session)}")
+        print(f"  IndexedDB: {len(databases)} database(s), {records} record(s)")
     finally:
         client.close()
 
 
 def cmd_state_load(client, args):
-    """Restore cookies + storage previously saved via state_save."""
+    """Restore cookies + storage previously saved via state_save.
+
+    Web Storage is written in pipelined pages passed as call arguments. Each
+    saved IndexedDB database is deleted (IndexedDB.deleteDatabase; other
+    databases of the origin are left alone) and recreated at its saved
+    version and schema before its records are put back, so the tab must
+    already be on the saved origin.
+    """
     input_path = os.path.abspath(os.path.expanduser(args.path))
     if not os.path.exists(input_path):
         print(f"Error: state file not found: {input_path}", file=sys.stderr)
         sys.exit(1)
 
-    with open(input_path) as f:
-        snapshot = json.load(f)
+    try:
+        snapshot = read_state(input_path)
+    except (OSError, ValueError, EOFError) as e:
+        print(f"Error: unreadable state file {input_path}: {e}", file=sys.stderr)
+        sys.exit(1)
 
-    if snapshot.get("version") != 1:
+    if snapshot.get("version") not in (1, STATE_VERSION):
         print(
             f"Error: unsupported state file version: {snapshot.get('version')!r}",
             file=sys.stderr,
@@ -892,6 +1222,7 @@ def cmd_state_load(client, args):
     cookies = snapshot.get("cookies", []) or []
     ls = snapshot.get("localStorage", {}) or {}
     ss = snapshot.get("sessionStorage", {}) or {}
+    databases = snapshot.get("indexedDB", []) or []
 
     client.connect()
     try:
@@ -899,23 +1230,38 @@ def cmd_state_load(client, args):
         if cookies:
             client.send("Network.setCookies", {"cookies": cookies})
 
-        if ls or ss:
-            setter_js = (
-                "((ls, ss) => {"
-                " for (const k of Object.keys(ls)) localStorage.setItem(k, ls[k]);"
-                " for (const k of Object.keys(ss)) sessionStorage.setItem(k, ss[k]);"
-                " return {ls: Object.keys(ls).length, ss: Object.keys(ss).length};"
-                f"}})({json.dumps(ls)}, {json.dumps(ss)})"
-            )
-            client.send("Runtime.evaluate", {
-                "expression": setter_js,
-                "returnByValue": True,
-            })
+        object_id = _global_object(client)
+        if ls:
+            _write_pages(client, object_id, STORAGE_WRITE_JS, ("local",), list(ls.items()))
+        if ss:
+            _write_pages(client, object_id, STORAGE_WRITE_JS, ("session",), list(ss.items()))
+
+        records = 0
+        if databases:
+            origin = _call_paged(client, object_id, "function () { return location.origin; }")
+            if snapshot.get("origin") and origin != snapshot["origin"]:
+                print(f"Warning: tab origin {origin} differs from saved origin "
+                      f"{snapshot['origin']}; IndexedDB is restored into {origin}", file=sys.stderr)
+            client.send_batch([
+                ("IndexedDB.deleteDatabase", {"securityOrigin": origin, "databaseName": db["name"]})
+                for db in databases
+            ])
+            for db in databases:
+                schema = {k: db[k] for k in ("name", "version")}
+                schema["stores"] = [{k: v for k, v in s.items() if k != "records"} for s in db["stores"]]
+                _call_paged(client, object_id, IDB_CREATE_JS, schema)
+                for store in db["stores"]:
+                    if store["records"]:
+                        _write_pages(client, object_id, IDB_WRITE_JS,
+                                     (db["name"], store["name"], store["keyPath"] is not None),
+                                     store["records"])
+                        records += len(store["records"])
 
         print(f"State loaded from: {input_path}")
         print(f"  Cookies set: {len(cookies)}")
         print(f"  localStorage keys: {len(ls)}")
         print(f"  sessionStorage keys: {len(ss)}")
+        print(f"  IndexedDB: {len(databases)} database(s), {records} record(s)")
         if snapshot.get("url"):
             print(f"  Source URL: {snapshot['url']}")
     finally:
@@ -923,38 +1269,26 @@ def cmd_state_load(client, args):
 
 
 def cmd_drag(client, args):
-    """Drag from (x1,y1) to (x2,y2)."""
-    client.connect()
-    try:
-        steps = max(1, args.steps or 10)
-        dx = (args.x2 - args.x1) / steps
-        dy = (args.y2 - args.y1) / steps
-
-        # Mouse down at start
-        client.send("Input.dispatchMouseEvent", {
-            "type": "mousePressed",
-            "x": args.x1, "y": args.y1,
-            "button": "left", "clickCount": 1,
-        })
+    """Drag from (x1,y1) to (x2,y2) along an interpolated, timestamped path.
 
-        # Intermediate moves
-        for i in range(1, steps + 1):
-            client.send("Input.dispatchMouseEvent", {
-                "type": "mouseMoved",
-                "x": args.x1 + dx * i,
-                "y": args.y1 + dy * i,
-                "button": "left",
-            })
-            time.sleep(0.01)
-
-        # Mouse up at end
-        client.send("Input.dispatchMouseEvent", {
-            "type": "mouseReleased",
-            "x": args.x2, "y": args.y2,
-            "button": "left", "clickCount": 1,
-        })
+    The whole press → moves → release sequence is built up front
+    (input_paths.drag_calls) and sent pipelined in one batch, so a long
+    drag costs one round-trip wait instead of one per step.
+    """
+    steps = plan_steps(args.steps, args.duration_ms, args.rate)
+    calls = drag_calls(
+        args.x1, args.y1, args.x2, args.y2,
+        curve=args.curve, steps=steps,
+        duration_ms=args.duration_ms, rate_hz=args.rate,
+    )
 
-        print(f"Dragged ({args.x1},{args.y1}) → ({args.x2},{args.y2}) in {steps} steps")
+    client.connect()
+    try:
+        client.send_batch(calls)
+        print(
+            f"Dragged ({args.x1},{args.y1}) → ({args.x2},{args.y2}) in {steps} steps "
+            f"({args.curve}, {len(calls)} events pipelined)"
+        )
     finally:
         client.close()
 
@@ -973,16 +1307,60 @@ def cmd_dialog(client, args):
 
 
 def main():
+    commands = {
+        "network_start": cmd_network_start,
+        "network_list": cmd_network_list,
+        "network_stop": cmd_network_stop,
+        "network_body": cmd_network_body,
+        "network_export": cmd_network_export,
+        "console_start": cmd_console_start,
+        "console_list": cmd_console_list,
+        "console_stop": cmd_console_stop,
+        "perf_start": cmd_perf_start,
+        "perf_stop": cmd_perf_stop,
+        "perf_summary": cmd_perf_summary,
+        "metrics_start": cmd_metrics_start,
+        "metrics_list": cmd_metrics_list,
+        "metrics_stop": cmd_metrics_stop,
+        "route_start": cmd_route_start,
+        "route_list": cmd_route_list,
+        "route_stop": cmd_route_stop,
+        "vitals_start": cmd_vitals_start,
+        "vitals_list": cmd_vitals_list,
+        "vitals_stop": cmd_vitals_stop,
+        "health_start": cmd_health_start,
+        "health_status": cmd_health_status,
+        "health_stop": cmd_health_stop,
+        "emulate": cmd_emulate,
+        "emulate_reset": cmd_emulate_reset,
+        "add_init_script": cmd_add_init_script,
+        "remove_init_script": cmd_remove_init_script,
+        "download_wait": cmd_download_wait,
+        "state_save": cmd_state_save,
+        "state_load": cmd_state_load,
+        "drag": cmd_drag,
+        "dialog": cmd_dialog,
+    }
+
     parser = argparse.ArgumentParser(
         prog="cdp-v3",
         description="Advanced CDP operations",
     )
     parser.add_argument("--host", help="CDP host")
     parser.add_argument("--port", type=int, help="CDP port")
-    sub = parser.add_subparsers(dest="command", required=True)
+    # Only the invoked command's parser is built (see subcommands).
+    sub = LazySubparsers(parser.add_subparsers(dest="command", required=True),
+                         invoked_command(sys.argv[1:], commands))
 
     # network
-    sub.add_parser("network_start", help="Start network collector (captures XHR/Fetch bodies)")
+    p_ns = sub.add_parser("network_start", help="Start network capture (captures XHR/Fetch bodies)")
+    p_ns.add_argument("--compress", choices=sorted(COMPRESSIONS),
+                      help="Compress the events file (network-events.jsonl.gz / .zst)")
+    p_ns.add_argument("--max-inflight", dest="max_inflight", type=int,
+                      help=f"Concurrent body fetches (default: {BODY_MAX_INFLIGHT})")
+    p_ns.add_argument("--body-types", dest="body_types",
+                      help="Resource types whose bodies are captured, comma-separated, "
+                           "or 'all' (default: XHR,Fetch,EventSource)")
     p_nl = sub.add_parser("network_list", help="List collected requests")
     p_nl.add_argument("--filter", help="URL pattern filter")
     p_nl.add_argument(
@@ -991,6 +1369,15 @@ def main():
         help="Show requestId column and mark requests with captured bodies",
     )
     sub.add_parser("network_stop", help="Stop network collector")
+    p_ne = sub.add_parser("network_export", help="Export the network capture as HAR 1.2")
+    p_ne.add_argument("--output", "-o",
+                      help="Output path, or '-' for stdout (default: /tmp/cdp-network-<ts>.har)")
+    p_ne.add_argument("--filter", help="URL pattern filter")
+    p_ne.add_argument("--no-bodies", dest="no_bodies", action="store_true",
+                      help="Omit captured response bodies")
+    p_ne.add_argument("--max-body-mb", dest="max_body_mb", type=float,
+                      default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+                      help="Inline bodies up to this size (default: 10)")
     p_nb = sub.add_parser(
         "network_body",
         help="Print a captured XHR/Fetch response body by requestId",
@@ -1005,7 +1392,9 @@ def main():
     )
 
     # console
-    sub.add_parser("console_start", help="Start console collector")
+    p_cs = sub.add_parser("console_start", help="Start console collector")
+    p_cs.add_argument("--compress", choices=sorted(COMPRESSIONS),
+                      help="Compress the events file (console-events.jsonl.gz / .zst)")
     p_cl = sub.add_parser("console_list", help="List console messages")
     p_cl.add_argument("--level", choices=["error", "warn", "warning", "all"], default="all")
     sub.add_parser("console_stop", help="Stop console collector")
@@ -1013,11 +1402,64 @@ def main():
     # perf
     p_ps = sub.add_parser("perf_start", help="Start tracing")
     p_ps.add_argument("--categories", help="Trace categories (comma-separated)")
+    p_ps.add_argument("--compress", choices=["gzip"],
+                      help="Have Chrome gzip the trace stream (perf_stop saves .json.gz)")
+    _add_throttle_args(p_ps)
     p_pst = sub.add_parser("perf_stop", help="Stop tracing")
     p_pst.add_argument("--output", "-o", help="Output trace file path")
+    p_psum = sub.add_parser("perf_summary", help="Summarize a saved trace file")
+    p_psum.add_argument("trace", help="Trace file from perf_stop (.json or .json.gz)")
+    p_psum.add_argument("--top", type=int, default=15, help="Rows per table (default: 15)")
+    p_psum.add_argument("--long-task-ms", dest="long_task_ms", type=float, default=LONG_TASK_MS,
+                        help=f"Long task threshold (default: {LONG_TASK_MS})")
+
+    # route
+    p_rs = sub.add_parser("route_start", help="Intercept requests: block, serve fixtures, add latency")
+    p_rs.add_argument("--block", help="Resource types and/or presets to fail, comma-separated "
+                                      "(e.g. image,font,media,analytics)")
+    p_rs.add_argument("--block-url", dest="block_url", action="append",
+                      help="URL wildcard pattern to fail (repeatable, e.g. '*://cdn.example.com/*')")
+    p_rs.add_argument("--fixtures", help="Serve matching files from this directory ({host}/{path} or {path})")
+    p_rs.add_argument("--latency", type=int, help="Delay each request by this many ms")
+    p_rs.add_argument("--latency-url", dest="latency_url", help="Only delay URLs matching this pattern")
+    p_rl = sub.add_parser("route_list", help="Show route rules and recent actions")
+    p_rl.add_argument("--tail", type=int, default=20, help="Recent actions to show (default: 20)")
+    sub.add_parser("route_stop", help="Stop request interception")
+
+    # vitals
+    p_vs = sub.add_parser("vitals_start", help="Collect web vitals (LCP/CLS/INP/TTFB/long tasks) per navigation")
+    p_vs.add_argument("--duration", type=float, default=COLLECTOR_LIFETIME,
+                      help=f"Keep the collector alive this many seconds (default: {COLLECTOR_LIFETIME})")
+    p_vl = sub.add_parser("vitals_list", help="Summarize collected web vitals per navigation")
+    p_vl.add_argument("--filter", help="URL pattern filter")
+    sub.add_parser("vitals_stop", help="Stop vitals collection")
+
+    # health
+    p_hs = sub.add_parser("health_start", help="Probe renderer liveness in the background; fail fast on wedged tabs")
+    p_hs.add_argument("--all-tabs", dest="all_tabs", action="store_true",
+                      help="Monitor every page tab instead of only the selected one")
+    p_hs.add_argument("--interval", type=float, default=HEALTH_INTERVAL,
+                      help=f"Seconds between probes (default: {HEALTH_INTERVAL:g})")
+    p_hs.add_argument("--duration", type=float, default=3600,
+                      help="Keep monitoring this many seconds (default: 3600)")
+    p_hst = sub.add_parser("health_status", help="Show renderer health per monitored tab")
+    p_hst.add_argument("--tail", type=int, default=10, help="Recent probe latencies shown (default: 10)")
+    sub.add_parser("health_stop", help="Stop all health monitors")
+
+    # metrics
+    p_ms = sub.add_parser("metrics_start", help="Sample Performance.getMetrics in the background")
+    p_ms.add_argument("--interval", type=float, default=METRICS_INTERVAL,
+                      help=f"Seconds between samples (default: {METRICS_INTERVAL:g})")
+    p_ms.add_argument("--duration", type=float, default=COLLECTOR_LIFETIME,
+                      help=f"Keep the collector alive this many seconds (default: {COLLECTOR_LIFETIME})")
+    p_ml = sub.add_parser("metrics_list", help="Summarize sampled metrics")
+    p_ml.add_argument("--all", action="store_true", help="Every metric, not just the key ones")
+    p_ml.add_argument("--series", metavar="METRIC", help="Print one metric's samples (e.g. JSHeapUsedSize)")
+    p_ml.add_argument("--tail", type=int, help="With --series: only the last N samples")
+    sub.add_parser("metrics_stop", help="Stop metrics sampler")
 
     # emulate
-    p_em = sub.add_parser("emulate", help="Device / geolocation / offline emulation")
+    p_em = sub.add_parser("emulate", help="Device / geolocation / network / CPU emulation")
     p_em.add_argument("--width", type=int, help="Viewport width (requires --height)")
     p_em.add_argument("--height", type=int, help="Viewport height (requires --width)")
     p_em.add_argument("--scale", type=float, default=1.0, help="Device scale factor")
@@ -1029,7 +1471,10 @@ def main():
         default=None,
         help="Offline network state: true/false (leave unset to keep current)",
     )
-    sub.add_parser("emulate_reset", help="Reset device, geolocation, and offline emulation")
+    _add_throttle_args(p_em)
+    p_em.add_argument("--duration", type=float, default=3600,
+                      help="Hold network / CPU throttling this many seconds (default: 3600)")
+    sub.add_parser("emulate_reset", help="Reset device, geolocation, network and CPU emulation")
 
     # add_init_script / remove_init_script
     p_ais = sub.add_parser(
@@ -1049,30 +1494,37 @@ def main():
     # download_wait
     p_dw = sub.add_parser(
         "download_wait",
-        help="Block until the next download completes",
+        help="Track downloads until N (matching a pattern) complete",
     )
     p_dw.add_argument("--timeout-ms", dest="timeout_ms", type=int, default=60000,
                       help="Timeout in milliseconds (default: 60000)")
     p_dw.add_argument("--download-path", dest="download_path",
                       help="Directory to save downloads (default: /tmp/cdp-attach/downloads)")
+    p_dw.add_argument("--count", type=int, default=1,
+                      help="Wait for this many completed downloads (default: 1)")
+    p_dw.add_argument("--pattern", help="Only count downloads whose filename matches this glob (e.g. '*.csv')")
+    p_dw.add_argument("--progress-interval", dest="progress_interval", type=float, default=2.0,
+                      help="Seconds between progress lines, 0 to disable (default: 2)")
 
     # state_save / state_load
     p_ss = sub.add_parser(
         "state_save",
-        help="Save current-tab origin cookies + storage to a JSON file",
+        help="Save current-tab origin cookies + storage + IndexedDB to a state file",
     )
-    p_ss.add_argument("path", help="Output JSON file path")
+    p_ss.add_argument("path", help="Output state file path (.gz → gzip-compressed)")
     p_ss.add_argument(
         "--all-cookies",
         dest="all_cookies",
         action="store_true",
         help="Capture browser-wide cookie jar instead of only current-tab origin",
     )
+    p_ss.add_argument("--no-indexeddb", dest="no_indexeddb", action="store_true",
+                      help="Skip IndexedDB (cookies + Web Storage only)")
     p_sl = sub.add_parser(
         "state_load",
-        help="Restore session state from a JSON file produced by state_save",
+        help="Restore session state from a file produced by state_save",
     )
-    p_sl.add_argument("path", help="Input JSON file path")
+    p_sl.add_argument("path", help="Input state file path (plain or gzip)")
 
     # drag
     p_drag = sub.add_parser("drag", help="Drag gesture")
@@ -1080,51 +1532,44 @@ def main():
     p_drag.add_argument("y1", type=float)
     p_drag.add_argument("x2", type=float)
     p_drag.add_argument("y2", type=float)
-    p_drag.add_argument("--steps", type=int, default=10, help="Interpolation steps")
+    p_drag.add_argument("--steps", type=int, default=None,
+                        help="Interpolation steps (default: 10, or duration × rate with --duration-ms)")
+    p_drag.add_argument("--curve", choices=CURVES, default="linear",
+                        help="Path shape (default: linear; bezier = slight arc)")
+    p_drag.add_argument("--duration-ms", dest="duration_ms", type=float, default=None,
+                        help="Gesture duration stamped onto the events (default: 1/rate per step)")
+    p_drag.add_argument("--rate", type=float, default=DEFAULT_RATE_HZ,
+                        help=f"Event rate in Hz for timestamps / step count (default: {DEFAULT_RATE_HZ})")
 
     # dialog
     p_dlg = sub.add_parser("dialog", help="Handle JS dialog")
     p_dlg.add_argument("action", choices=["accept", "dismiss"])
     p_dlg.add_argument("prompt_text", nargs="?", help="Text for prompt dialogs")
 
+    add_output_args(parser, sub)
     args = parser.parse_args()
     client = CDPClient(host=args.host, port=args.port)
 
     # Exempt from headless guard: read local files or manage local PIDs,
     # never sending CDP commands to the browser. Keep in sync with commands dict.
     LOCAL_COMMANDS = {
-        "network_list", "network_stop", "network_body",
-        "console_list", "console_stop",
+        "network_list", "network_stop", "network_body", "network_export",
+        "console_list", "console_stop", "perf_stop", "perf_summary",
+        "metrics_list", "metrics_stop", "route_list", "route_stop",
+        "vitals_list", "vitals_stop", "health_status", "health_stop",
     }
 
-    commands = {
-        "network_start": cmd_network_start,
-        "network_list": cmd_network_list,
-        "network_stop": cmd_network_stop,
-        "network_body": cmd_network_body,
-        "console_start": cmd_console_start,
-        "console_list": cmd_console_list,
-        "console_stop": cmd_console_stop,
-        "perf_start": cmd_perf_start,
-        "perf_stop": cmd_perf_stop,
-        "emulate": cmd_emulate,
-        "emulate_reset": cmd_emulate_reset,
-        "add_init_script": cmd_add_init_script,
-        "remove_init_script": cmd_remove_init_script,
-        "download_wait": cmd_download_wait,
-        "state_save": cmd_state_save,
-        "state_load": cmd_state_load,
-        "drag": cmd_drag,
-        "dialog": cmd_dialog,
+    # Daemon-spawning commands may fork() the tab's long-lived collector, which
+    # holds the CDP session itself. They must NOT run under cdp_lock: the
+    # forked child would never release it (permanent deadlock), and flock is
+    # shared across fork. The daemon runs UNLOCKED by design (it only observes
+    # events). Their foreground parent does no synchronous browser I/O worth
+    # serializing.
+    DAEMON_COMMANDS = {
+        "network_start", "console_start", "perf_start", "metrics_start",
+        "route_start", "vitals_start", "health_start", "emulate",
     }
 
-    # Daemon-spawning commands fork() a long-lived collector that holds the
-    # CDP session itself. They must NOT run under cdp_lock: the forked child
-    # would never release it (permanent deadlock), and flock is shared across
-    # fork. The daemon runs UNLOCKED by design (it only observes events). Their
-    # foreground parent does no synchronous browser I/O worth serializing.
-    DAEMON_COMMANDS = {"network_start", "console_start"}
-
     try:
         if args.command in DAEMON_COMMANDS:
             # Block headless browsers (these are not local-only commands).
@@ -0,0 +1,56 @@
+"""
+input_paths: step planning, --rate validation and timestamp spacing. Pure
+arithmetic — no browser.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "scripts"))
+from cdp_client import CDPError  # noqa: E402
+from input_paths import plan_steps, trajectory, wheel_calls  # noqa: E402
+
+
+class PlanStepsTest(unittest.TestCase):
+
+    def test_explicit_steps_win(self):
+        self.assertEqual(plan_steps(steps=7, duration_ms=1000, rate_hz=60), 7)
+
+    def test_duration_times_rate(self):
+        self.assertEqual(plan_steps(duration_ms=500, rate_hz=60), 30)
+        self.assertEqual(plan_steps(duration_ms=250, rate_hz=120), 30)
+
+    def test_default_and_floor(self):
+        self.assertEqual(plan_steps(), 10)
+        self.assertEqual(plan_steps(default=0), 1)
+        self.assertEqual(plan_steps(duration_ms=1, rate_hz=60), 1)
+
+    def test_non_positive_rate_raises(self):
+        for rate in (0, -5, -0.5):
+            with self.subTest(rate=rate):
+                with self.assertRaisesRegex(CDPError, "--rate must be positive"):
+                    plan_steps(duration_ms=500, rate_hz=rate)
+                with self.assertRaises(CDPError):
+                    plan_steps(steps=5, rate_hz=rate)
+
+
+class SpacingTest(unittest.TestCase):
+
+    def test_events_spaced_by_rate(self):
+        points = trajectory(0, 0, 100, 0, steps=4, rate_hz=50, start=10.0)
+        self.assertEqual([round(ts, 6) for _, _, ts in points], [10.02, 10.04, 10.06, 10.08])
+        self.assertEqual(points[-1][:2], (100, 0))
+
+    def test_duration_spans_path(self):
+        points = trajectory(0, 0, 10, 10, steps=5, duration_ms=1000, start=0.0)
+        self.assertAlmostEqual(points[-1][2], 1.0)
+
+    def test_wheel_deltas_sum_to_total(self):
+        calls = wheel_calls(0, 0, 0, 100, steps=3, start=0.0)
+        self.assertEqual(len(calls), 3)
+        self.assertAlmostEqual(sum(params["deltaY"] for _, params in calls), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
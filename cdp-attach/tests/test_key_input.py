@@ -0,0 +1,72 @@
+"""
+key_input.parse_sequence: token splitting, the comma key, chords and
+unknown-key rejection. Pure parsing — no browser.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "scripts"))
+from cdp_client import CDPError  # noqa: E402
+from key_input import parse_sequence, sequence_calls  # noqa: E402
+
+
+def _summary(spec):
+    """parse_sequence() as ("key", mods, key name) / ("text", str) tuples."""
+    return [action if action[0] == "text" else ("key", action[1], action[2].key)
+            for action in parse_sequence(spec)]
+
+
+class ParseSequenceTest(unittest.TestCase):
+
+    def test_named_keys_and_aliases(self):
+        self.assertEqual(_summary("Enter, tab, esc"),
+                         [("key", [], "Enter"), ("key", [], "Tab"), ("key", [], "Escape")])
+
+    def test_chords(self):
+        self.assertEqual(_summary("Ctrl+Shift+K"), [("key", ["Control", "Shift"], "K")])
+        self.assertEqual(_summary("Cmd+a"), [("key", ["Meta"], "a")])
+        self.assertEqual(_summary("Ctrl++"), [("key", ["Control"], "+")])
+
+    def test_quoted_text(self):
+        self.assertEqual(_summary('"Hello, world", Enter'),
+                         [("text", "Hello, world"), ("key", [], "Enter")])
+        self.assertEqual(_summary('"Enter"'), [("text", "Enter")])
+
+    def test_single_character_is_text(self):
+        self.assertEqual(_summary("a, é"), [("text", "a"), ("text", "é")])
+
+    def test_lone_comma_is_the_comma_key(self):
+        self.assertEqual(_summary(","), [("key", [], ",")])
+        self.assertEqual(_summary("Enter, ,, Tab"),
+                         [("key", [], "Enter"), ("key", [], ","), ("key", [], "Tab")])
+
+    def test_comma_ends_a_chord(self):
+        self.assertEqual(_summary("Ctrl+,"), [("key", ["Control"], ",")])
+        self.assertEqual(_summary("Ctrl+,, Enter"),
+                         [("key", ["Control"], ","), ("key", [], "Enter")])
+
+    def test_comma_alias(self):
+        self.assertEqual(_summary("Comma"), [("key", [], ",")])
+
+    def test_unknown_keys_raise(self):
+        for spec in ("Entr", "PrintScreen", "Control+Entr", "Hello", "Enter, Entr"):
+            with self.subTest(spec=spec):
+                with self.assertRaisesRegex(CDPError, "unknown key"):
+                    parse_sequence(spec)
+
+    def test_comma_key_events(self):
+        calls = sequence_calls(parse_sequence(","))
+        self.assertEqual([params["type"] for _, params in calls], ["rawKeyDown", "char", "keyUp"])
+        self.assertEqual(calls[1][1]["text"], ",")
+        self.assertEqual(calls[0][1]["code"], "Comma")
+
+    def test_chord_suppresses_char_event(self):
+        calls = sequence_calls(parse_sequence("Ctrl+,"))
+        self.assertEqual([params["type"] for _, params in calls],
+                         ["rawKeyDown", "rawKeyDown", "keyUp", "keyUp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
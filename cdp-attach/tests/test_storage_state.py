@@ -0,0 +1,77 @@
+"""
+storage_state: page splitting for state_save / state_load and the state
+file round trip. No browser.
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "scripts"))
+from storage_state import paged, read_state, write_state  # noqa: E402
+
+
+def _size(item):
+    return len(json.dumps(item, ensure_ascii=False))
+
+
+class PagedTest(unittest.TestCase):
+
+    def test_pages_keep_order_and_every_item(self):
+        items = [[f"k{i}", "v" * (i % 7)] for i in range(200)]
+        pages = list(paged(items, budget=100))
+        self.assertGreater(len(pages), 1)
+        self.assertEqual([item for page in pages for item in page], items)
+
+    def test_pages_stay_within_budget(self):
+        items = [[f"k{i}", "v" * 10] for i in range(50)]
+        for page in paged(items, budget=64):
+            self.assertLessEqual(sum(_size(item) for item in page), 64)
+
+    def test_oversized_item_gets_its_own_page(self):
+        big = ["big", "x" * 500]
+        pages = list(paged([["a", "1"], big, ["b", "2"]], budget=50))
+        self.assertEqual(pages, [[["a", "1"]], [big], [["b", "2"]]])
+
+    def test_budget_counts_characters_not_bytes(self):
+        # 10 Hangul syllables: 10 JSON chars each, 30 UTF-8 bytes.
+        items = [["k", "가" * 10]] * 4
+        self.assertEqual(len(list(paged(items, budget=_size(items[0]) * 2))), 2)
+
+    def test_empty(self):
+        self.assertEqual(list(paged([])), [])
+
+
+class StateFileTest(unittest.TestCase):
+
+    SNAPSHOT = {
+        "version": 2,
+        "origin": "https://example.com",
+        "localStorage": {"k": "값", "emoji": "\U0001F600", "lone": "\udc80"},
+        "indexedDB": [{"name": "db", "version": 1, "stores": []}],
+    }
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def test_round_trip_plain_and_gzip(self):
+        for name in ("state.json", "state.json.gz"):
+            with self.subTest(name=name):
+                path = os.path.join(self.dir, name)
+                write_state(path, self.SNAPSHOT)
+                self.assertEqual(read_state(path), self.SNAPSHOT)
+
+    def test_gzip_detected_by_magic_bytes(self):
+        path = os.path.join(self.dir, "renamed.json")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump({"version": 1, "cookies": []}, f)
+        self.assertEqual(read_state(path), {"version": 1, "cookies": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
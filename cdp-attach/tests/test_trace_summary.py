@@ -0,0 +1,111 @@
+"""
+trace_summary: streaming event parsing across chunk boundaries and the
+slice accounting summarize() builds on it. Traces are written to a temp
+directory; no browser.
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "scripts"))
+import trace_summary  # noqa: E402
+from trace_summary import iter_trace_events, summarize  # noqa: E402
+
+MAIN = {"pid": 1, "tid": 7}
+EVENTS = [
+    {"ph": "M", "name": "thread_name", **MAIN, "args": {"name": "CrRendererMain"}},
+    {"ph": "X", "name": "RunTask", **MAIN, "ts": 1000, "dur": 80000},
+    {"ph": "X", "name": "RunTask", **MAIN, "ts": 90000, "dur": 10000},
+    {"ph": "X", "name": "Layout", **MAIN, "ts": 1500, "dur": 3000, "args": {"note": "a, [b] \"c\""}},
+]
+
+
+class _TraceFileTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def write(self, payload, name="trace.json", raw=None, opener=open):
+        path = os.path.join(self.dir, name)
+        with opener(path, "wt", encoding="utf-8") as f:
+            f.write(raw if raw is not None else json.dumps(payload, indent=1))
+        return path
+
+
+class IterTraceEventsTest(_TraceFileTest):
+
+    def test_object_and_array_forms(self):
+        for payload in ({"metadata": {"x": [1]}, "traceEvents": EVENTS}, EVENTS):
+            with self.subTest(form=type(payload).__name__):
+                self.assertEqual(list(iter_trace_events(self.write(payload))), EVENTS)
+
+    def test_gzip(self):
+        path = self.write({"traceEvents": EVENTS}, name="trace.json.gz", opener=gzip.open)
+        self.assertEqual(list(iter_trace_events(path)), EVENTS)
+
+    def test_every_chunk_boundary(self):
+        path = self.write({"traceEvents": EVENTS})
+        for size in (1, 2, 3, 5, 7, 16, 64):
+            with self.subTest(chunk=size), mock.patch.object(trace_summary, "TRACE_READ_CHARS", size):
+                self.assertEqual(list(iter_trace_events(path)), EVENTS)
+
+    def test_truncated_trace_keeps_complete_events(self):
+        text = json.dumps({"traceEvents": EVENTS})
+        path = self.write(None, raw=text[:text.rindex("{") + 10])
+        with mock.patch.object(trace_summary, "TRACE_READ_CHARS", 8):
+            self.assertEqual(list(iter_trace_events(path)), EVENTS[:-1])
+
+    def test_not_a_trace(self):
+        path = self.write({"events": []})
+        with self.assertRaisesRegex(ValueError, "not a Chrome trace"):
+            list(iter_trace_events(path))
+
+
+class SummarizeTest(_TraceFileTest):
+
+    def test_long_tasks_and_blocking_time(self):
+        summary = summarize(self.write({"traceEvents": EVENTS}))
+        self.assertEqual(summary["main_threads"], ["1:7"])
+        self.assertEqual(summary["tasks"], 2)
+        self.assertEqual(summary["long_task_count"], 1)
+        self.assertEqual(summary["blocking_ms"], 30.0)
+        self.assertEqual(summary["rendering"]["Layout"], {"ms": 3.0, "count": 1})
+
+    def test_begin_end_pairing(self):
+        events = [
+            # Nested slices of the same name close innermost first.
+            {"ph": "B", "name": "FunctionCall", **MAIN, "ts": 0, "args": {"data": {"url": "a.js"}}},
+            {"ph": "B", "name": "FunctionCall", **MAIN, "ts": 100, "args": {"data": {"url": "b.js"}}},
+            {"ph": "E", "name": "FunctionCall", **MAIN, "ts": 400},
+            {"ph": "E", "name": "FunctionCall", **MAIN, "ts": 1000},
+            # E args are merged into the B event (EvaluateScript gets its url at the end).
+            {"ph": "B", "name": "EvaluateScript", **MAIN, "ts": 2000},
+            {"ph": "E", "name": "EvaluateScript", **MAIN, "ts": 5000, "args": {"data": {"url": "c.js"}}},
+            # An E with no open B, and a B that never ends, are ignored.
+            {"ph": "E", "name": "Layout", **MAIN, "ts": 6000},
+            {"ph": "B", "name": "Paint", **MAIN, "ts": 7000},
+        ]
+        summary = summarize(self.write(events))
+        calls = {row["url"]: row for row in summary["scripts"]}
+        self.assertEqual(calls["a.js"]["call_ms"], 1.0)
+        self.assertEqual(calls["b.js"]["call_ms"], 0.3)
+        self.assertEqual(calls["c.js"]["evaluate_ms"], 3.0)
+        self.assertEqual(summary["rendering"], {})
+
+    def test_slices_on_other_threads_are_kept_apart(self):
+        other = {"pid": 2, "tid": 9}
+        events = EVENTS + [{"ph": "X", "name": "RunTask", **other, "ts": 0, "dur": 500000}]
+        summary = summarize(self.write(events))
+        self.assertEqual(summary["main_threads"], ["1:7"])
+        self.assertEqual(summary["long_task_count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()